@@ -1 +1,2 @@
-from .core import User, UserRole, Game, Highlight, Video, Task, TaskStatus, TaskType, LogType, VideoSegment
+from .core import User, UserRole, Game, Highlight, Video, Task, TaskStatus, TaskType, TaskPriority, LogType, \
+    VideoSegment, AnalysisResult, GameEvaluation
@@ -1 +1,2 @@
-from .interface import AnalyticsStrategy
+from .interface import AnalyticsStrategy, engine_pool, detector_pool, evaluation_cache, feature_store, tablebase, \
+    opening_trie
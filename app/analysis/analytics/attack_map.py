@@ -0,0 +1,89 @@
+from typing import List, Tuple
+
+import chess
+
+
+class AttackMap:
+    """
+    Карта атак для доски, которая обновляется инкрементально на каждом ходе.
+
+    Для каждого поля хранятся:
+      • `attacks_mask(sq)`   – поля, которые бьёт фигура на sq;
+      • `attackers_mask(…)`  – поля фигур, которые бьют sq.
+
+    Ход меняет содержимое нескольких полей (from/to, взятие на проходе,
+    ладья при рокировке). Пересчитываются только фигуры на этих полях и
+    дальнобойные фигуры, чьи линии через них проходят; атаки пешек, коней
+    и королей от занятости доски не зависят.
+
+    Ходы делаются через `push` / `pop` карты, а не доски напрямую.
+    """
+
+    def __init__(self, board: chess.Board):
+        self.board = board
+
+        self._attacks: List[chess.Bitboard] = [chess.BB_EMPTY] * 64
+        self._attackers: List[chess.Bitboard] = [chess.BB_EMPTY] * 64
+        self._undo: List[List[Tuple[chess.Square, chess.Bitboard]]] = []
+
+        for square in chess.scan_forward(board.occupied):
+            self._set(square, board.attacks_mask(square))
+
+    def _set(self, square: chess.Square, mask: chess.Bitboard) -> chess.Bitboard:
+        old = self._attacks[square]
+        bit = chess.BB_SQUARES[square]
+        attackers = self._attackers
+
+        changed = old ^ mask
+        while changed:
+            attackers[(changed & -changed).bit_length() - 1] ^= bit
+            changed &= changed - 1
+
+        self._attacks[square] = mask
+        return old
+
+    def push(self, move: chess.Move) -> None:
+        """Делает ход на доске и обновляет карту."""
+        board = self.board
+        occupied = board.occupied
+        board.push(move)
+
+        # поля, содержимое которых изменилось: from/to, а также поле пешки,
+        # взятой на проходе, и поля ладьи при рокировке
+        touched = occupied ^ board.occupied | chess.BB_SQUARES[move.from_square] | chess.BB_SQUARES[move.to_square]
+
+        # фигуры на изменившихся полях и дальнобойные фигуры, бившие через них
+        affected = touched
+        sliders = board.bishops | board.rooks | board.queens
+        for square in chess.scan_forward(touched):
+            affected |= self._attackers[square] & sliders
+
+        undo = []
+        for square in chess.scan_forward(affected):
+            mask = board.attacks_mask(square)
+            if mask != self._attacks[square]:
+                undo.append((square, self._set(square, mask)))
+        self._undo.append(undo)
+
+    def pop(self) -> chess.Move:
+        """Отменяет последний ход на доске и в карте."""
+        for square, mask in reversed(self._undo.pop()):
+            self._set(square, mask)
+        return self.board.pop()
+
+    def attacks_mask(self, square: chess.Square) -> chess.Bitboard:
+        return self._attacks[square]
+
+    def attackers_mask(self, color: chess.Color, square: chess.Square) -> chess.Bitboard:
+        return self._attackers[square] & self.board.occupied_co[color]
+
+    def is_attacked_by(self, color: chess.Color, square: chess.Square) -> bool:
+        return bool(self._attackers[square] & self.board.occupied_co[color])
+
+    def attacked_mask(self, color: chess.Color) -> chess.Bitboard:
+        """Все поля, которые бьёт хотя бы одна фигура цвета color."""
+        mask = chess.BB_EMPTY
+        attacks = self._attacks
+        for square in chess.scan_forward(self.board.occupied_co[color]):
+            mask |= attacks[square]
+        return mask
@@ -0,0 +1,86 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+
+def _warm_up() -> None:
+    """Инициализатор процесса: заранее импортирует chess и эвристики."""
+    import chess
+    import chess.pgn
+
+    from app.analysis.analytics import heuristic_functions  # noqa: F401
+
+
+def _ping() -> bool:
+    return True
+
+
+class DetectorPool:
+    """
+    Пул процессов для CPU-нагруженных эвристик, чтобы они не блокировали
+    event loop, который обслуживает запросы FastAPI.
+
+    Процессы запускаются и «прогреваются» в `start` (обычно в lifespan
+    FastAPI). Функции и их аргументы передаются в процессы через pickle,
+    поэтому `run` принимает только функции уровня модуля. При `size == 0`
+    функции выполняются прямо в текущем процессе.
+    """
+
+    def __init__(self, size: int):
+        if size < 0:
+            raise ValueError("Размер пула процессов не может быть отрицательным")
+
+        self.size = size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+
+    async def start(self) -> None:
+        """Запускает и прогревает процессы пула. Повторный вызов ничего не делает."""
+        if self.size == 0:
+            return
+
+        async with self._lock:
+            if self.started:
+                return
+
+            executor = ProcessPoolExecutor(
+                max_workers=self.size,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_up,
+            )
+
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(loop.run_in_executor(executor, _ping) for _ in range(self.size)))
+
+            self._executor = executor
+            logger.info(f"Started detector pool with {self.size} processes")
+
+    async def close(self) -> None:
+        async with self._lock:
+            if not self.started:
+                return
+
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+            logger.info("Detector pool stopped")
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Выполняет `fn(*args)` в процессе пула и возвращает результат."""
+        if self.size == 0:
+            return fn(*args)
+
+        if not self.started:
+            await self.start()
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
@@ -0,0 +1,103 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Union
+
+import chess.engine
+from loguru import logger
+
+
+class EnginePool:
+    """
+    Пул «прогретых» UCI-движков, общий для всех задач анализа.
+
+    Движки запускаются один раз (`start`, обычно в lifespan FastAPI),
+    задачи берут их через `async with pool.engine() as engine:` и
+    возвращают обратно. Упавший процесс перезапускается при следующей
+    выдаче, так что размер пула остаётся постоянным и одновременно
+    работает не больше `size` движков.
+    """
+
+    def __init__(self, engine_path: Union[str, List[str]], size: int):
+        if size < 1:
+            raise ValueError("Размер пула движков должен быть положительным")
+
+        self.engine_path = engine_path
+        self.size = size
+
+        self._idle: Optional[asyncio.Queue] = None
+        self._engines: List[chess.engine.UciProtocol] = []
+        self._lock = asyncio.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._idle is not None
+
+    async def _spawn(self) -> chess.engine.UciProtocol:
+        _, engine = await chess.engine.popen_uci(self.engine_path)
+        return engine
+
+    async def start(self) -> None:
+        """Запускает все движки пула. Повторный вызов ничего не делает."""
+        async with self._lock:
+            if self.started:
+                return
+
+            engines = await asyncio.gather(*(self._spawn() for _ in range(self.size)))
+
+            self._idle = asyncio.Queue()
+            for engine in engines:
+                self._engines.append(engine)
+                self._idle.put_nowait(engine)
+
+            logger.info(f"Started engine pool with {self.size} engines: {self.engine_path}")
+
+    async def close(self) -> None:
+        """Останавливает все движки пула."""
+        async with self._lock:
+            if not self.started:
+                return
+
+            for engine in self._engines:
+                if not engine.returncode.done():
+                    try:
+                        await engine.quit()
+                    except chess.engine.EngineError:
+                        pass
+
+            self._engines.clear()
+            self._idle = None
+
+            logger.info("Engine pool stopped")
+
+    async def _restart(self, engine: chess.engine.UciProtocol) -> chess.engine.UciProtocol:
+        logger.warning(f"Engine process exited with code {engine.returncode.result()}, restarting")
+
+        fresh = await self._spawn()
+        self._engines[self._engines.index(engine)] = fresh
+        return fresh
+
+    async def version(self) -> str:
+        """Имя движка из ответа на `uci`, например «Stockfish 16.1»."""
+        if not self.started:
+            await self.start()
+
+        return self._engines[0].id.get("name", "")
+
+    @asynccontextmanager
+    async def engine(self) -> AsyncIterator[chess.engine.UciProtocol]:
+        """
+        Выдаёт свободный движок на время блока `async with`,
+        ожидая, пока он освободится, если все заняты.
+        """
+        if not self.started:
+            await self.start()
+
+        idle = self._idle
+        engine = await idle.get()
+        try:
+            if engine.returncode.done():
+                engine = await self._restart(engine)
+
+            yield engine
+        finally:
+            idle.put_nowait(engine)
@@ -0,0 +1,203 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import chess
+import chess.polyglot
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS evaluations (
+    key   INTEGER PRIMARY KEY,
+    depth INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    used  REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS evaluations_used ON evaluations (used);
+"""
+
+
+def _position_key(board: chess.Board) -> int:
+    """Zobrist-хэш позиции, приведённый к знаковому 64-битному INTEGER SQLite."""
+    key = chess.polyglot.zobrist_hash(board)
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+class EvaluationCache:
+    """
+    Постоянный кэш оценок движка в локальном SQLite-файле.
+
+    Ключ – Zobrist-хэш позиции; для каждой позиции хранится оценка
+    (cp с точки зрения белых) с наибольшей глубиной. Оценка, посчитанная
+    на глубине d, отвечает и на запросы с глубиной ≤ d.
+
+    Новые оценки и отметки об использовании копятся в памяти и пишутся
+    одной транзакцией в `flush`. Если записей становится больше
+    `max_entries`, давно не использованные удаляются.
+
+    Из асинхронного кода кэш читается и пишется через `aget_many` и
+    `aflush`: запросы к SQLite идут пачкой в отдельном потоке и не
+    блокируют цикл событий.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1_000_000):
+        if max_entries < 1:
+            raise ValueError("Размер кэша оценок должен быть положительным")
+
+        self.path = path
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+
+        self._connection: Optional[sqlite3.Connection] = None
+        # соединение используется из потоков asyncio.to_thread, по одному за раз
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Tuple[int, int]] = {}     # key → (depth, score)
+        self._touched: Dict[int, float] = {}               # key → used
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(_SCHEMA)
+
+        return self._connection
+
+    def get(self, board: chess.Board, depth: int) -> Optional[int]:
+        """Оценка позиции на глубине не меньше `depth` или None."""
+        return self.get_many([board], depth)[0]
+
+    def get_many(self, boards: Iterable[chess.Board], depth: int) -> List[Optional[int]]:
+        """Оценки позиций `boards` на глубине не меньше `depth` (None – нет в кэше) одним запросом."""
+        keys = [_position_key(board) for board in boards]
+        return self._found(keys, depth, self._select(self._unknown(keys, depth), depth))
+
+    async def aget_many(self, boards: Iterable[chess.Board], depth: int) -> List[Optional[int]]:
+        """`get_many`, но запрос к SQLite выполняется в отдельном потоке."""
+        keys = [_position_key(board) for board in boards]
+        rows = await asyncio.to_thread(self._select, self._unknown(keys, depth), depth)
+        return self._found(keys, depth, rows)
+
+    def _unknown(self, keys: List[int], depth: int) -> List[int]:
+        """Ключи, для которых в памяти нет оценки нужной глубины."""
+        return [key for key in keys if self._pending.get(key, (-1, 0))[0] < depth]
+
+    def _select(self, keys: List[int], depth: int) -> Dict[int, int]:
+        rows: Dict[int, int] = {}
+        if not keys:
+            return rows
+
+        with self._lock:
+            connection = self._connect()
+            # не больше 999 параметров на запрос в старых сборках SQLite
+            for start in range(0, len(keys), 900):
+                chunk = keys[start:start + 900]
+                rows.update(connection.execute(
+                    f"SELECT key, score FROM evaluations WHERE depth >= ? AND key IN ({', '.join('?' * len(chunk))})",
+                    (depth, *chunk),
+                ).fetchall())
+
+        return rows
+
+    def _found(self, keys: List[int], depth: int, rows: Dict[int, int]) -> List[Optional[int]]:
+        now = time.time()
+        scores: List[Optional[int]] = []
+
+        for key in keys:
+            pending = self._pending.get(key)
+            if pending is not None and pending[0] >= depth:
+                scores.append(pending[1])
+            elif key in rows:
+                self._touched[key] = now
+                scores.append(rows[key])
+            else:
+                scores.append(None)
+
+        found = sum(score is not None for score in scores)
+        self.hits += found
+        self.misses += len(scores) - found
+        return scores
+
+    def put(self, board: chess.Board, depth: int, score: int) -> None:
+        key = _position_key(board)
+
+        pending = self._pending.get(key)
+        if pending is None or pending[0] < depth:
+            self._pending[key] = (depth, score)
+
+    def flush(self) -> None:
+        """Записывает накопленные оценки и при необходимости вытесняет старые."""
+        self._write(*self._take())
+
+    async def aflush(self) -> None:
+        """`flush` в отдельном потоке."""
+        pending, touched = self._take()
+        if pending or touched:
+            await asyncio.to_thread(self._write, pending, touched)
+
+    def _take(self) -> Tuple[Dict[int, Tuple[int, int]], Dict[int, float]]:
+        """Забирает накопленные записи, чтобы новые копились уже отдельно."""
+        taken = self._pending, self._touched
+        self._pending, self._touched = {}, {}
+        return taken
+
+    def _write(self, pending: Dict[int, Tuple[int, int]], touched: Dict[int, float]) -> None:
+        if not pending and not touched:
+            return
+
+        now = time.time()
+
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.executemany(
+                    "INSERT INTO evaluations (key, depth, score, used) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET depth = excluded.depth, score = excluded.score, used = excluded.used "
+                    "WHERE excluded.depth > evaluations.depth",
+                    [(key, depth, score, now) for key, (depth, score) in pending.items()],
+                )
+                connection.executemany(
+                    "UPDATE evaluations SET used = ? WHERE key = ?",
+                    [(used, key) for key, used in touched.items()],
+                )
+
+                if pending:
+                    self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        count = connection.execute("SELECT COUNT(*) FROM evaluations").fetchone()[0]
+        if count <= self.max_entries:
+            return
+
+        # удаляем с запасом, чтобы не вытеснять на каждой партии
+        excess = count - self.max_entries * 9 // 10
+        connection.execute(
+            "DELETE FROM evaluations WHERE key IN "
+            "(SELECT key FROM evaluations ORDER BY used LIMIT ?)",
+            (excess,),
+        )
+
+    def __len__(self) -> int:
+        self.flush()
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM evaluations").fetchone()[0]
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,69 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# значение int16 для позиций без оценки
+MISSING = np.iinfo(np.int16).min
+
+
+class EvaluationCurve:
+    """
+    Оценки движка по всем позициям партии: cp с точки зрения белых,
+    индекс 0 – начальная позиция, индекс ply – позиция после ply полуходов.
+    Вместе с оценками хранятся глубина и имя движка, которыми они получены.
+
+    Оценки лежат в массиве int16 (мат – ±10000, как в `stockfish_moments`),
+    в базе – его байтами. При двухпроходном анализе на полной глубине
+    оцениваются не все позиции; остальные помечаются `MISSING`.
+
+    Пустая кривая (`scores is None`) передаётся в `stockfish_moments`,
+    чтобы получить оценки обратно: после работы движка она заполняется
+    и помечается `changed`.
+    """
+
+    def __init__(self, scores: Optional[np.ndarray] = None,
+                 depth: Optional[int] = None, engine: Optional[str] = None):
+        self.scores = scores
+        self.depth = depth
+        self.engine = engine
+        self.changed = False
+
+    @classmethod
+    def from_bytes(cls, blob: bytes, depth: int, engine: str) -> "EvaluationCurve":
+        return cls(np.frombuffer(blob, dtype="<i2").astype(np.int16), depth, engine)
+
+    def to_bytes(self) -> bytes:
+        return self.scores.astype("<i2").tobytes()
+
+    def fill(self, evaluations: Dict[int, int], plies: int, depth: int, engine: str) -> None:
+        """Записывает оценки партии из `plies` полуходов."""
+        scores = np.full(plies + 1, MISSING, dtype=np.int16)
+        for ply, cp in evaluations.items():
+            scores[ply] = max(MISSING + 1, min(np.iinfo(np.int16).max, cp))
+
+        self.scores = scores
+        self.depth = depth
+        self.engine = engine
+        self.changed = True
+
+    @property
+    def dense(self) -> bool:
+        """Есть ли оценки всех позиций партии."""
+        return self.scores is not None and not np.any(self.scores == MISSING)
+
+    def matches(self, plies: int, depth: int, engine: str) -> bool:
+        """
+        Подходит ли кривая партии из `plies` полуходов при анализе на глубине
+        `depth` движком `engine`. Разреженная кривая двухпроходного анализа
+        не подходит никогда: уточнённые позиции выбраны под порог первого
+        анализа, и с другим порогом она пропустила бы скачки.
+        """
+        return (self.dense and len(self.scores) == plies + 1
+                and self.depth == depth and self.engine == engine)
+
+    def evaluations(self) -> Dict[int, int]:
+        """Известные оценки по полуходам, как их возвращает `_evaluate`."""
+        return {ply: int(cp) for ply, cp in enumerate(self.scores) if cp != MISSING}
+
+    def as_list(self) -> List[Optional[int]]:
+        return [None if cp == MISSING else int(cp) for cp in self.scores]
@@ -0,0 +1,200 @@
+import os
+from typing import Dict, List, Optional
+
+import chess
+import numpy as np
+
+from .attack_map import AttackMap
+from .timeline import GameTimeline
+from .util import values
+
+# версия раскладки признаков; входит в имя файла кэша
+FEATURES_VERSION = 1
+
+# плоскости 8×8 (по 64 столбца): занятость и число атак по (цвет, тип фигуры),
+# белые фигуры – плоскости 0..5, чёрные – 6..11 в порядке chess.PIECE_TYPES
+OCCUPANCY = 0
+ATTACKS = 12
+PLANES = 24
+
+# скалярные признаки после плоскостей: материал и подвижность белых и чёрных
+MATERIAL = PLANES * 64
+MOBILITY = MATERIAL + 2
+FEATURES = MOBILITY + 2
+
+_PLANE_VALUES = np.array([values.get(piece_type, 0) for piece_type in chess.PIECE_TYPES] * 2, dtype=np.int16)
+
+
+def _plane(color: chess.Color, piece_type: chess.PieceType) -> int:
+    return (0 if color == chess.WHITE else 6) + piece_type - 1
+
+
+def _unpack(masks: np.ndarray) -> np.ndarray:
+    """Битборды (…) → массив (…, 64) из нулей и единиц, поле a1 – первый столбец."""
+    return np.unpackbits(masks.astype("<u8").view(np.uint8), axis=-1, bitorder="little").reshape(*masks.shape, 64)
+
+
+def extract_features(game: GameTimeline) -> np.ndarray:
+    """
+    Признаки всех позиций партии, массив int16 формы (полуходы + 1) × FEATURES;
+    строка ply – позиция после ply полуходов.
+
+    Партия проигрывается один раз с картой атак; с досок снимаются только
+    битборды, а распаковка по полям и подсчёты делаются в NumPy.
+    """
+    attacks = AttackMap(game.board_at(0))
+    board = attacks.board
+    plies = len(game) + 1
+
+    pieces = np.zeros((plies, 12), dtype=np.uint64)
+    own = np.zeros((plies, 2), dtype=np.uint64)
+    rows: List[int] = []
+    planes: List[int] = []
+    masks: List[int] = []
+
+    for ply in range(plies):
+        if ply:
+            attacks.push(game.moves[ply - 1])
+
+        for color in chess.COLORS:
+            own[ply, 0 if color == chess.WHITE else 1] = board.occupied_co[color]
+            for piece_type in chess.PIECE_TYPES:
+                plane = _plane(color, piece_type)
+                mask = board.pieces_mask(piece_type, color)
+                pieces[ply, plane] = mask
+
+                for square in chess.scan_forward(mask):
+                    rows.append(ply)
+                    planes.append(plane)
+                    masks.append(attacks.attacks_mask(square))
+
+    features = np.zeros((plies, FEATURES), dtype=np.int16)
+    features[:, OCCUPANCY * 64:ATTACKS * 64] = _unpack(pieces).reshape(plies, -1)
+
+    rows_array = np.array(rows, dtype=np.intp)
+    planes_array = np.array(planes, dtype=np.intp)
+    masks_array = np.array(masks, dtype=np.uint64)
+
+    # фигуры собраны по возрастанию (полуход, плоскость), поэтому атаки
+    # одной плоскости складываются одним reduceat по границам групп
+    keys = rows_array * 12 + planes_array
+    starts = np.flatnonzero(np.diff(keys, prepend=-1))
+    counts = np.zeros((plies * 12, 64), dtype=np.int16)
+    if len(keys):
+        counts[keys[starts]] = np.add.reduceat(_unpack(masks_array), starts, axis=0)
+    features[:, ATTACKS * 64:PLANES * 64] = counts.reshape(plies, -1)
+
+    material = np.bitwise_count(pieces).astype(np.int16) * _PLANE_VALUES
+    features[:, MATERIAL] = material[:, :6].sum(axis=1)
+    features[:, MATERIAL + 1] = material[:, 6:].sum(axis=1)
+
+    # подвижность – поля, которые бьют фигуры (кроме пешек), не занятые своими
+    sides = (planes_array >= 6).astype(np.intp)
+    free = np.bitwise_count(masks_array & ~own[rows_array, sides]).astype(np.int16)
+    free[planes_array % 6 == chess.PAWN - 1] = 0
+    mobility = np.bincount(rows_array * 2 + sides, weights=free, minlength=plies * 2)
+    features[:, MOBILITY:MOBILITY + 2] = mobility.reshape(plies, 2)
+
+    return features
+
+
+def board_features(board: chess.Board) -> np.ndarray:
+    """Признаки одной позиции, массив формы (FEATURES,)."""
+    return extract_features(GameTimeline(board, []))[0]
+
+
+class PositionFeatures:
+    """
+    Признаки одной позиции (строка массива `extract_features`) с доступом
+    в терминах доски: поля фигур по символу, атакованные поля, материал.
+    """
+
+    def __init__(self, row: np.ndarray):
+        self.row = row
+
+    @classmethod
+    def from_board(cls, board: chess.Board) -> "PositionFeatures":
+        return cls(board_features(board))
+
+    def _plane(self, first: int, symbol: str) -> np.ndarray:
+        piece = chess.Piece.from_symbol(symbol)
+        start = (first + _plane(piece.color, piece.piece_type)) * 64
+        return self.row[start:start + 64]
+
+    def __getitem__(self, symbol: str) -> List[int]:
+        """Поля фигур с символом symbol ('N' – белые кони, 'q' – чёрные ферзи)."""
+        return np.flatnonzero(self._plane(OCCUPANCY, symbol)).tolist()
+
+    def attacks(self, symbol: str) -> List[int]:
+        """Поля, которые бьют фигуры symbol; поле повторяется по числу атак."""
+        return np.repeat(np.arange(64), self._plane(ATTACKS, symbol)).tolist()
+
+    def attack_count(self, color: chess.Color, square: chess.Square) -> int:
+        first = ATTACKS + _plane(color, chess.PAWN)
+        return int(self.row[first * 64 + square:(first + 6) * 64:64].sum())
+
+    def is_attacked_by(self, color: chess.Color, square: chess.Square) -> bool:
+        return self.attack_count(color, square) > 0
+
+    def material(self, color: chess.Color) -> int:
+        return int(self.row[MATERIAL + (0 if color == chess.WHITE else 1)])
+
+    def mobility(self, color: chess.Color) -> int:
+        return int(self.row[MOBILITY + (0 if color == chess.WHITE else 1)])
+
+
+class FeatureStore:
+    """
+    Кэш признаков партий на диске: по одному .npy-файлу на партию,
+    ключ – id партии. Файлы открываются как memmap только для чтения,
+    так что признаки не копируются в память целиком.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path(self, game_id: int) -> str:
+        return os.path.join(self.directory, f"{game_id}.v{FEATURES_VERSION}.npy")
+
+    def load(self, game_id: int) -> Optional[np.ndarray]:
+        """Признаки партии из кэша или None."""
+        path = self.path(game_id)
+        if not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode="r")
+
+    def ensure(self, game_id: int, pgn: str) -> str:
+        """Считает и сохраняет признаки партии, если их ещё нет; возвращает путь к файлу."""
+        path = self.path(game_id)
+        if os.path.exists(path):
+            return path
+
+        os.makedirs(self.directory, exist_ok=True)
+        features = extract_features(GameTimeline.from_pgn(pgn))
+
+        # пишем во временный файл, чтобы читатели не увидели недописанный
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, "wb") as handle:
+            np.save(handle, features)
+        os.replace(partial, path)
+
+        return path
+
+    def get(self, game_id: int, pgn: str) -> np.ndarray:
+        self.ensure(game_id, pgn)
+        return self.load(game_id)
+
+
+def material_and_mobility(store: Optional[FeatureStore], game_id: int, pgn: str) -> Dict[str, List[int]]:
+    """
+    Материал и подвижность белых и чёрных после каждого полухода
+    (индекс 0 – начальная позиция). Признаки берутся из `store`, при
+    первом обращении считаются и сохраняются; без `store` – считаются.
+    """
+    features = store.get(game_id, pgn) if store is not None else extract_features(GameTimeline.from_pgn(pgn))
+    return {
+        "material_white": features[:, MATERIAL].tolist(),
+        "material_black": features[:, MATERIAL + 1].tolist(),
+        "mobility_white": features[:, MOBILITY].tolist(),
+        "mobility_black": features[:, MOBILITY + 1].tolist(),
+    }
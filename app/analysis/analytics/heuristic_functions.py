@@ -1,10 +1,21 @@
-import io
-from typing import List, Tuple, Dict, Set
+import asyncio
+import time
+from enum import Enum
+from typing import Any, Callable, List, Tuple, Dict, Set, Iterable, Iterator, Optional, Type
 
 import chess
-import chess.pgn
 import chess.engine
-from .util import merge_intervals, is_in_bad_spot, intervals_format
+import chess.syzygy
+from loguru import logger
+
+from .attack_map import AttackMap
+from .detector_pool import DetectorPool
+from .engine_pool import EnginePool
+from .evaluation_cache import EvaluationCache
+from .evaluation_curve import EvaluationCurve
+from .opening_trie import OpeningTrie
+from .timeline import GameTimeline
+from .util import merge_intervals, is_in_bad_spot, intervals_format, static_exchange, static_exchange_move
 
 # --- «цена» фигур в пешках -----------------------------------------------
 PIECE_VALUE = {
@@ -17,47 +28,181 @@ PIECE_VALUE = {
 }
 
 
-def detect_forks(pgn: str) -> List[Tuple[str, str]]:
+class Cost(str, Enum):
+    """Порядок затрат детектора на один полуход."""
+    CHEAP = "cheap"            # несколько операций с картой атак
+    MODERATE = "moderate"      # перебор фигур и линий
+    EXPENSIVE = "expensive"    # перебор ходов или обращение к движку
+
+
+class Detector:
     """
-    Выявляет интервалы вилок в партии.
+    Базовый детектор для общего прохода по партии.
 
-    Возвращает список кортежей, например [('23W', '25B'), …].
+    Партия разбирается один раз в `GameTimeline` и проигрывается один раз
+    (см. `run_detectors`), а каждый зарегистрированный детектор получает
+    хуки на каждый полуход с общей доской:
+
+      • `before_move` – до хода;
+      • `after_move`  – после хода.
+
+    Атаки и защиты читаются из общей карты `self.attacks` (см. `AttackMap`),
+    которая обновляется вместе с доской. Найденные интервалы складываются
+    в `self.results`. Хуки не должны оставлять доску изменённой; временные
+    ходы делаются через `self.attacks.push` / `pop`.
+
+    Детектор описывает себя атрибутами класса и попадает в реестр
+    `DETECTORS` через `register`:
+
+      • `name`         – имя, по которому детектор включают в запросе анализа;
+      • `cost`         – порядок затрат (`Cost`);
+      • `needs_engine` – нужен ли движок (такие детекторы не проходят
+                         через `run_detectors`);
+      • `default`      – включён ли детектор, если набор не задан.
     """
 
-    game = chess.pgn.read_game(io.StringIO(pgn))
-    board = game.board()
+    name: str = ""
+    cost: Cost = Cost.CHEAP
+    needs_engine: bool = False
+    default: bool = True
+
+    def __init__(self, game: GameTimeline, attacks: AttackMap):
+        self.game = game
+        self.attacks = attacks
+        self.results: List[Tuple[int, int]] = []
+
+    def before_move(self, board: chess.Board, move: chess.Move, ply: int) -> None:
+        pass
+
+    def after_move(self, board: chess.Board, move: chess.Move, ply: int) -> None:
+        pass
+
+
+# реестр детекторов: имя → класс, в порядке регистрации
+DETECTORS: Dict[str, Type[Detector]] = {}
+
+
+def register(detector: Type[Detector]) -> Type[Detector]:
+    """Декоратор класса: добавляет детектор в `DETECTORS` под его `name`."""
+    if not detector.name:
+        raise ValueError(f"У детектора {detector.__name__} не задано имя")
+    if detector.name in DETECTORS:
+        raise ValueError(f"Детектор {detector.name} уже зарегистрирован")
+
+    DETECTORS[detector.name] = detector
+    return detector
+
+
+def select_detectors(names: Optional[Iterable[str]] = None) -> List[Type[Detector]]:
+    """
+    Детекторы с именами `names` в порядке реестра; при `names is None` –
+    детекторы с `default`. Неизвестное имя – `ValueError`.
+    """
+    if names is None:
+        return [detector for detector in DETECTORS.values() if detector.default]
+
+    names = set(names)
+    unknown = names - DETECTORS.keys()
+    if unknown:
+        raise ValueError(f"Неизвестные детекторы: {', '.join(sorted(unknown))}")
+
+    return [detector for detector in DETECTORS.values() if detector.name in names]
+
 
-    active_forks = []
-    results = []
-    ply = 0
+class DetectorStats:
+    """Замеры одного детектора за прогон по партии."""
 
-    # === проход по всем полуходам =========================================
-    for move in game.mainline_moves():
-        ply += 1
+    def __init__(self, name: str, seconds: float = 0.0, plies: int = 0, intervals: int = 0):
+        self.name = name
+        self.seconds = seconds        # время в хуках детектора
+        self.plies = plies            # обработано полуходов
+        self.intervals = intervals    # найдено интервалов
 
+    def as_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "seconds": self.seconds, "plies": self.plies, "intervals": self.intervals}
+
+    def __repr__(self) -> str:
+        return (f"DetectorStats({self.name!r}, seconds={self.seconds:.4f}, "
+                f"plies={self.plies}, intervals={self.intervals})")
+
+
+def profile_detectors(game: GameTimeline,
+                      detectors: Iterable[Type[Detector]]
+                      ) -> Tuple[List[Tuple[int, int]], List[DetectorStats]]:
+    """
+    Проигрывает партию один раз и вызывает хуки всех переданных
+    детекторов на общей доске.
+
+    Возвращает интервалы всех детекторов подряд, в порядке их передачи,
+    и замеры по каждому детектору. Время общего проигрывания партии
+    (ходы доски и карты атак) ни одному детектору не засчитывается.
+    """
+    detectors = list(detectors)
+    for detector in detectors:
+        if detector.needs_engine:
+            raise ValueError(f"Детектор {detector.name} требует движка и не запускается на доске")
+
+    attacks = AttackMap(game.board_at(0))
+    board = attacks.board
+    active = [detector(game, attacks) for detector in detectors]
+    elapsed = [0.0] * len(active)
+    clock = time.perf_counter
+
+    for ply, move in enumerate(game.moves, start=1):
+        for index, detector in enumerate(active):
+            started = clock()
+            detector.before_move(board, move, ply)
+            elapsed[index] += clock() - started
+
+        attacks.push(move)
+
+        for index, detector in enumerate(active):
+            started = clock()
+            detector.after_move(board, move, ply)
+            elapsed[index] += clock() - started
+
+    stats = [
+        DetectorStats(detector.name, seconds, len(game), len(detector.results))
+        for detector, seconds in zip(active, elapsed)
+    ]
+    return [interval for detector in active for interval in detector.results], stats
+
+
+def run_detectors(game: GameTimeline, detectors: Iterable[Type[Detector]]) -> List[Tuple[int, int]]:
+    """Интервалы всех переданных детекторов за один проход (см. `profile_detectors`)."""
+    return profile_detectors(game, detectors)[0]
+
+
+@register
+class ForkDetector(Detector):
+    """
+    Выявляет интервалы вилок в партии.
+    """
+
+    name = "fork"
+
+    def __init__(self, game: GameTimeline, attacks: AttackMap):
+        super().__init__(game, attacks)
+        self.active_forks = []
+
+    def before_move(self, board: chess.Board, move: chess.Move, ply: int) -> None:
         # 1. ОБНОВЛЯЕМ уже идущие вилки ПЕРЕД выполнением хода
 
-        for fork in active_forks[:]:
+        for fork in self.active_forks[:]:
             attacker_sq   = fork["attacker_sq"]
-            attacker_val  = fork["attacker_val"]
             targets       = fork["targets"]
 
             # походила ли атакующая фигура?
             if move.from_square == attacker_sq:
                 # фигура-вилочник сдвинулась
 
-                if board.is_capture(move) and move.to_square in targets:   # взяла одну из целей
-                    captured_piece   = board.piece_at(move.to_square)
-                    captured_val     = PIECE_VALUE[captured_piece.piece_type]
-                    defended_before  = board.is_attacked_by(captured_piece.color,
-                                                             move.to_square)
-
-                    # равная + защищена  → НЕ считается
-                    if not (captured_val == attacker_val and defended_before):
-                        results.append(extend_interval(pgn, fork["start"] - 1, ply))
+                if self.game.is_capture(ply) and move.to_square in targets:   # взяла одну из целей
+                    # размен без выигрыша материала (например, равная защищённая) → НЕ считается
+                    if static_exchange_move(board, move) > 0:
+                        self.results.append(extend_interval(self.game, fork["start"] - 1, ply))
 
                 # фигура ушла, а цель не взята → вилка аннулируется
-                active_forks.remove(fork)
+                self.active_forks.remove(fork)
                 continue
 
             #  цель ушла на другое поле
@@ -65,52 +210,54 @@ def detect_forks(pgn: str) -> List[Tuple[str, str]]:
                 targets[move.to_square] = targets.pop(move.from_square)
 
             #  цель съедена кем-то другим
-            if board.is_capture(move) and move.to_square in targets:
-                results.append(extend_interval(pgn, fork["start"] - 1, ply))
-                active_forks.remove(fork)
+            if self.game.is_capture(ply) and move.to_square in targets:
+                self.results.append(extend_interval(self.game, fork["start"] - 1, ply))
+                self.active_forks.remove(fork)
                 continue
 
-        board.push(move)
-
+    def after_move(self, board: chess.Board, move: chess.Move, ply: int) -> None:
         # Проверяем: возникла ли новая вилка после этого хода
 
         attacker_sq  = move.to_square
         attacker     = board.piece_at(attacker_sq)
         if attacker is None:
-            continue
+            return
 
-        attacker_val = PIECE_VALUE[attacker.piece_type]
+        enemy = not attacker.color
 
-        # собираем подходящие цели
-        attacked_now = {}
-        for sq in board.attacks(attacker_sq):
-            piece = board.piece_at(sq)
-            if not piece or piece.color == attacker.color:          # пусто или своя фигура
-                continue
-            if piece.piece_type == chess.PAWN:                      # пешки игнорируем
-                continue
-
-            defended = board.is_attacked_by(piece.color, sq)
+        # атакованные чужие фигуры, кроме пешек
+        candidates = self.attacks.attacks_mask(attacker_sq) & board.occupied_co[enemy] & ~board.pawns
+        if chess.popcount(candidates) < 2:
+            return
 
-            # условие первоначальной вилки
-            if PIECE_VALUE[piece.piece_type] > attacker_val or not defended:
-                attacked_now[sq] = (piece.color, piece.piece_type)
+        # условие первоначальной вилки: король под шахом или размен
+        # на поле цели выигрывает материал
+        attacked_now = {}
+        for sq in chess.scan_forward(candidates):
+            if chess.BB_SQUARES[sq] & board.kings or static_exchange(board, sq) > 0:
+                attacked_now[sq] = (enemy, board.piece_type_at(sq))
 
         # если целей ≥ 2 → фиксируем новую «живую» вилку
         if len(attacked_now) >= 2:
-            active_forks.append(
+            self.active_forks.append(
                 {
                     "start":        ply,
                     "attacker_sq":  attacker_sq,
-                    "attacker_val": attacker_val,
                     "targets":      attacked_now
                 }
             )
 
-    return results
+
+def detect_forks(game: GameTimeline) -> List[Tuple[str, str]]:
+    """
+    Выявляет интервалы вилок в партии.
+
+    Возвращает список кортежей, например [('23W', '25B'), …].
+    """
+    return run_detectors(game, [ForkDetector])
 
 def extend_interval(
-    pgn: str,
+    game: GameTimeline,
     start_ply: int,
     end_ply: int,
 ) -> Tuple[int, int]:
@@ -125,46 +272,36 @@ def extend_interval(
     3.  В противном случае расширение прекращается,
         функция возвращает окончательные границы интервала.
 
+    Взятия и шахи берутся из заранее посчитанных битовых массивов
+    `GameTimeline`, поэтому стоимость пропорциональна длине расширения,
+    а не длине партии.
+
     ----------
     Параметры
     ----------
-    pgn        : str   – та же партия, что и для поиска вилки
+    game       : GameTimeline – та же партия, что и для поиска вилки
     start_ply  : int   – 1-based полуход, на котором вилка началась
     end_ply    : int   – 1-based полуход, на котором была взята цель вилки
                           (то, что вернул detect_forks)
 
     """
-    game = chess.pgn.read_game(io.StringIO(pgn))
-    moves = list(game.mainline_moves())
-    total = len(moves)
-
-    board = game.board()
-    for idx in range(end_ply):
-        board.push(moves[idx])
+    total = len(game)
 
     new_end_ply = end_ply
     idx = end_ply
 
     while idx < total:
-        move = moves[idx]
-
-        is_capture = board.is_capture(move)
-        is_check   = board.gives_check(move)
-
-        if is_capture:
-            board.push(move)
+        if game.is_capture(idx + 1):
             new_end_ply = idx + 1            # +1, т.к. ply c единицы
             idx += 1                         # переходим к следующему полуходу
             continue
 
-        if is_check:
+        if game.gives_check(idx + 1):
             # добавляем ход-шах
-            board.push(move)
             new_end_ply = idx + 1
 
             # добавляем обязательный ответ, если не конец партии
             if idx + 1 < total:
-                board.push(moves[idx + 1])
                 new_end_ply = idx + 2
                 idx += 2                     # «через ход» от шаха
             else:
@@ -176,335 +313,744 @@ def extend_interval(
 
     return (start_ply, new_end_ply)
 
-# фигуры ценные для связки
-VALUABLE = {chess.ROOK, chess.QUEEN, chess.KING}
+def _beyond(origin: chess.Square, target: chess.Square) -> chess.Bitboard:
+    """Поля линии origin → target, лежащие строго за target."""
+    line = chess.BB_RAYS[origin][target]
+    if not line:
+        return chess.BB_EMPTY
+
+    if target > origin:
+        side = chess.BB_ALL & ~((chess.BB_SQUARES[target] << 1) - 1)
+    else:
+        side = chess.BB_SQUARES[target] - 1
+    return line & side
 
 
-# все диагональные смещения
-_DIAG_STEPS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+# _BEYOND[s][t] – «рентген» за фигурой на t для дальнобойной фигуры на s;
+# индексы полей вдоль линии монотонны, поэтому ближайшая фигура за t –
+# младший бит при t > s и старший иначе
+_BEYOND = [[_beyond(s, t) for t in chess.SQUARES] for s in chess.SQUARES]
 
 
-# ---------------------------------------------------------------------------
-def _find_bishop_pins(board: chess.Board, bishop_sq: chess.Square) -> List[Tuple[int, int]]:
+def _find_pins_and_skewers(attacks: AttackMap, slider_sq: chess.Square) -> List[Tuple[int, int]]:
     """
-    Возвращает список пар (front_sq, back_sq) – всех связок,
-    которые прямо сейчас создаёт слон, стоящий на bishop_sq.
+    Возвращает список пар (front_sq, back_sq) – всех связок и «сквозных
+    ударов», которые прямо сейчас создаёт слон, ладья или ферзь на slider_sq.
+
+    front – чужая фигура под прямым ударом, back – следующая чужая фигура
+    на той же линии за ней. Пешки не считаются, а более ценная из двух
+    фигур должна стоить больше атакующей: связка – когда дороже задняя,
+    сквозной удар – когда дороже передняя.
     """
-    color = board.piece_at(bishop_sq).color
+    board = attacks.board
+    slider = board.piece_at(slider_sq)
+    enemy = not slider.color
+    occupied = board.occupied
+    targets = board.occupied_co[enemy] & ~board.pawns
+    slider_val = PIECE_VALUE[slider.piece_type]
     pins = []
 
-    for df, dr in _DIAG_STEPS:
-        f = chess.square_file(bishop_sq) + df
-        r = chess.square_rank(bishop_sq) + dr
-
-        front_sq = None
-
-        while 0 <= f < 8 and 0 <= r < 8:
-            sq = chess.square(f, r)
-            piece = board.piece_at(sq)
-
-            if piece is None:
-                f += df
-                r += dr
-                continue
+    for front_sq in chess.scan_forward(attacks.attacks_mask(slider_sq) & targets):
+        behind = _BEYOND[slider_sq][front_sq] & occupied
+        if not behind:
+            continue
 
-            # первая встреченная фигура – потенциальная «передняя»
-            if front_sq is None:
-                if piece.color != color and piece.piece_type in VALUABLE:
-                    front_sq = sq
-                    f += df
-                    r += dr
-                    continue
-                break  # своя или «неценная» – связки нет на этом луче
+        back_sq = chess.lsb(behind) if front_sq > slider_sq else chess.msb(behind)
+        if not chess.BB_SQUARES[back_sq] & targets:
+            continue
 
-            # это уже «за» front_sq  → ищем «заднюю» ценную
-            if piece.color != color and piece.piece_type in VALUABLE:
-                pins.append((front_sq, sq))
-            break
+        front_val = PIECE_VALUE[board.piece_type_at(front_sq)]
+        back_val = PIECE_VALUE[board.piece_type_at(back_sq)]
+        if max(front_val, back_val) > slider_val:
+            pins.append((front_sq, back_sq))
 
     return pins
 
 
-def detect_pins(pgn: str) -> List[Tuple[str, str]]:
+@register
+class PinDetector(Detector):
     """
-    Находит ВСЕ «связки-с-участием-слона» в партии PGN.
-
-    Возвращает отрезки вида ('23W', '27B'), где
-    • начало – полуход появления связки;
-    • конец   – полуход, на котором ОДНА из связанных фигур была взята.
+    Находит связки и сквозные удары слонов, ладей и ферзей в партии PGN.
 
     Алгоритм:
       1. шагаем по полуходам,
-      2. ведём список «живых» связок,
+      2. после каждого хода проверяем все дальнобойные фигуры сходившей
+         стороны и ведём список «живых» связок,
       3. засчитываем успех, если front- или back-фигура съедена,
-      4. убираем связку, если слон ушёл и не сохранил луч.
+      4. убираем связку, если атакующая фигура ушла или её забрали.
     """
-    game = chess.pgn.read_game(io.StringIO(pgn))
-    board = game.board()
-
-    active: List[Dict] = []        # [{start, bishop, pinned:Set[int]} …]
-    result: List[Tuple[str, str]] = []
 
-    ply = 0
-    moves = game.mainline_moves()
+    name = "pin"
+    cost = Cost.MODERATE
 
-    for move in moves:
-        ply += 1
+    def __init__(self, game: GameTimeline, attacks: AttackMap):
+        super().__init__(game, attacks)
+        self.active: List[Dict] = []        # [{start, slider, line, pinned:Set[int]} …]
 
+    def before_move(self, board: chess.Board, move: chess.Move, ply: int) -> None:
         # обновляем действующие связки
-        for pin in active[:]:
-            bishop_sq = pin["bishop"]
+        for pin in self.active[:]:
+            slider_sq = pin["slider"]
             pinned: Set[int] = pin["pinned"]
 
-            # слон сделал ход
-            if move.from_square == bishop_sq:
-                # взял одну из связанных фигур?  → успех
-                if board.is_capture(move) and move.to_square in pinned:
-                    result.append(extend_interval(pgn, pin["start"] - 1, ply))
-                # независимо от результата слон покинул клетку – удаляем связку
-                active.remove(pin)
+            # атакующая фигура сделала ход
+            if move.from_square == slider_sq:
+                # взяла одну из связанных фигур?  → успех
+                if self.game.is_capture(ply) and move.to_square in pinned:
+                    self.results.append(extend_interval(self.game, pin["start"] - 1, ply))
+                # независимо от результата фигура покинула клетку – удаляем связку
+                self.active.remove(pin)
                 continue
 
-            # 1.2 слона забрали
-            if move.to_square == bishop_sq:
-                active.remove(pin)
+            # 1.2 атакующую фигуру забрали
+            if move.to_square == slider_sq:
+                self.active.remove(pin)
                 continue
 
             # 1.3 съели front или back фигуру
-            if board.is_capture(move) and move.to_square in pinned:
-                result.append(extend_interval(pgn, pin["start"] - 1, ply))
-                active.remove(pin)
+            if self.game.is_capture(ply) and move.to_square in pinned:
+                self.results.append(extend_interval(self.game, pin["start"] - 1, ply))
+                self.active.remove(pin)
                 continue
 
             # 1.4 связанные фигуры куда-то отошли – удаляем их
             if move.from_square in pinned:
                 pinned.remove(move.from_square)
                 if not pinned:
-                    active.remove(pin)
-
+                    self.active.remove(pin)
 
-        board.push(move)
+    def after_move(self, board: chess.Board, move: chess.Move, ply: int) -> None:
+        color = not board.turn
+        sliders = board.occupied_co[color] & (board.bishops | board.rooks | board.queens)
+        known = {pin["line"] for pin in self.active}
 
+        for slider_sq in chess.scan_forward(sliders):
+            for front, back in _find_pins_and_skewers(self.attacks, slider_sq):
+                line = (slider_sq, front, back)
+                if line in known:
+                    continue
 
-        bivouac = board.piece_at(move.to_square)
-        if bivouac and bivouac.piece_type == chess.BISHOP:
-            for front, back in _find_bishop_pins(board, move.to_square):
-                active.append(
+                self.active.append(
                     {
                         "start":  ply,
-                        "bishop": move.to_square,
+                        "slider": slider_sq,
+                        "line":   line,
                         "pinned": {front, back},
                     }
                 )
 
-    return result
 
-def is_trapped(board: chess.Board, square: int) -> bool:
+def detect_pins(game: GameTimeline) -> List[Tuple[str, str]]:
+    """
+    Находит связки и сквозные удары слонов, ладей и ферзей в партии PGN.
+
+    Возвращает отрезки вида ('23W', '27B'), где
+    • начало – полуход появления связки;
+    • конец   – полуход, на котором ОДНА из связанных фигур была взята.
+    """
+    return run_detectors(game, [PinDetector])
+
+def is_trapped(attacks: AttackMap, square: int) -> bool:
     """
     Фигура «поймана», если:
       • не пешка и не король;
-      • под боем более дешёвой фигуры или висит;
+      • соперник выигрывает материал разменом на её поле (см. `static_exchange`);
       • нет собственного хода, который выводит её в безопасное положение.
+
+    Атаки берутся из карты `attacks`; фигура, которую никто не бьёт,
+    отсеивается без генерации ходов и размена.
     """
+    board = attacks.board
     piece = board.piece_at(square)
     if not piece or piece.piece_type in (chess.PAWN, chess.KING):
         return False
+    if not attacks.is_attacked_by(not piece.color, square):
+        return False
     if board.is_check() or board.is_pinned(piece.color, square):
         return False
     if not is_in_bad_spot(board, square):
         return False
 
-    for mv in list(board.legal_moves):
-        if mv.from_square != square:
-            continue
-
-        captured = board.piece_at(mv.to_square)
-        if captured and PIECE_VALUE[captured.piece_type] >= PIECE_VALUE[piece.piece_type]:
+    for mv in board.generate_legal_moves(from_mask=chess.BB_SQUARES[square]):
+        # взятие, которое само не проигрывает размен, – тоже спасение
+        if board.piece_at(mv.to_square) and static_exchange_move(board, mv) >= 0:
             return False
 
-        board.push(mv)
-        safe = not is_in_bad_spot(board, mv.to_square)
-        board.pop()
+        attacks.push(mv)
+        safe = not attacks.is_attacked_by(board.turn, mv.to_square) or not is_in_bad_spot(board, mv.to_square)
+        attacks.pop()
         if safe:
             return False
     return True
 
 
-def detect_trapped_pieces(pgn: str) -> List[Tuple[str, str]]:
+@register
+class TrappedPieceDetector(Detector):
     """
-    Возвращает интервалы вида ('23W', '27B'), где
-      • начало — момент, когда фигура стала «пойманной»;
-      • конец   — полуход, на котором её действительно съели.
+    Отслеживает «пойманные» фигуры (см. `is_trapped`) до момента,
+    когда их действительно съели.
+
+    Перебирает ходы каждой фигуры под боем, поэтому по умолчанию выключен.
     """
-    game = chess.pgn.read_game(io.StringIO(pgn))
-    board = game.board()
 
-    active: List[Dict] = []        # [{start, square}]
-    result: List[Tuple[str, str]] = []
-    ply = 0
+    name = "trapped"
+    cost = Cost.EXPENSIVE
+    default = False
 
-    for move in game.mainline_moves():
-        ply += 1
+    def __init__(self, game: GameTimeline, attacks: AttackMap):
+        super().__init__(game, attacks)
+        self.active: List[Dict] = []        # [{start, square}]
 
-        for trap in active[:]:
+    def before_move(self, board: chess.Board, move: chess.Move, ply: int) -> None:
+        for trap in self.active[:]:
             sq = trap["square"]
 
-
-            if board.is_capture(move) and move.to_square == sq:
-                result.append(extend_interval(pgn, trap["start"] - 1, ply))
-                active.remove(trap)
+            if self.game.is_capture(ply) and move.to_square == sq:
+                self.results.append(extend_interval(self.game, trap["start"] - 1, ply))
+                self.active.remove(trap)
                 continue
 
             if move.from_square == sq:
                 trap["square"] = move.to_square
 
+    def after_move(self, board: chess.Board, move: chess.Move, ply: int) -> None:
+        for trap in self.active[:]:
+            if not board.piece_at(trap["square"]) or not is_trapped(self.attacks, trap["square"]):
+                self.active.remove(trap)
 
-        board.push(move)
+        # пойманной может быть только фигура под боем
+        own = board.occupied_co[board.turn] & self.attacks.attacked_mask(not board.turn)
+        for pieces in (board.knights, board.bishops, board.rooks, board.queens):
+            for sq in chess.scan_forward(pieces & own):
+                if any(sq == t["square"] for t in self.active):  # уже отслеживаем
+                    continue
+                if is_trapped(self.attacks, sq):
+                    self.active.append({"start": ply, "square": sq})
 
-        for trap in active[:]:
-            if not board.piece_at(trap["square"]) or not is_trapped(board, trap["square"]):
-                active.remove(trap)
 
-        side_to_move = board.turn
-        for p_type in (chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN):
-            for sq in board.pieces(p_type, side_to_move):
-                if any(sq == t["square"] for t in active):  # уже отслеживаем
-                    continue
-                if is_trapped(board, sq):
-                    active.append({"start": ply, "square": sq})
+def detect_trapped_pieces(game: GameTimeline) -> List[Tuple[str, str]]:
+    """
+    Возвращает интервалы вида ('23W', '27B'), где
+      • начало — момент, когда фигура стала «пойманной»;
+      • конец   — полуход, на котором её действительно съели.
+    """
+    return run_detectors(game, [TrappedPieceDetector])
 
-    return result
 
-def detect_sacrifices(pgn: str) -> List[Tuple[str, str]]:
+@register
+class SacrificeDetector(Detector):
     """
-    «Жертва» = фигура X берёт менее ценную фигуру Y
-               и сразу (на следующем полуходе соперника) оказывается съеденной.
+    «Жертва» = фигура X делает взятие, проигрывающее размен на этом поле
+               (см. `static_exchange_move`), и сразу (на следующем полуходе соперника) оказывается съеденной.
                Если X сделала хотя бы ещё один собственный ход — это уже не жертва.
-    Возвращает интервалы ('startTag', 'endTag').
     """
-    game = chess.pgn.read_game(io.StringIO(pgn))
-    if game is None:
-        return []
-
-    board = game.board()
-    ply = 0
 
-    # active:  отслеживаемые потенциальные жертвы до следующего ответа соперника
-    #   {'start': int, 'square': int, 'color': bool, 'piece_type': int}
-    active: List[Dict] = []
-    result: List[Tuple[str, str]] = []
+    name = "sacrifice"
 
-    for move in game.mainline_moves():
-        ply += 1
-        side_to_move = board.turn            # цвет, делающий ХОД с точки зрения board
+    def __init__(self, game: GameTimeline, attacks: AttackMap):
+        super().__init__(game, attacks)
+        # active:  отслеживаемые потенциальные жертвы до следующего ответа соперника
+        #   {'start': int, 'square': int, 'color': bool, 'piece_type': int}
+        self.active: List[Dict] = []
 
+    def before_move(self, board: chess.Board, move: chess.Move, ply: int) -> None:
         # ───── 1. обработка активных жертв ДО хода ────────────────────────
-        for sac in active[:]:
+        for sac in self.active[:]:
             sq = sac["square"]
 
             # 1.1 соперник съел жертвующую фигуру → успех
-            if board.is_capture(move) and move.to_square == sq:
-                result.append(extend_interval(pgn, sac["start"] - 1, ply))
-                active.remove(sac)
+            if self.game.is_capture(ply) and move.to_square == sq:
+                self.results.append(extend_interval(self.game, sac["start"] - 1, ply))
+                self.active.remove(sac)
                 continue
 
             # 1.2 «жертвующая» фигура сама делает второй ход → не жертва
             if move.from_square == sq:
-                active.remove(sac)
+                self.active.remove(sac)
                 continue
 
         # ───── 2. проверяем, был ли ход жертвой ───────────────────────────
-        is_capture = board.is_capture(move)
-        if is_capture:
+        if self.game.is_capture(ply):
             capturing_piece = board.piece_at(move.from_square)
-            captured_piece = board.piece_at(move.to_square)
 
-            if capturing_piece and captured_piece:
-                if PIECE_VALUE[captured_piece.piece_type] < PIECE_VALUE[capturing_piece.piece_type]:
-                    active.append(
-                        dict(start=ply,
-                             square=move.to_square,
-                             color=capturing_piece.color,
-                             piece_type=capturing_piece.piece_type)
-                    )
+            # взятие, проигрывающее размен на этом поле; если поле не защищено
+            # даже «рентгеном» через уходящую фигуру, размен не считаем
+            if capturing_piece and self._recapture_possible(board, move) \
+                    and static_exchange_move(board, move) < 0:
+                self.active.append(
+                    dict(start=ply,
+                         square=move.to_square,
+                         color=capturing_piece.color,
+                         piece_type=capturing_piece.piece_type)
+                )
 
-        board.push(move)
+    def _recapture_possible(self, board: chess.Board, move: chess.Move) -> bool:
+        defender = not board.turn
+        sliders = board.bishops | board.rooks | board.queens
+        return bool(self.attacks.attackers_mask(defender, move.to_square)
+                    or self.attacks.attackers_mask(defender, move.from_square) & sliders)
 
-        for sac in active[:]:
+    def after_move(self, board: chess.Board, move: chess.Move, ply: int) -> None:
+        for sac in self.active[:]:
             if sac["color"] == board.turn:
-                active.remove(sac)
+                self.active.remove(sac)
 
-    return result
 
+def detect_sacrifices(game: GameTimeline) -> List[Tuple[str, str]]:
+    """
+    «Жертва» = фигура X делает взятие, проигрывающее размен на этом поле
+               (см. `static_exchange_move`), и сразу (на следующем полуходе соперника) оказывается съеденной.
+               Если X сделала хотя бы ещё один собственный ход — это уже не жертва.
+    Возвращает интервалы ('startTag', 'endTag').
+    """
+    return run_detectors(game, [SacrificeDetector])
 
-async def stockfish_moments(
-    pgn_string: str,
-    engine_path: str,
+
+def _positions(game: GameTimeline, plies: List[int],
+               backward: bool = False) -> Iterator[Tuple[int, chess.Board]]:
+    """
+    Проходит по позициям *после* полуходов `plies` (по возрастанию)
+    на одной доске; при `backward` – от последней позиции к первой,
+    снимая ходы через `board.pop()`.
+
+    Доска строится с полной историей ходов, чтобы движок видел
+    повторения так же, как при последовательном анализе.
+    """
+    board = game.board_at(0)
+    current = 0
+
+    if backward:
+        if not plies:
+            return
+
+        for mv in game.moves[:plies[-1]]:
+            board.push(mv)
+        current = plies[-1]
+
+        for ply in reversed(plies):
+            while current > ply:
+                board.pop()
+                current -= 1
+            yield ply, board
+        return
+
+    for ply in plies:
+        for mv in game.moves[current:ply]:
+            board.push(mv)
+        current = ply
+        yield ply, board
+
+
+# оценка выигрыша по таблицам – порядка оценки движка в выигранном эндшпиле,
+# чтобы переход от оценок движка к таблицам не выглядел скачком; с таблицами
+# оценки движка, в том числе маты (±10000), ограничиваются этой же величиной
+TABLEBASE_WIN = 1000
+TABLEBASE_MAX_DTZ = 100
+
+
+def tablebase_score(tablebase: chess.syzygy.Tablebase, board: chess.Board, max_pieces: int) -> Optional[int]:
+    """
+    Точная оценка позиции по таблицам Syzygy, cp с точки зрения белых,
+    или None, если фигур больше `max_pieces`, есть права на рокировку,
+    позиция матовая (её, как и раньше, оценивает движок) или таблицы нет.
+
+    Выигрыш – `TABLEBASE_WIN` за вычетом DTZ (не больше `TABLEBASE_MAX_DTZ`),
+    чтобы более быстрый выигрыш оценивался выше; без DTZ-таблиц –
+    ровно `TABLEBASE_WIN`. Выигрыш и проигрыш, которые правило 50 ходов
+    превращает в ничью, оцениваются как ничья.
+    """
+    if chess.popcount(board.occupied) > max_pieces or board.castling_rights or board.is_checkmate():
+        return None
+
+    wdl = tablebase.get_wdl(board)
+    if wdl is None:
+        return None
+
+    if abs(wdl) < 2:
+        return 0
+
+    dtz = tablebase.get_dtz(board)
+    score = TABLEBASE_WIN - (min(abs(dtz), TABLEBASE_MAX_DTZ) if dtz is not None else 0)
+    if wdl < 0:
+        score = -score
+
+    return score if board.turn == chess.WHITE else -score
+
+
+async def _evaluate_plies(
+    game: GameTimeline,
+    pool: EnginePool,
+    depth: int,
+    plies: List[int],
+    cache: Optional[EvaluationCache] = None,
+    backward: bool = False,
+    tablebase: Optional[chess.syzygy.Tablebase] = None,
+    tablebase_pieces: int = 5,
+    advance: Optional[Callable[[int], None]] = None,
+) -> Dict[int, int]:
+    """
+    Оценивает на одном движке позиции *после* полуходов `plies`
+    (0 – начальная позиция), в порядке партии или, при `backward`,
+    от конца партии к началу.
+
+    Позиции, которые есть в таблицах `tablebase`, оцениваются по ним
+    (см. `tablebase_score`), остальные сначала ищутся в кэше; движок из
+    пула берётся, только если оценки нашлись не для всех позиций.
+    С таблицами все оценки ограничиваются ±`TABLEBASE_WIN` (в кэш
+    попадают исходные оценки движка).
+    О каждой новой оценке сообщается через `advance(число позиций)`.
+    """
+    evaluations: Dict[int, int] = {}
+
+    if tablebase is not None or cache is not None:
+        unknown: List[Tuple[int, chess.Board]] = []
+        for ply, board in _positions(game, plies):
+            cp = tablebase_score(tablebase, board, tablebase_pieces) if tablebase is not None else None
+            if cp is not None:
+                evaluations[ply] = cp
+            elif cache is not None:
+                unknown.append((ply, board.copy(stack=False)))
+
+        # кэш читается одним запросом вне цикла событий
+        if unknown:
+            scores = await cache.aget_many([board for _, board in unknown], depth)
+            for (ply, _), cp in zip(unknown, scores):
+                if cp is not None:
+                    evaluations[ply] = cp
+
+    if advance is not None and evaluations:
+        advance(len(evaluations))
+
+    missing = [ply for ply in plies if ply not in evaluations]
+
+    if missing:
+        limit = chess.engine.Limit(depth=depth)
+
+        async with pool.engine() as engine:
+            for ply, board in _positions(game, missing, backward):
+                cp = (
+                    (await engine.analyse(board, limit, game=game))["score"]
+                    .white()
+                    .score(mate_score=10000)
+                )
+                evaluations[ply] = cp
+                if advance is not None:
+                    advance(1)
+
+                if cache is not None:
+                    cache.put(board, depth, cp)
+
+    if cache is not None:
+        await cache.aflush()
+
+    # иначе матовая линия, дошедшая до таблиц, дала бы ложный скачок ~9000 cp
+    if tablebase is not None:
+        evaluations = {ply: max(-TABLEBASE_WIN, min(TABLEBASE_WIN, cp)) for ply, cp in evaluations.items()}
+
+    return evaluations
+
+
+async def _evaluate(
+    game: GameTimeline,
+    pool: EnginePool,
+    depth: int,
+    plies: List[int],
+    workers: int = 1,
+    cache: Optional[EvaluationCache] = None,
+    backward: bool = False,
+    tablebase: Optional[chess.syzygy.Tablebase] = None,
+    tablebase_pieces: int = 5,
+    advance: Optional[Callable[[int], None]] = None,
+) -> Dict[int, int]:
+    """
+    Оценивает позиции *после* полуходов `plies` на глубине `depth`.
+
+    При `workers > 1` список делится на `workers` непрерывных кусков,
+    которые оцениваются одновременно на разных движках пула.
+    """
+    workers = max(1, min(workers, len(plies)))
+    bounds = [len(plies) * i // workers for i in range(workers + 1)]
+
+    chunks = await asyncio.gather(*(
+        _evaluate_plies(game, pool, depth, plies[bounds[i]:bounds[i + 1]], cache, backward,
+                        tablebase, tablebase_pieces, advance)
+        for i in range(workers)
+    ))
+
+    evaluations: Dict[int, int] = {}
+    for chunk in chunks:
+        evaluations.update(chunk)
+
+    return evaluations
+
+
+def _swing_plies(evaluations: Dict[int, int], total: int, threshold: int) -> List[int]:
+    """
+    Полуходы, после которых оценка изменилась минимум на `threshold` cp.
+    Учитываются только полуходы, для которых известны обе оценки.
+    """
+    return [
+        ply for ply in range(1, total + 1)
+        if ply in evaluations and ply - 1 in evaluations
+        and abs(evaluations[ply] - evaluations[ply - 1]) >= threshold
+    ]
+
+
+async def evaluate_game(
+    game: GameTimeline,
+    pool: EnginePool,
     threshold: int = 290,
     analysis_depth: int = 16,
-) -> List[Tuple[str, str]]:
+    workers: int = 1,
+    cache: Optional[EvaluationCache] = None,
+    shallow_depth: Optional[int] = None,
+    refine_fraction: float = 0.5,
+    refine_margin: int = 1,
+    backward: bool = False,
+    tablebase: Optional[chess.syzygy.Tablebase] = None,
+    tablebase_pieces: int = 5,
+    known: Optional[Dict[int, int]] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[int, int]:
     """
-    Возвращает список интервалов (startTag, endTag) — «опорные моменты»,
-    где оценка Stockfish изменилась минимум на `threshold` cp.
-    Интервал дополнительно растягивается `extend_interval`, а
-    в результат попадают только те, что длиннее 3 полуходов.
+    Оценки позиций партии на глубине `analysis_depth` по полуходам
+    (0 – начальная позиция), cp с точки зрения белых.
+
+    Движки берутся из общего пула `pool`. При `workers > 1` позиции партии
+    делятся на `workers` непрерывных кусков, которые оцениваются
+    одновременно на разных движках, а оценки собираются обратно по порядку.
+
+    Если передан `cache`, уже известные оценки позиций берутся из него
+    без обращения к движку, а новые – сохраняются.
+
+    Если задан `shallow_depth`, анализ идёт в два прохода:
+      1. все позиции оцениваются на глубине `shallow_depth`;
+      2. на полной глубине `analysis_depth` пересчитываются только позиции
+         в пределах `refine_margin` полуходов от скачков оценки больше
+         `refine_fraction * threshold`.
+    Возвращаются только оценки на полной глубине, то есть пересчитанных позиций.
+
+    При `backward` каждый движок проходит свои позиции от конца партии
+    к началу: таблица транспозиций уже содержит результаты для
+    следующих позиций, и поиск идёт быстрее. Внутри партии движок
+    и его хэш не сбрасываются, `ucinewgame` отправляется только
+    при переходе движка к другой партии.
+
+    Если переданы таблицы Syzygy `tablebase`, позиции не больше чем
+    с `tablebase_pieces` фигурами оцениваются по ним, без движка.
+
+    Уже известные оценки на полной глубине `known` (например, общего
+    с другими партиями дебюта, см. `OpeningTrie`) не пересчитываются
+    и входят в результат.
+
+    Ход анализа сообщается через `progress(оценено, всего позиций)`;
+    при двухпроходном анализе «всего» растёт на число позиций второго прохода.
     """
-    transport, engine = await chess.engine.popen_uci(engine_path)
+    known = known or {}
+    total = len(game)
+    plies = [ply for ply in range(total + 1) if ply not in known]     # 0 – начальная позиция
 
-    game = chess.pgn.read_game(io.StringIO(pgn_string))
-    if game is None:
-        await engine.quit()
-        raise ValueError("PGN-строка не содержит партию.")
+    # позиции с оценкой и всего позиций для `progress`
+    done, expected = len(known), total + 1
 
-    # ── 1. собираем все оценки (позиция *после* каждого хода) ──
-    board = game.board()
-    moves = list(game.mainline_moves())
+    def _advance(count: int) -> None:
+        nonlocal done
+        done += count
+        progress(done, expected)
 
-    evaluations: List[int] = [
-        (await engine.analyse(board, chess.engine.Limit(depth=analysis_depth)))["score"]
-        .white()
-        .score(mate_score=10000)
-    ]
+    advance = _advance if progress is not None else None
+    if progress is not None:
+        progress(done, expected)
 
-    for mv in moves:
-        board.push(mv)
-        cp = (
-            (await engine.analyse(board, chess.engine.Limit(depth=analysis_depth)))["score"]
-            .white()
-            .score(mate_score=10000)
-        )
-        evaluations.append(cp)
+    # ── 1. собираем оценки (позиция *после* каждого хода) ──
+    if shallow_depth is None or shallow_depth >= analysis_depth:
+        evaluations = await _evaluate(game, pool, analysis_depth, plies, workers, cache, backward,
+                                      tablebase, tablebase_pieces, advance)
+    else:
+        shallow = await _evaluate(game, pool, shallow_depth, plies, workers, cache, backward,
+                                  tablebase, tablebase_pieces, advance)
+        shallow.update(known)
+
+        refine = set()
+        for ply in _swing_plies(shallow, total, int(threshold * refine_fraction)):
+            refine.update(range(max(0, ply - 1 - refine_margin), min(total, ply + refine_margin) + 1))
+
+        refine = sorted(refine - known.keys())
+        expected += len(refine)
 
-    result: List[Tuple[str, str]] = []
+        evaluations = await _evaluate(game, pool, analysis_depth, refine, workers, cache,
+                                      backward, tablebase, tablebase_pieces, advance)
 
-    board = game.board()
-    ply = 0
+    evaluations.update(known)
+    return evaluations
 
-    for idx, mv in enumerate(moves, start=1):
-        board.push(mv)
-        ply += 1                    # теперь board = позиция *после* ply-го полухода
 
-        diff = evaluations[idx] - evaluations[idx - 1]
-        if abs(diff) >= threshold:
-            start_tag, end_tag = extend_interval(pgn_string, ply - 1, ply)
-            if end_tag - start_tag > 2:
-                result.append((start_tag, end_tag))
+def swing_moments(game: GameTimeline, evaluations: Dict[int, int], threshold: int = 290) -> List[Tuple[int, int]]:
+    """
+    Интервалы вокруг полуходов, после которых оценка изменилась минимум
+    на `threshold` cp. Интервал растягивается `extend_interval`, а
+    в результат попадают только те, что длиннее 3 полуходов.
+    """
+    result: List[Tuple[int, int]] = []
+
+    for ply in _swing_plies(evaluations, len(game), threshold):
+        start_tag, end_tag = extend_interval(game, ply - 1, ply)
+        if end_tag - start_tag > 2:
+            result.append((start_tag, end_tag))
 
-    await engine.quit()
     return result
 
 
+async def _evaluator(pool: EnginePool, tablebase: Optional[chess.syzygy.Tablebase], tablebase_pieces: int) -> str:
+    """Имя движка для кривой оценок; с таблицами к нему добавляется их предел по фигурам."""
+    name = await pool.version()
+    return f"{name} + syzygy {tablebase_pieces}" if tablebase is not None else name
+
+
+async def stockfish_moments(
+    game: GameTimeline,
+    pool: EnginePool,
+    threshold: int = 290,
+    analysis_depth: int = 16,
+    workers: int = 1,
+    cache: Optional[EvaluationCache] = None,
+    shallow_depth: Optional[int] = None,
+    refine_fraction: float = 0.5,
+    refine_margin: int = 1,
+    backward: bool = False,
+    curve: Optional[EvaluationCurve] = None,
+    tablebase: Optional[chess.syzygy.Tablebase] = None,
+    tablebase_pieces: int = 5,
+    openings: Optional[OpeningTrie] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> List[Tuple[int, int]]:
+    """
+    Возвращает список интервалов — «опорные моменты», где оценка Stockfish
+    изменилась минимум на `threshold` cp (см. `evaluate_game` и `swing_moments`).
+
+    Если передана полная кривая оценок `curve`, полученная на той же
+    глубине тем же движком, движок не запускается: меняется только порог.
+    Иначе пустая или устаревшая `curve` заполняется новыми оценками.
+    Двухпроходный анализ кривую не использует (выбор уточняемых позиций
+    зависит от порога), а только сохраняет в неё уточнённые оценки.
+
+    Позиции не больше чем с `tablebase_pieces` фигурами, которые есть
+    в таблицах Syzygy `tablebase`, оцениваются по таблицам без движка
+    (см. `tablebase_score`); оценки движка тогда ограничиваются
+    ±`TABLEBASE_WIN`, чтобы обе оценки были в одной шкале.
+
+    С деревом дебютов `openings` оценки начала партии, которое совпадает
+    с уже проанализированными партиями, берутся из дерева, а оценки
+    новой партии добавляются в него.
+
+    `progress(оценено, всего позиций)` сообщает ход анализа (см. `evaluate_game`).
+    """
+    # имя движка нужно только кривой и дереву дебютов; без них пул не запускается
+    evaluator = None
+    if curve is not None or openings is not None:
+        evaluator = await _evaluator(pool, tablebase, tablebase_pieces)
+
+    # с полной кривой однопроходный анализ дал бы те же оценки
+    single_pass = shallow_depth is None or shallow_depth >= analysis_depth
+    if curve is not None and single_pass and curve.matches(len(game), analysis_depth, evaluator):
+        return swing_moments(game, curve.evaluations(), threshold)
+
+    known = None
+    if openings is not None:
+        known = openings.match(game.board_at(0), game.moves, analysis_depth, evaluator)
+        logger.debug(f"Opening prefix: {len(known)} of {len(game) + 1} positions already evaluated")
+
+    evaluations = await evaluate_game(game, pool, threshold, analysis_depth, workers, cache,
+                                      shallow_depth, refine_fraction, refine_margin, backward,
+                                      tablebase, tablebase_pieces, known, progress)
+    if curve is not None:
+        curve.fill(evaluations, len(game), analysis_depth, evaluator)
+    if openings is not None:
+        openings.add(game.board_at(0), game.moves, evaluations, analysis_depth, evaluator)
+
+    return swing_moments(game, evaluations, threshold)
+
+
+@register
+class EngineDetector(Detector):
+    """
+    Скачки оценки движка (см. `stockfish_moments`). Хуков на доске нет:
+    запись в реестре нужна, чтобы движок включался и выключался
+    в запросе анализа наравне с эвристиками.
+    """
+
+    name = "engine"
+    cost = Cost.EXPENSIVE
+    needs_engine = True
+
+
+# эвристики, которые по умолчанию прогоняются за один общий проход по партии
+DEFAULT_DETECTORS: List[Type[Detector]] = [
+    detector for detector in select_detectors() if not detector.needs_engine
+]
+
+
+def detect_moments(pgn_string: str,
+                   detectors: Iterable[Type[Detector]] = DEFAULT_DETECTORS) -> List[Tuple[int, int]]:
+    """
+    Разбирает партию и прогоняет эвристические детекторы.
+
+    Функция уровня модуля, чтобы её можно было выполнить в процессе
+    `DetectorPool`: на вход – строка PGN, на выход – список интервалов
+    в полуходах.
+    """
+    return run_detectors(GameTimeline.from_pgn(pgn_string), detectors)
+
 
 def find_moments_without_stockfish(pgn_string):
-    moments = detect_forks(pgn_string) + detect_pins(pgn_string) + detect_sacrifices(pgn_string) + detect_sacrifices(pgn_string)
+    moments = detect_moments(pgn_string)
     return intervals_format(merge_intervals(moments))
 
-async def find_all_moments(pgn_string, engine_path):
-    moments = detect_forks(pgn_string) + detect_pins(pgn_string) + detect_sacrifices(pgn_string) + detect_sacrifices(pgn_string) + (await stockfish_moments(pgn_string, engine_path))
-    return intervals_format(merge_intervals(moments))
+async def _engine_moments(game: GameTimeline, pool: EnginePool, enabled: bool,
+                          **engine_options) -> Tuple[List[Tuple[int, int]], Optional[DetectorStats]]:
+    """`stockfish_moments` с замером времени; без движка – пустой результат."""
+    if not enabled:
+        return [], None
 
+    started = time.perf_counter()
+    moments = await stockfish_moments(game, pool, **engine_options)
+    return moments, DetectorStats(EngineDetector.name, time.perf_counter() - started, len(game), len(moments))
+
+
+async def find_all_moments(pgn_string, pool: EnginePool,
+                           detector_pool: Optional[DetectorPool] = None,
+                           enabled: Optional[Iterable[str]] = None,
+                           stats: Optional[List[DetectorStats]] = None,
+                           **engine_options):
+    """
+    Интервалы детекторов с именами `enabled` (по умолчанию – детекторы
+    с `default`, см. `select_detectors`), объединённые и в формате тегов.
 
-# pgn_string = "1. e4 e5 2. Nf3 Nc6 3. Bc4 Nf6 4. Ng5 d6 5. Nxf7 Be6 6. Nxh8 Bxc4 7. Qh5+ Nxh5 8. d3 Be6"
-# engine_path = "C:/Users/Thinkpad/Desktop/Гоша/Friflex/stockfish-windows-x86-64-avx2/stockfish/stockfish-windows-x86-64-avx2.exe"
-# print(find_all_moments(pgn_string, engine_path))
-# print(find_moments_without_stockfish(pgn_string))
+    Замеры каждого детектора пишутся в лог, а если передан список
+    `stats` – ещё и добавляются в него.
+    """
+    game = GameTimeline.from_pgn(pgn_string)
+    detectors = select_detectors(enabled)
+    heuristic_detectors = [detector for detector in detectors if not detector.needs_engine]
+    use_engine = EngineDetector in detectors
+
+    if detector_pool is None:
+        heuristics, heuristic_stats = profile_detectors(game, heuristic_detectors)
+        engine_moments, engine_stats = await _engine_moments(game, pool, use_engine, **engine_options)
+    else:
+        # эвристики считаются в отдельном процессе, пока движки анализируют партию;
+        # в процесс передаётся уже разобранная партия, а не PGN
+        (heuristics, heuristic_stats), (engine_moments, engine_stats) = await asyncio.gather(
+            detector_pool.run(profile_detectors, game, heuristic_detectors),
+            _engine_moments(game, pool, use_engine, **engine_options),
+        )
+
+    run_stats = heuristic_stats + ([engine_stats] if engine_stats is not None else [])
+    for entry in run_stats:
+        logger.info(f"Detector {entry.name}: {entry.seconds:.3f}s, "
+                    f"{entry.plies} plies, {entry.intervals} intervals")
+    if stats is not None:
+        stats.extend(run_stats)
+
+    moments = list(heuristics) + engine_moments
+    return intervals_format(merge_intervals(moments))
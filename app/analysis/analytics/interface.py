@@ -1,15 +1,136 @@
-from typing import List, Tuple
+import hashlib
+import inspect
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import chess.syzygy
 
 from app.core.analysis_base import AbstractAnalysisStrategy
-from .heuristic_functions import find_all_moments
+from . import attack_map, heuristic_functions, pgn_reader, timeline, util
+from .detector_pool import DetectorPool
+from .engine_pool import EnginePool
+from .evaluation_cache import EvaluationCache
+from .features import FeatureStore
+from .heuristic_functions import EngineDetector, find_all_moments, select_detectors, stockfish_moments
+from .opening_trie import OpeningTrie
 from ...config import settings
 
+# общий для всего приложения пул движков, запускается в lifespan FastAPI
+engine_pool = EnginePool(settings.analysis.engine_path, settings.analysis.engine_pool_size)
+
+# процессы для эвристических детекторов, запускаются в lifespan FastAPI
+detector_pool = DetectorPool(settings.analysis.detector_processes)
+
+# постоянный кэш оценок движка, если задан путь к файлу
+evaluation_cache = (
+    EvaluationCache(settings.analysis.evaluation_cache_path, settings.analysis.evaluation_cache_size)
+    if settings.analysis.evaluation_cache_path else None
+)
+
+# кэш массивов признаков партий на диске, если задан каталог
+feature_store = FeatureStore(settings.analysis.feature_cache_dir) if settings.analysis.feature_cache_dir else None
+
+
+def _open_tablebase(path: str) -> chess.syzygy.Tablebase:
+    """Таблицы Syzygy из каталогов `path`, разделённых os.pathsep, как SyzygyPath у Stockfish."""
+    directories = [directory for directory in path.split(os.pathsep) if directory]
+    tablebase = chess.syzygy.Tablebase()
+    for directory in directories:
+        tablebase.add_directory(directory)
+    return tablebase
+
+
+# таблицы эндшпиля Syzygy, если задан путь к ним; закрываются в lifespan FastAPI
+tablebase = _open_tablebase(settings.analysis.syzygy_path) if settings.analysis.syzygy_path else None
+
+# дерево дебютов проанализированных партий; 0 полуходов – без него
+opening_trie = (
+    OpeningTrie(settings.analysis.opening_trie_plies, settings.analysis.opening_trie_nodes)
+    if settings.analysis.opening_trie_plies else None
+)
+
+
+def default_engine_options() -> Dict[str, Any]:
+    """Параметры `stockfish_moments` из настроек приложения."""
+    return dict(
+        workers=settings.analysis.engine_workers_per_game,
+        cache=evaluation_cache,
+        shallow_depth=settings.analysis.shallow_depth,
+        refine_fraction=settings.analysis.refine_fraction,
+        backward=settings.analysis.backward_analysis,
+        tablebase=tablebase,
+        tablebase_pieces=settings.analysis.syzygy_max_pieces,
+        openings=opening_trie,
+    )
+
+
+def _source_version(*modules) -> str:
+    """Хэш исходного кода модулей; меняется при любой правке в них."""
+    digest = hashlib.sha256()
+    for module in modules:
+        with open(module.__file__, "rb") as source:
+            digest.update(source.read().replace(b"\r\n", b"\n"))
+    return digest.hexdigest()[:16]
+
+
+# версия детекторов для кэша результатов: код, от которого зависят найденные интервалы
+DETECTORS_VERSION = _source_version(heuristic_functions, util, attack_map, timeline, pgn_reader)
+
+# параметры stockfish_moments, которые не влияют на найденные интервалы
+_ENGINE_OPTIONS_WITHOUT_EFFECT = {"workers", "curve", "progress"}
+
+# источники готовых оценок: и кэш оценок (в нём бывают оценки глубже
+# запрошенной), и дерево дебютов (оценки из других партий) заменяют поиск
+# на глубине analysis_depth, поэтому результат с ними может отличаться от
+# результата свежего поиска; в ключ попадает только факт их использования
+_STORED_EVALUATIONS = ("tablebase", "cache", "openings")
+
+
+def _engine_parameters(**engine_options) -> Dict[str, Any]:
+    """Параметры `stockfish_moments` со значениями по умолчанию, влияющие на результат."""
+    parameters = {
+        name: parameter.default
+        for name, parameter in inspect.signature(stockfish_moments).parameters.items()
+        if parameter.default is not inspect.Parameter.empty
+    }
+    parameters.update(engine_options)
+    # сами таблицы, кэш и дерево в ключ не попадают: важно только, используются ли они
+    for name in _STORED_EVALUATIONS:
+        parameters[name] = parameters[name] is not None
+    return {name: value for name, value in parameters.items() if name not in _ENGINE_OPTIONS_WITHOUT_EFFECT}
+
 
 class AnalyticsStrategy(AbstractAnalysisStrategy):
 
     async def analyze(self, pgn_data: str,
-                      engine_path: str = settings.analysis.engine_path
+                      pool: EnginePool = engine_pool,
+                      detectors: DetectorPool = detector_pool,
+                      enabled: Optional[Iterable[str]] = None,
+                      **engine_options
                       ) -> List[Tuple[str, str]]:
-        heuristics = await find_all_moments(pgn_data, engine_path)
+        heuristics = await find_all_moments(pgn_data, pool, detectors, enabled,
+                                            **{**default_engine_options(), **engine_options})
 
         return heuristics
+
+    async def parameters(self,
+                         pool: EnginePool = engine_pool,
+                         enabled: Optional[Iterable[str]] = None,
+                         **engine_options
+                         ) -> Dict[str, Any]:
+        """
+        Набор детекторов, версия их кода и, если включён движок, параметры
+        `stockfish_moments` и версия движка: при смене любой из версий
+        ключ кэша результатов меняется, и старые результаты не используются.
+        """
+        detectors = select_detectors(enabled)
+        parameters = {
+            "detectors": [detector.name for detector in detectors],
+            "detectors_version": DETECTORS_VERSION,
+        }
+
+        if EngineDetector in detectors:
+            parameters["engine"] = _engine_parameters(**{**default_engine_options(), **engine_options})
+            parameters["engine_version"] = await pool.version()
+
+        return parameters
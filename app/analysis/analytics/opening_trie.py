@@ -0,0 +1,140 @@
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import chess
+
+from .evaluation_curve import EvaluationCurve
+
+
+class _Node:
+    __slots__ = ("children", "scores")
+
+    def __init__(self):
+        self.children: Dict[chess.Move, "_Node"] = {}
+        # оценки позиции узла по (глубина, движок)
+        self.scores: Dict[Tuple[int, str], int] = {}
+
+
+class OpeningTrie:
+    """
+    Дерево ходов уже проанализированных партий. Узел – позиция после
+    последовательности ходов от начальной позиции партии, в узле – оценки
+    движка этой позиции по (глубина, движок).
+
+    Партии в одном дебюте идут одной веткой дерева, поэтому для общего
+    начала оценки берутся из дерева, а движок начинает с первого нового
+    полухода (см. `stockfish_moments`). Хранятся только первые `max_plies`
+    полуходов партии: дальше партии почти не совпадают. Узлов в дереве
+    не больше `max_nodes`: когда они кончаются, новые ветки не растут,
+    а оценки уже известных позиций по-прежнему записываются.
+    """
+
+    def __init__(self, max_plies: int = 40, max_nodes: int = 200_000):
+        self.max_plies = max_plies
+        self.max_nodes = max_nodes
+        self.loaded = False           # добавлены ли уже партии из базы
+        self.nodes = 0
+        self._roots: Dict[str, _Node] = {}
+
+    @property
+    def full(self) -> bool:
+        return self.nodes >= self.max_nodes
+
+    def add(self, board: chess.Board, moves: Sequence[chess.Move],
+            evaluations: Dict[int, int], depth: int, engine: str) -> None:
+        """
+        Добавляет начало партии с начальной позицией `board` и оценками
+        её позиций по полуходам (0 – начальная позиция).
+        """
+        node = self._roots.get(board.fen())
+        if node is None:
+            if self.full:
+                return
+            node = self._roots[board.fen()] = _Node()
+            self.nodes += 1
+
+        for ply in range(min(len(moves), self.max_plies) + 1):
+            if ply:
+                child = node.children.get(moves[ply - 1])
+                if child is None:
+                    if self.full:
+                        return
+                    child = node.children[moves[ply - 1]] = _Node()
+                    self.nodes += 1
+                node = child
+
+            if ply in evaluations:
+                node.scores[(depth, engine)] = evaluations[ply]
+
+    def match(self, board: chess.Board, moves: Sequence[chess.Move],
+              depth: int, engine: str) -> Dict[int, int]:
+        """
+        Оценки позиций начала партии, которое уже есть в дереве с оценками
+        на глубине `depth` движком `engine`, – до первого нового полухода.
+        """
+        evaluations: Dict[int, int] = {}
+        node: Optional[_Node] = self._roots.get(board.fen())
+        last = min(len(moves), self.max_plies)
+
+        ply = 0
+        while node is not None:
+            cp = node.scores.get((depth, engine))
+            if cp is None:
+                break
+
+            evaluations[ply] = cp
+            if ply == last:
+                break
+
+            node = node.children.get(moves[ply])
+            ply += 1
+
+        return evaluations
+
+    def absorb(self, loaded: "OpeningTrie") -> None:
+        """
+        Берёт себе дерево `loaded`, построенное из базы в другом процессе
+        (см. `build_opening_trie`), и переносит в него то, что было
+        добавлено сюда за время его построения.
+        """
+        for fen, root in self._roots.items():
+            into = loaded._roots.get(fen)
+            if into is None:
+                if loaded.full:
+                    continue
+                into = loaded._roots[fen] = _Node()
+                loaded.nodes += 1
+            loaded._merge(into, root)
+
+        self._roots, self.nodes = loaded._roots, loaded.nodes
+        self.loaded = True
+
+    def _merge(self, into: _Node, node: _Node) -> None:
+        into.scores.update(node.scores)
+        for move, child in node.children.items():
+            target = into.children.get(move)
+            if target is None:
+                if self.full:
+                    continue
+                target = into.children[move] = _Node()
+                self.nodes += 1
+            self._merge(target, child)
+
+
+def build_opening_trie(openings: Iterable[Tuple[str, str, bytes, int, str]],
+                       max_plies: int, max_nodes: int) -> OpeningTrie:
+    """
+    Дерево дебютов из сохранённых начал партий: начальная позиция (FEN),
+    ходы UCI через пробел и байты кривой оценок этих позиций с глубиной
+    и движком. Выполняется в пуле процессов, а не в цикле событий.
+    """
+    trie = OpeningTrie(max_plies, max_nodes)
+    for start, opening, scores, depth, engine in openings:
+        if trie.full:
+            break
+
+        moves = [chess.Move.from_uci(uci) for uci in opening.split()]
+        evaluations = EvaluationCurve.from_bytes(scores, depth, engine).evaluations()
+        trie.add(chess.Board(start), moves, evaluations, depth, engine)
+
+    trie.loaded = True
+    return trie
@@ -0,0 +1,105 @@
+import io
+import re
+from typing import Dict, Iterator, List, Optional, TextIO
+
+import chess
+import chess.pgn
+
+TIMESTAMP_REGEX = re.compile(r"\[%ts (\d+)\]")
+
+
+class MainlineGame:
+    """
+    Основная линия партии в плоском виде – без дерева `GameNode`.
+
+    Хранит:
+      • заголовки (`chess.pgn.Headers`, как у `read_game`);
+      • начальную позицию;
+      • ходы и их SAN в том виде, как они записаны в PGN;
+      • значения `[%ts …]` (мс) и `[%clk …]` (секунды) из комментариев,
+        по номеру полухода (с единицы).
+
+    Ошибки разбора складываются в `errors`; как и в `read_game`,
+    после нелегального хода остаток партии пропускается.
+    """
+
+    def __init__(self):
+        self.headers = chess.pgn.Headers()
+        self.board: Optional[chess.Board] = None
+        self.moves: List[chess.Move] = []
+        self.san: List[str] = []
+        self.timestamps: Dict[int, int] = {}
+        self.clocks: Dict[int, float] = {}
+        self.errors: List[Exception] = []
+
+    def __len__(self) -> int:
+        return len(self.moves)
+
+
+class MainlineBuilder(chess.pgn.BaseVisitor[MainlineGame]):
+    """
+    Визитор для `chess.pgn.read_game`, который вместо дерева партии
+    собирает `MainlineGame`. Вариации пропускаются токенизатором целиком.
+    """
+
+    def begin_game(self) -> None:
+        self.game = MainlineGame()
+
+    def begin_headers(self) -> chess.pgn.Headers:
+        return self.game.headers
+
+    def visit_header(self, tagname: str, tagvalue: str) -> None:
+        self.game.headers[tagname] = tagvalue
+
+    def visit_board(self, board: chess.Board) -> None:
+        if self.game.board is None:
+            self.game.board = board.copy(stack=False)
+
+    def begin_variation(self) -> chess.pgn.SkipType:
+        return chess.pgn.SKIP
+
+    def parse_san(self, board: chess.Board, san: str) -> chess.Move:
+        move = board.parse_san(san)
+        self.game.san.append(san)
+        return move
+
+    def visit_move(self, board: chess.Board, move: chess.Move) -> None:
+        self.game.moves.append(move)
+
+    def visit_comment(self, comment: str) -> None:
+        # комментарий до первого хода относится к партии, а не к ходу
+        ply = len(self.game.moves)
+        if not ply:
+            return
+
+        ts_match = TIMESTAMP_REGEX.search(comment)
+        if ts_match and ply not in self.game.timestamps:
+            self.game.timestamps[ply] = int(ts_match.group(1))
+
+        clk_match = chess.pgn.CLOCK_REGEX.search(comment)
+        if clk_match and ply not in self.game.clocks:
+            self.game.clocks[ply] = (int(clk_match.group("hours")) * 3600
+                                     + int(clk_match.group("minutes")) * 60
+                                     + float(clk_match.group("seconds")))
+
+    def visit_result(self, result: str) -> None:
+        # как в GameBuilder: результат из текста партии дополняет заголовок «*»
+        if self.game.headers.get("Result", "*") == "*":
+            self.game.headers["Result"] = result
+
+    def handle_error(self, error: Exception) -> None:
+        self.game.errors.append(error)
+
+    def result(self) -> MainlineGame:
+        return self.game
+
+
+def read_mainline(pgn: str) -> Optional[MainlineGame]:
+    """Разбирает первую партию из PGN-строки; None, если партии нет."""
+    return chess.pgn.read_game(io.StringIO(pgn), Visitor=MainlineBuilder)
+
+
+def iter_mainlines(handle: TextIO) -> Iterator[MainlineGame]:
+    """Потоково читает все партии из файла с несколькими партиями."""
+    while (game := chess.pgn.read_game(handle, Visitor=MainlineBuilder)) is not None:
+        yield game
@@ -1,5 +1,7 @@
 import chess
 
+from .util import static_exchange
+
 # fen = "rnbq2k1/pp3rpp/2P2n2/4pp2/1bB5/2NP1P2/PPPBN1PP/R2QK2R b KQ - 0 9"
 # board = chess.Board(fen)
 #print(board)
@@ -335,127 +337,11 @@ def possible_block_pin_square(board, square, figure_positions):
 
     return False
 
-# Определяет можно ли выиграть фигуру на заданном поле (выигрыш пешки - так же пешки)
-# Проблема методов attackers, attacks в том, что связанная фигура также считается
-# Нужно добавить взятие на проходе
+# Определяет, могут ли белые выиграть материал, начав размен на заданном поле
+# (выигрыш пешки - так же пешки)
 def may_be_winned_material(board, square):
-    if not board.piece_at(square):
-        return False
-
-    if not board.is_attacked_by(chess.WHITE, square):
+    piece = board.piece_at(square)
+    if not piece or piece.color != chess.BLACK:
         return False
 
-    if board.is_attacked_by(chess.BLACK, square):
-        piece_at_square = board.piece_at(square).symbol()
-
-        white_attackers = [board.piece_at(square).symbol() for square in board.attackers(chess.WHITE, square)]
-        white_pawns = 0
-        white_light_figures = 0
-        white_heavy_figures = 0
-        white_rooks = 0
-        for piece in white_attackers:
-            if piece == 'P':
-                white_pawns += 1
-            elif piece == 'N' or piece == 'B':
-                white_light_figures += 1
-            elif piece == 'Q' or piece == 'K':
-                white_heavy_figures += 1
-            elif piece == 'R':
-                white_heavy_figures += 1
-                white_rooks += 1
-
-        if piece_at_square == 'q':
-            if white_pawns + white_light_figures + white_rooks > 0:
-                return True
-            if white_heavy_figures > 0:
-                return True
-            return False
-
-        black_attackers = [board.piece_at(square).symbol() for square in board.attackers(chess.BLACK, square)]
-        black_pawns = 0
-        black_light_figures = 0
-        black_heavy_figures = 0
-        for piece in black_attackers:
-            if piece == 'p':
-                black_pawns += 1
-            elif piece == 'n' or piece == 'b':
-                black_light_figures += 1
-            elif piece == 'q' or piece == 'r' or piece == 'k':
-                black_heavy_figures += 1
-
-        if piece_at_square == 'r':
-            if white_pawns + white_light_figures > 0:
-                return True
-            if white_rooks > 0:
-                if black_light_figures + black_pawns <= 1:
-                    return len(black_attackers) < len(white_attackers)
-
-                if black_light_figures + black_pawns > 1:
-                    return False
-
-
-        if piece_at_square == 'b' or piece_at_square == 'n':
-            if white_pawns > 0:
-                return True
-
-            if black_pawns == 0:
-                if white_light_figures > 0:
-                    if white_light_figures - black_light_figures > 1:
-                        return True
-                    if white_light_figures - black_light_figures >= -1:
-                        return len(black_attackers) < len(white_attackers)
-                    if white_light_figures - black_light_figures < -1:
-                        return False
-
-                if black_light_figures > 1:
-                    return False
-
-                if black_light_figures == 1:
-                    return len(black_attackers) < len(white_attackers)
-
-                return len(black_attackers) < len(white_attackers)
-
-            if black_pawns == 1:
-                if white_light_figures > 0:
-                    if white_light_figures - black_light_figures < 1:
-                        return False
-                    return len(black_attackers) < len(white_attackers)
-                return False
-
-            if black_pawns > 1:
-                return False
-
-        if piece_at_square == 'p':
-            if black_pawns == white_pawns:
-                if white_light_figures > 0:
-                    if white_light_figures - black_light_figures > 2:
-                        return True
-
-                    if white_light_figures - black_light_figures >= -1:
-                        return len(black_attackers) < len(white_attackers)
-
-                    if white_light_figures - black_light_figures < -1:
-                        return False
-                if black_light_figures > 0:
-                    return False
-                return len(black_attackers) < len(white_attackers)
-
-            if white_pawns - black_pawns == 1:
-                if black_light_figures > 0:
-                    if black_light_figures - white_light_figures > 2:
-                        return False
-
-                    if black_light_figures - white_light_figures >= -1:
-                        return len(black_attackers) < len(white_attackers)
-
-                    if black_light_figures - white_light_figures < -1:
-                        return True
-                if white_light_figures > 0:
-                    return False
-                return len(black_attackers) < len(white_attackers)
-
-            if white_pawns - black_pawns == 2:
-                return True
-
-            if black_pawns > white_pawns:
-                return False
+    return static_exchange(board, square) > 0
@@ -0,0 +1,88 @@
+from typing import List
+
+import chess
+
+from .pgn_reader import read_mainline
+
+# через сколько полуходов сохраняется контрольная позиция
+CHECKPOINT_EVERY = 16
+
+
+class GameTimeline:
+    """
+    Компактная «лента» партии, которая строится один раз на всю партию.
+
+    Хранит:
+      • список ходов основной линии;
+      • битовые массивы `is_capture` / `gives_check` для каждого полухода;
+      • контрольные позиции каждые `checkpoint_every` полуходов
+        для быстрого доступа к позиции после произвольного полухода.
+
+    Полуходы нумеруются с единицы, как и во всех детекторах:
+    ply = 1 – первый ход белых, позиция после 0 полуходов – начальная.
+    """
+
+    def __init__(self, start: chess.Board, moves: List[chess.Move],
+                 checkpoint_every: int = CHECKPOINT_EVERY):
+        if checkpoint_every < 1:
+            raise ValueError("checkpoint_every должен быть положительным")
+
+        self.moves = moves
+        self.checkpoint_every = checkpoint_every
+
+        size = (len(moves) + 7) // 8
+        self._captures = bytearray(size)
+        self._checks = bytearray(size)
+        self._checkpoints: List[chess.Board] = []
+
+        board = start.copy(stack=False)
+        for idx, move in enumerate(moves):
+            if idx % checkpoint_every == 0:
+                self._checkpoints.append(board.copy(stack=False))
+
+            if board.is_capture(move):
+                self._captures[idx >> 3] |= 1 << (idx & 7)
+            if board.gives_check(move):
+                self._checks[idx >> 3] |= 1 << (idx & 7)
+
+            board.push(move)
+
+        if len(moves) % checkpoint_every == 0:
+            self._checkpoints.append(board.copy(stack=False))
+
+    @classmethod
+    def from_pgn(cls, pgn: str, checkpoint_every: int = CHECKPOINT_EVERY) -> "GameTimeline":
+        game = read_mainline(pgn)
+        if game is None:
+            raise ValueError("PGN-строка не содержит партию.")
+
+        return cls(game.board, game.moves, checkpoint_every)
+
+    def __len__(self) -> int:
+        return len(self.moves)
+
+    def is_capture(self, ply: int) -> bool:
+        """Является ли ply-й полуход взятием."""
+        idx = ply - 1
+        return bool(self._captures[idx >> 3] >> (idx & 7) & 1)
+
+    def gives_check(self, ply: int) -> bool:
+        """Объявляет ли ply-й полуход шах."""
+        idx = ply - 1
+        return bool(self._checks[idx >> 3] >> (idx & 7) & 1)
+
+    def board_at(self, ply: int) -> chess.Board:
+        """
+        Возвращает новую доску с позицией *после* ply-го полухода
+        (ply = 0 – начальная позиция). Доигрывается не больше
+        `checkpoint_every - 1` ходов от ближайшей контрольной позиции.
+        """
+        if not 0 <= ply <= len(self.moves):
+            raise IndexError(f"Полуход {ply} вне партии из {len(self.moves)} полуходов")
+
+        base = ply // self.checkpoint_every
+        board = self._checkpoints[base].copy(stack=False)
+        for move in self.moves[base * self.checkpoint_every:ply]:
+            board.push(move)
+
+        return board
@@ -1,4 +1,4 @@
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 import chess
 from chess import Color, Board, Square, Piece
 from chess import KING, QUEEN, ROOK, BISHOP, KNIGHT, PAWN, WHITE, BLACK
@@ -62,14 +62,6 @@ def is_defended(board: Board, piece: Piece, square: Square) -> bool:
 def is_hanging(board: Board, piece: Piece, square: Square) -> bool:
     return not is_defended(board, piece, square)
 
-def can_be_taken_by_lower_piece(board: Board, piece: Piece, square: Square) -> bool:
-    for attacker_square in board.attackers(not piece.color, square):
-        attacker = board.piece_at(attacker_square)
-        assert(attacker)
-        if attacker.piece_type != chess.KING and values[attacker.piece_type] < values[piece.piece_type]:
-            return True
-    return False
-
 def can_be_taken_by_same_piece(board: Board, piece: Piece, square: Square) -> bool:
     for attacker_square in board.attackers(not piece.color, square):
         attacker = board.piece_at(attacker_square)
@@ -78,12 +70,95 @@ def can_be_taken_by_same_piece(board: Board, piece: Piece, square: Square) -> bo
             return True
     return False
 
+# --- статический размен (SEE) --------------------------------------------
+
+SEE_MEMO_SIZE = 1 << 16
+
+# (расстановка фигур, поле) → результат static_exchange
+_see_memo: Dict[Tuple[Tuple[int, ...], Square], int] = {}
+
+
+def _least_valuable_attacker(board: Board, attackers: chess.Bitboard) -> Optional[Square]:
+    for mask in (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings):
+        if attackers & mask:
+            return chess.lsb(attackers & mask)
+    return None
+
+
+def _swap(board: Board, square: Square, first: Square) -> int:
+    """
+    Алгоритм обмена: первым бьёт фигура с поля first, дальше стороны
+    по очереди бьют самой дешёвой фигурой и могут остановиться, когда
+    продолжение невыгодно. Линейные фигуры за ушедшими («рентген»)
+    учитываются пересчётом атак при новой занятости доски.
+    """
+    occupied = board.occupied
+    side = board.color_at(first)
+    attacker = first
+
+    gains = [king_values[board.piece_type_at(square)]]
+    while True:
+        gains.append(king_values[board.piece_type_at(attacker)] - gains[-1])
+        if max(-gains[-2], gains[-1]) < 0:
+            break
+
+        occupied ^= chess.BB_SQUARES[attacker]
+        side = not side
+
+        attackers = board.attackers_mask(side, square, occupied) & occupied
+        attacker = _least_valuable_attacker(board, attackers)
+        if attacker is None:
+            break
+
+        # король бьёт последним: под защитой поля он взять не может
+        if board.kings & chess.BB_SQUARES[attacker] and \
+                board.attackers_mask(not side, square, occupied ^ chess.BB_SQUARES[attacker]) & occupied:
+            break
+
+    gains.pop()
+    while len(gains) > 1:
+        last = gains.pop()
+        gains[-1] = -max(-gains[-1], last)
+    return gains[0]
+
+
+def static_exchange(board: Board, square: Square) -> int:
+    """
+    Сколько (в пешках) выигрывает соперник фигуры на square, начав размен
+    на этом поле самой дешёвой атакующей фигурой; 0 – если бить невыгодно
+    или нечем. Связки и взятие на проходе не учитываются.
+
+    Результат запоминается по расстановке фигур и полю: он не зависит
+    от очереди хода и прав на рокировку.
+    """
+    key = (board.occupied_co[WHITE], board.occupied_co[BLACK], board.pawns, board.knights,
+           board.bishops, board.rooks, board.queens, board.kings), square
+
+    result = _see_memo.get(key)
+    if result is None:
+        piece = board.piece_at(square)
+        attackers = board.attackers_mask(not piece.color, square) if piece else chess.BB_EMPTY
+        first = _least_valuable_attacker(board, attackers)
+
+        result = max(0, _swap(board, square, first)) if first is not None else 0
+
+        if len(_see_memo) >= SEE_MEMO_SIZE:
+            _see_memo.clear()
+        _see_memo[key] = result
+
+    return result
+
+
+def static_exchange_move(board: Board, move: chess.Move) -> int:
+    """Итог размена (в пешках) для стороны, делающей взятие move."""
+    if not board.piece_at(move.to_square):
+        return 0
+    return _swap(board, move.to_square, move.from_square)
+
+
 def is_in_bad_spot(board: Board, square: Square) -> bool:
-    # hanging or takeable by lower piece
-    piece = board.piece_at(square)
-    assert(piece)
-    return (bool(board.attackers(not piece.color, square)) and
-            (is_hanging(board, piece, square) or can_be_taken_by_lower_piece(board, piece, square)))
+    # соперник выигрывает материал, начав размен на этом поле
+    return static_exchange(board, square) > 0
 
 def is_trapped(board: Board, square: Square) -> bool:
     if board.is_check() or board.is_pinned(board.turn, square):
@@ -116,156 +191,6 @@ def attacker_pieces(board: Board, color: Color, square: Square) -> List[Piece]:
 #             t.append((board.piece_at(attack.from_square), attack.from_square))
 #     return t
 
-def may_be_winned_black_pawn(board, square):
-    if board.piece_at(square).symbol() != 'p':
-        return False
-
-    if not board.is_attacked_by(chess.WHITE, square):
-        return False
-
-    if board.is_attacked_by(chess.BLACK, square):
-
-        white_attackers = [board.piece_at(square).symbol() for square in board.attackers(chess.WHITE, square)]
-        white_pawns = 0
-        white_light_figures = 0
-        white_heavy_figures = 0
-        white_rooks = 0
-        for piece in white_attackers:
-            if piece == 'P':
-                white_pawns += 1
-            elif piece == 'N' or piece == 'B':
-                white_light_figures += 1
-            elif piece == 'Q' or piece == 'K':
-                white_heavy_figures += 1
-            elif piece == 'R':
-                white_heavy_figures += 1
-                white_rooks += 1
-
-        black_attackers = [board.piece_at(square).symbol() for square in board.attackers(chess.BLACK, square)]
-        black_pawns = 0
-        black_light_figures = 0
-        black_heavy_figures = 0
-        for piece in black_attackers:
-            if piece == 'p':
-                black_pawns += 1
-            elif piece == 'n' or piece == 'b':
-                black_light_figures += 1
-            elif piece == 'q' or piece == 'r' or piece == 'k':
-                black_heavy_figures += 1
-        if black_pawns == white_pawns:
-            if white_light_figures > 0:
-                if white_light_figures - black_light_figures > 2:
-                    return True
-
-                if white_light_figures - black_light_figures >= -1:
-                    return len(black_attackers) < len(white_attackers)
-
-                if white_light_figures - black_light_figures < -1:
-                    return False
-            if black_light_figures > 0:
-                return False
-            return len(black_attackers) < len(white_attackers)
-
-        if white_pawns - black_pawns == 1:
-            if black_light_figures > 0:
-                if black_light_figures - white_light_figures > 2:
-                    return False
-
-                if black_light_figures - white_light_figures >= -1:
-                    return len(black_attackers) < len(white_attackers)
-
-                if black_light_figures - white_light_figures < -1:
-                    return True
-            if white_light_figures > 0:
-                return False
-            return len(black_attackers) < len(white_attackers)
-
-        if white_pawns - black_pawns == 2:
-            return True
-
-        if black_pawns > white_pawns:
-            return False
-
-def may_be_winned_white_pawn(board, square):
-    if board.piece_at(square).symbol() != 'P':
-        return False
-
-    if not board.is_attacked_by(chess.BLACK, square): # есть ли нападения противника
-        return False
-
-    if board.is_attacked_by(chess.WHITE, square): # Есть ли защитники
-
-        white_attackers = [board.piece_at(square).symbol() for square in board.attackers(chess.WHITE, square)]
-        white_pawns = 0
-        white_light_figures = 0
-        white_heavy_figures = 0
-        white_rooks = 0
-        for piece in white_attackers:
-            if piece == 'P':
-                white_pawns += 1
-            elif piece == 'N' or piece == 'B':
-                white_light_figures += 1
-            elif piece == 'Q' or piece == 'K':
-                white_heavy_figures += 1
-            elif piece == 'R':
-                white_heavy_figures += 1
-                white_rooks += 1
-
-        black_attackers = [board.piece_at(square).symbol() for square in board.attackers(chess.BLACK, square)]
-        black_pawns = 0
-        black_light_figures = 0
-        black_heavy_figures = 0
-        for piece in black_attackers:
-            if piece == 'p':
-                black_pawns += 1
-            elif piece == 'n' or piece == 'b':
-                black_light_figures += 1
-            elif piece == 'q' or piece == 'r' or piece == 'k':
-                black_heavy_figures += 1
-
-
-        if white_pawns == black_pawns:
-            if black_light_figures > 0:
-                if black_light_figures - white_light_figures > 2:
-                    return True
-
-                if black_light_figures - white_light_figures >= -1:
-                    return len(black_attackers) > len(white_attackers)
-
-                if black_light_figures - white_light_figures < -1:
-                    return False
-            if white_light_figures > 0:
-                return False
-            return len(black_attackers) > len(white_attackers)
-
-        if black_pawns - white_pawns == 1:
-            if white_light_figures > 0:
-                if white_light_figures - black_light_figures > 2:
-                    return False
-
-                if white_light_figures - black_light_figures >= -1:
-                    return len(black_attackers) > len(white_attackers)
-
-                if white_light_figures - black_light_figures < -1:
-                    return True
-            if black_light_figures > 0:
-                return False
-            return len(black_attackers) > len(white_attackers)
-
-        if black_pawns - white_pawns == 2:
-            return True
-
-        if white_pawns > black_pawns:
-            return False
-
-def may_be_winned_pawn(board, square, turn_color):
-    if turn_color == chess.WHITE:
-        return may_be_winned_black_pawn(board, square)
-    elif turn_color == chess.BLACK:
-        return may_be_winned_white_pawn(board, square)
-    else:
-        raise ValueError("Неизвестный цвет стороны: используйте chess.WHITE или chess.BLACK")
-
 def merge_intervals(intervals):
     if not intervals:
         return []
@@ -1,13 +1,18 @@
 from typing import Annotated
 
-from fastapi import Depends, APIRouter, BackgroundTasks, HTTPException, Path, status, Body
+from fastapi import Depends, APIRouter, HTTPException, Path, status, Body
 from loguru import logger
 
 from app import User, Task, TaskType, TaskStatus
+from app.analysis.analytics import detector_pool, feature_store
+from app.analysis.analytics.features import material_and_mobility
+from app.analysis.analytics.heuristic_functions import select_detectors
 from app.api.dependencies import get_current_user, get_uow
-from app.core.DTO import AnalysisResponseSchema, HighlightResponseSchema, AnalysisResultResponseSchema, AnalysisRequest
+from app.core import StrategyType
+from app.core.DTO import AnalysisResponseSchema, HighlightResponseSchema, AnalysisResultResponseSchema, AnalysisRequest, \
+    EvaluationCurveResponseSchema, GameFeaturesResponseSchema
 from app.db import SQLAlchemyUnitOfWork
-from app.utils.helpers import run_analysis, run_video_cut
+from app.utils.task_events import task_events
 
 router = APIRouter(tags=["Analysis"], prefix="/api/games/{game_id}/analysis")
 
@@ -20,7 +25,6 @@ async def start_game_analysis(
         uow: Annotated[SQLAlchemyUnitOfWork, Depends(get_uow)],
         current_user: Annotated[User, Depends(get_current_user)],
         game_id: Annotated[int, Path(title='Id of the game to analyze')],
-        background_tasks: BackgroundTasks,
         analysis_request: Annotated[AnalysisRequest, Body()]
 ):
     game = await uow.game.get_all(id=game_id, user_id=current_user.id)
@@ -32,16 +36,30 @@ async def start_game_analysis(
     if not game.pgn_data:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="PGN data is required for analysis")
 
+    if analysis_request.strategy_type != StrategyType.ANALYTICS and (
+            analysis_request.detectors is not None or analysis_request.threshold is not None):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Detectors and threshold can only be chosen for the analytics strategy")
+
+    if analysis_request.detectors is not None:
+        try:
+            select_detectors(analysis_request.detectors)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
     analysis_task = Task(
         type=TaskType.GAME_ANALYSIS,
         status=TaskStatus.PENDING,
         game_id=game_id,
         user_id=current_user.id,
-        strategy_type=analysis_request.strategy_type
+        strategy_type=analysis_request.strategy_type,
+        priority=analysis_request.priority,
+        detectors=analysis_request.detectors,
+        threshold=analysis_request.threshold
     )
 
+    # Tasks are only queued here; a worker picks them up once they are committed
     await uow.task.create(analysis_task)
-    background_tasks.add_task(run_analysis, game_id, analysis_task.id)
 
     response = AnalysisResponseSchema(
         analysis_id=analysis_task.id,
@@ -54,13 +72,16 @@ async def start_game_analysis(
             status=TaskStatus.PENDING,
             game_id=game_id,
             user_id=current_user.id,
+            priority=analysis_request.priority,
+            depends_on_id=analysis_task.id,
         )
 
         await uow.task.create(video_task)
-        background_tasks.add_task(run_video_cut, game_id, video_task.id, analysis_task.id)
         response.video_id = video_task.id
 
+    await uow.task.announce()
     await uow.commit()
+    task_events.wake()
 
     logger.info(
         f"Added analysis task with id: {analysis_task.id} for game with id: {game_id} with strategy: {analysis_task.strategy_type}")
@@ -86,4 +107,45 @@ async def get_analysis_result(
 
     return AnalysisResultResponseSchema(pgn_data=game.pgn_data,
                                         highlights=[HighlightResponseSchema.model_validate(hi) for hi in
-                                                    game.highlights])
\ No newline at end of file
+                                                    game.highlights])
+
+@router.get("/evaluations",
+            response_model=EvaluationCurveResponseSchema,
+            summary="Get the engine evaluation curve")
+async def get_evaluation_curve(
+        game_id: Annotated[int, Path(title='Id of the analyzed game')],
+        uow: Annotated[SQLAlchemyUnitOfWork, Depends(get_uow)],
+        current_user: Annotated[User, Depends(get_current_user)]
+):
+    game = await uow.game.get_all(id=game_id, user_id=current_user.id)
+    if not game:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Game not found")
+
+    curve = await uow.game_evaluation.get_curve(game_id)
+    if curve is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Game has not been analyzed with the engine")
+
+    return EvaluationCurveResponseSchema(depth=curve.depth, engine=curve.engine, evaluations=curve.as_list())
+
+
+@router.get("/features",
+            response_model=GameFeaturesResponseSchema,
+            summary="Get material and mobility of both sides along the game")
+async def get_game_features(
+        game_id: Annotated[int, Path(title='Id of the game')],
+        uow: Annotated[SQLAlchemyUnitOfWork, Depends(get_uow)],
+        current_user: Annotated[User, Depends(get_current_user)]
+):
+    game = await uow.game.get_all(id=game_id, user_id=current_user.id)
+    if not game:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Game not found")
+
+    game = game[0]
+
+    if not game.pgn_data:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="PGN data is required for features")
+
+    # the first request replays the game in the detector pool and caches the features on disk
+    return GameFeaturesResponseSchema(
+        **await detector_pool.run(material_and_mobility, feature_store, game_id, game.pgn_data)
+    )
@@ -1,11 +1,10 @@
-import io
 from datetime import datetime
 from typing import Annotated, List, Optional
 
-import chess.pgn
 from fastapi import Form, Depends, APIRouter, UploadFile, File, HTTPException, status, Path
 
 from app import User, Game, Video
+from app.analysis.analytics.pgn_reader import read_mainline
 from app.api.dependencies import get_current_user, get_uow
 from app.core.DTO import GameResponseSchema, HighlightResponseSchema, \
     GameWithHighlightsResponseSchema
@@ -34,10 +33,9 @@ async def create_game_with_pgn(
 
     pgn_data = pgn_text.split("\n\n")[-1]
 
-    pgn_io = io.StringIO(pgn_text)
-    chess_game = chess.pgn.read_game(pgn_io)
+    chess_game = read_mainline(pgn_text)
 
-    if not chess_game:
+    if chess_game is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid PGN file")
 
     white_player = chess_game.headers.get("White", "Unknown")
@@ -1,15 +1,23 @@
-from typing import Annotated
+from typing import Annotated, AsyncIterator, List
 
-from fastapi import APIRouter, Path, Depends, HTTPException
+from fastapi import APIRouter, Path, Query, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from starlette import status
 
-from app import User
+from app import User, TaskStatus
 from app.api.dependencies import get_uow, get_current_user
-from app.core.DTO import TaskStatusResponseSchema
-from app.db import SQLAlchemyUnitOfWork
+from app.config import settings
+from app.core.DTO import TaskStatusResponseSchema, TaskProgressSchema
+from app.db import SQLAlchemyUnitOfWork, get_sql_sessionmaker
+from app.utils.task_events import TaskEvents, task_events
 
 router = APIRouter(tags=["Tasks"], prefix="/api/tasks")
 
+FINISHED = (TaskStatus.COMPLETED, TaskStatus.FAILED)
+# most task ids one batch status request may ask for
+MAX_BATCH = 100
+
 
 @router.get("/status/{task_id}",
             response_model=TaskStatusResponseSchema,
@@ -19,7 +27,80 @@ async def get_task_status(
         uow: Annotated[SQLAlchemyUnitOfWork, Depends(get_uow)],
         current_user: Annotated[User, Depends(get_current_user)]
 ):
-    task = await uow.task.get(task_id)
+    task = await uow.task.get_progress(task_id)
+
+    if not task:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Задача не найдена")
+
+    if task.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Нет доступа к этой задаче")
+
+    return TaskStatusResponseSchema(id=task.id, status=task.status.value)
+
+
+@router.get("/status",
+            response_model=List[TaskProgressSchema],
+            summary="Check status and progress of several tasks")
+async def get_task_statuses(
+        ids: Annotated[List[int], Query(title='ID задач для проверки', min_length=1, max_length=MAX_BATCH)],
+        uow: Annotated[SQLAlchemyUnitOfWork, Depends(get_uow)],
+        current_user: Annotated[User, Depends(get_current_user)]
+):
+    tasks = {task.id: task for task in await uow.task.get_progress_many(ids)}
+
+    if len(tasks) < len(set(ids)):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Задача не найдена")
+
+    if any(task.user_id != current_user.id for task in tasks.values()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Нет доступа к этой задаче")
+
+    return [
+        TaskProgressSchema(id=task.id, status=task.status.value,
+                           progress=task.progress, progress_total=task.progress_total)
+        for task in (tasks[task_id] for task_id in dict.fromkeys(ids))
+    ]
+
+
+async def progress_events(session_factory: async_sessionmaker, task_id: int, events: TaskEvents = task_events,
+                          keep_alive: float = settings.queue.poll_interval) -> AsyncIterator[str]:
+    """
+    Server-Sent Events with the status and progress of a task: an event for every change,
+    a comment line every `keep_alive` seconds without changes, and the end of the stream
+    once the task has finished. Every read uses a short session of its own, so an open
+    stream does not hold a database connection.
+    """
+    last = None
+    while True:
+        changed = events.watch(task_id)
+
+        async with SQLAlchemyUnitOfWork(session_factory) as uow:
+            state = await uow.task.get_progress(task_id)
+        if state is None:
+            return
+
+        message = TaskProgressSchema(id=state.id, status=state.status.value,
+                                     progress=state.progress, progress_total=state.progress_total)
+        if message != last:
+            yield f"data: {message.model_dump_json()}\n\n"
+            last = message
+        else:
+            yield ": keep-alive\n\n"
+
+        if state.status in FINISHED:
+            return
+
+        await events.wait(changed, keep_alive)
+
+
+@router.get("/events/{task_id}",
+            summary="Stream task status and progress as Server-Sent Events")
+async def stream_task_progress(
+        task_id: Annotated[int, Path(title='ID задачи для отслеживания')],
+        uow: Annotated[SQLAlchemyUnitOfWork, Depends(get_uow)],
+        current_user: Annotated[User, Depends(get_current_user)],
+        session_factory: Annotated[async_sessionmaker, Depends(get_sql_sessionmaker)]
+):
+    task = await uow.task.get_progress(task_id)
 
     if not task:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Задача не найдена")
@@ -27,4 +108,5 @@ async def get_task_status(
     if task.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Нет доступа к этой задаче")
 
-    return task
+    return StreamingResponse(progress_events(session_factory, task_id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
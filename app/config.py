@@ -1,5 +1,6 @@
-from typing import Tuple, Type, List
+from typing import Dict, Tuple, Type, List, Optional
 
+from pydantic import Field
 from pydantic_settings import (
     BaseSettings,
     SettingsConfigDict,
@@ -25,12 +26,42 @@ class SecuritySettings(BaseSettings):
 class AnalysisSettings(BaseSettings):
     default_strategy: str
     engine_path: str
+    engine_pool_size: int = 2
+    engine_workers_per_game: int = 1
+    evaluation_cache_path: Optional[str] = None
+    evaluation_cache_size: int = 1_000_000
+    shallow_depth: Optional[int] = None
+    refine_fraction: float = 0.5
+    backward_analysis: bool = False
+    detector_processes: int = 2
+    feature_cache_dir: Optional[str] = None
+    result_cache: bool = True
+    syzygy_path: Optional[str] = None
+    syzygy_max_pieces: int = 5
+    opening_trie_plies: int = 40
+    opening_trie_nodes: int = 200_000
+
+
+class QueueSettings(BaseSettings):
+    # tasks the API process runs itself; 0 leaves the queue to separate workers (python -m app.worker)
+    api_concurrency: int = 2
+    worker_concurrency: int = 2
+    lease_seconds: int = 60
+    # claims of one task before it is failed: a task that kills its worker is not retried forever
+    max_attempts: int = 3
+    # idle workers are woken by task events; polling only picks up expired leases
+    # and, without PostgreSQL, tasks queued by other processes
+    poll_interval: float = 5.0
+    # caps on tasks of one type running at once across all workers of the queue, by TaskType
+    # value (e.g. game_analysis = 2, video_processing = 1); types not listed share the concurrency
+    limits: Dict[str, int] = {}
 
 class Settings(BaseSettings):
     fastapi: FastAPISettings
     database: DatabaseSettings
     security: SecuritySettings
     analysis: AnalysisSettings
+    queue: QueueSettings = Field(default_factory=QueueSettings)
 
     model_config = SettingsConfigDict(toml_file='../config.toml')
 
@@ -1,9 +1,9 @@
 from datetime import datetime
 from typing import Optional, List
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
-from app import UserRole
+from app import UserRole, TaskPriority
 from app.core import StrategyType
 
 
@@ -70,6 +70,14 @@ class TaskStatusResponseSchema(BaseModel):
     id: int
     status: str
 
+
+class TaskProgressSchema(BaseModel):
+    id: int
+    status: str
+    # Positions evaluated (analysis) or highlight clips cut (video) out of progress_total
+    progress: Optional[int] = None
+    progress_total: Optional[int] = None
+
 class AnalysisResponseSchema(BaseModel):
     analysis_id: int = 0
     video_id: int = -1  # -1, если видео не запрашивалось
@@ -94,6 +102,22 @@ class AnalysisResultResponseSchema(BaseModel):
     highlights: List[HighlightResponseSchema]
 
 
+class EvaluationCurveResponseSchema(BaseModel):
+    depth: int
+    engine: str
+    # Centipawns from White's point of view after each ply, index 0 is the start position;
+    # None for positions not evaluated at full depth
+    evaluations: List[Optional[int]]
+
+
+class GameFeaturesResponseSchema(BaseModel):
+    # Material (pawn = 1) and mobility of each side after each ply, index 0 is the start position
+    material_white: List[int]
+    material_black: List[int]
+    mobility_white: List[int]
+    mobility_black: List[int]
+
+
 class GameWithHighlightsResponseSchema(BaseModel):
     game: GameResponseSchema
     highlights: List[HighlightResponseSchema]
@@ -108,3 +132,9 @@ class VideoSegmentResponseSchema(BaseModel):
 class AnalysisRequest(BaseModel):
     strategy_type: StrategyType = StrategyType.ANALYTICS
     create_video: bool = False
+    # Bulk backfills wait while interactive tasks are queued
+    priority: TaskPriority = TaskPriority.INTERACTIVE
+    # Subset of registered detectors for the analytics strategy, None means the default set
+    detectors: Optional[List[str]] = None
+    # Engine swing threshold in centipawns for the analytics strategy, None means the default
+    threshold: Optional[int] = Field(default=None, gt=0)
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 
 class AbstractAnalysisStrategy(ABC):
@@ -8,4 +8,12 @@ class AbstractAnalysisStrategy(ABC):
     async def analyze(self, pgn_data: str) -> List[Tuple[str, str]]:
         raise NotImplementedError
 
+    async def parameters(self, **options) -> Optional[Dict[str, Any]]:
+        """
+        Everything besides the moves that determines the result of `analyze`, used in the result cache key.
+        None keeps the results of the strategy out of the cache, which is the default: a strategy can only
+        opt in if it can name every version its results depend on (models, prompts, external services).
+        """
+        return None
+
 
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 from app.analysis import *
 from app.config import settings
@@ -33,8 +33,14 @@ class ChessAnalysisInterface:
         self.current_strategy = strategy_name
         self.analyzer.strategy = self.available_strategies[strategy_name]
 
-    async def analyze_game(self, game_data: str) -> List[Tuple[str, str]]:
+    async def analyze_game(self, game_data: str, **options) -> List[Tuple[str, str]]:
         if self.current_strategy is None:
             self.set_strategy(self.default_strategy)
 
-        return await self.analyzer.analyze_game(game_data)
+        return await self.analyzer.analyze_game(game_data, **options)
+
+    async def parameters(self, **options) -> Optional[Dict[str, Any]]:
+        if self.current_strategy is None:
+            self.set_strategy(self.default_strategy)
+
+        return await self.analyzer.parameters(**options)
@@ -1,4 +1,4 @@
-from typing import Optional, List, Tuple
+from typing import Any, Dict, Optional, List, Tuple
 
 from .abstract_strategy import AbstractAnalysisStrategy
 
@@ -15,7 +15,12 @@ class ChessAnalyzer:
     def strategy(self, strategy: AbstractAnalysisStrategy) -> None:
         self._strategy = strategy
 
-    async def analyze_game(self, game_data: str) -> List[Tuple[str, str]]:
+    async def analyze_game(self, game_data: str, **options) -> List[Tuple[str, str]]:
         if self._strategy is None:
             raise ValueError("Analysis strategy not set")
-        return await self._strategy.analyze(game_data)
+        return await self._strategy.analyze(game_data, **options)
+
+    async def parameters(self, **options) -> Optional[Dict[str, Any]]:
+        if self._strategy is None:
+            raise ValueError("Analysis strategy not set")
+        return await self._strategy.parameters(**options)
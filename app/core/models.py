@@ -4,7 +4,7 @@ from datetime import datetime
 from enum import Enum
 from typing import List, Optional
 
-from sqlalchemy import ForeignKey, String, Text, Integer
+from sqlalchemy import ForeignKey, String, Text, Integer, JSON, LargeBinary
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from sqlalchemy.types import Enum as SQLAEnum
@@ -126,15 +126,38 @@ class TaskStatus(str, Enum):
     FAILED = "failed"
 
 
+class TaskPriority(str, Enum):
+    # Someone is waiting for the result of this game
+    INTERACTIVE = "interactive"
+    # Backfills and other batch work, run when no interactive task is waiting
+    BULK = "bulk"
+
+
 class Task(Base, TimestampMixin):
     __tablename__ = "tasks"
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     type: Mapped[TaskType] = mapped_column(SQLAEnum(TaskType))
     status: Mapped[TaskStatus] = mapped_column(SQLAEnum(TaskStatus), default=TaskStatus.PENDING)
+    priority: Mapped[TaskPriority] = mapped_column(SQLAEnum(TaskPriority), default=TaskPriority.INTERACTIVE)
     error_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     strategy_type: Mapped[Optional[StrategyType]] = mapped_column(SQLAEnum(StrategyType), nullable=True,
                                                                   default=StrategyType.ANALYTICS)
+    # Detector names for the analytics strategy, None means the default set
+    detectors: Mapped[Optional[List[str]]] = mapped_column(JSON, nullable=True)
+    # Engine swing threshold in centipawns for the analytics strategy, None means the default
+    threshold: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    # Task that has to finish first (the analysis of a video task), None if there is none
+    depends_on_id: Mapped[Optional[int]] = mapped_column(ForeignKey("tasks.id"), nullable=True)
+    # Queue worker holding the task and the end of its lease; an expired lease can be claimed again
+    worker_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    # Times the task was claimed without being put back by its worker; past queue.max_attempts it fails
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    # Work done out of progress_total while running: positions evaluated by an analysis,
+    # highlight clips cut by a video task
+    progress: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    progress_total: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
 
     # Relationships
     game_id: Mapped[int] = mapped_column(ForeignKey("games.id"))
@@ -148,6 +171,31 @@ class Task(Base, TimestampMixin):
     # highlight_id: Mapped[Optional[int]] = mapped_column(ForeignKey("highlights.id"), nullable=True)
 
 
+class AnalysisResult(Base, TimestampMixin):
+    __tablename__ = "analysis_results"
+
+    # sha256 of the normalised move sequence, strategy type and strategy parameters
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    strategy_type: Mapped[StrategyType] = mapped_column(SQLAEnum(StrategyType))
+    parameters: Mapped[dict] = mapped_column(JSON)
+    results: Mapped[List[List[str]]] = mapped_column(JSON)
+
+
+class GameEvaluation(Base, TimestampMixin):
+    __tablename__ = "game_evaluations"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    # Per-ply engine evaluations as little-endian int16, see EvaluationCurve
+    scores: Mapped[bytes] = mapped_column(LargeBinary)
+    depth: Mapped[int] = mapped_column(Integer)
+    engine: Mapped[str] = mapped_column(String(255))
+    # Start position and first moves (UCI, space-separated) of the game, for the opening trie
+    start_fen: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    opening: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    game_id: Mapped[int] = mapped_column(ForeignKey("games.id", ondelete="CASCADE"), unique=True)
+
+
 class LogType(int, Enum):
     system = 0
     exceptions = 1
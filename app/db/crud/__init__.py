@@ -1,4 +1,6 @@
+from .analysis_result import AnalysisResultRepository
 from .game import GameRepository
+from .game_evaluation import GameEvaluationRepository
 from .highlight import HighlightRepository
 from .task import TaskRepository
 from .user import UserRepository
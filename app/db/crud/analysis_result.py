@@ -0,0 +1,25 @@
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import AnalysisResult
+from app.db import SQLAlchemyRepository
+
+
+class AnalysisResultRepository(SQLAlchemyRepository[AnalysisResult]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, AnalysisResult)
+
+    async def get(self, key: str) -> Optional[AnalysisResult]:
+        return await self.session.get(AnalysisResult, key)
+
+    async def save(self, result: AnalysisResult) -> AnalysisResult:
+        """Insert a result unless a concurrent analysis of the same game has already stored it."""
+        try:
+            async with self.session.begin_nested():
+                self.session.add(result)
+        except IntegrityError:
+            pass
+
+        return result
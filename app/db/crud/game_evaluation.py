@@ -0,0 +1,59 @@
+from typing import List, Optional, Tuple
+
+from sqlalchemy import LargeBinary, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import GameEvaluation
+from app.analysis.analytics.evaluation_curve import EvaluationCurve
+from app.db import SQLAlchemyRepository
+
+
+class GameEvaluationRepository(SQLAlchemyRepository[GameEvaluation]):
+    def __init__(self, session: AsyncSession):
+        super().__init__(session, GameEvaluation)
+
+    async def get_by_game_id(self, game_id: int) -> Optional[GameEvaluation]:
+        statement = select(GameEvaluation).where(GameEvaluation.game_id == game_id)
+        result = await self.session.execute(statement)
+        return result.scalars().first()
+
+    async def get_curve(self, game_id: int) -> Optional[EvaluationCurve]:
+        evaluation = await self.get_by_game_id(game_id)
+        if evaluation is None:
+            return None
+        return EvaluationCurve.from_bytes(evaluation.scores, evaluation.depth, evaluation.engine)
+
+    async def save_curve(self, game_id: int, curve: EvaluationCurve, start_fen: Optional[str] = None,
+                         opening: Optional[str] = None) -> GameEvaluation:
+        """
+        Store the curve of a game, replacing the previous one, with the start position and
+        first moves of the game that the opening trie is loaded from (see list_openings).
+        """
+        evaluation = await self.get_by_game_id(game_id)
+        if evaluation is None:
+            evaluation = GameEvaluation(game_id=game_id)
+            self.session.add(evaluation)
+
+        evaluation.scores = curve.to_bytes()
+        evaluation.depth = curve.depth
+        evaluation.engine = curve.engine
+        evaluation.start_fen = start_fen
+        evaluation.opening = opening
+        await self.session.flush()
+
+        return evaluation
+
+    async def list_openings(self, plies: int) -> List[Tuple[str, str, bytes, int, str]]:
+        """
+        Start position, opening moves and the evaluations of their first `plies` + 1 positions,
+        with depth and engine, of every game whose curve was stored with its opening.
+        Only the opening part of the curve is read.
+        """
+        statement = (
+            select(GameEvaluation.start_fen, GameEvaluation.opening,
+                   func.substr(GameEvaluation.scores, 1, 2 * (plies + 1), type_=LargeBinary),
+                   GameEvaluation.depth, GameEvaluation.engine)
+            .where(GameEvaluation.opening.is_not(None))
+        )
+        result = await self.session.execute(statement)
+        return [tuple(row) for row in result.all()]
@@ -1,11 +1,16 @@
-from typing import Optional, Sequence
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Sequence
 
-from sqlalchemy import select
+from sqlalchemy import Row, and_, case, exists, func, or_, select, text, true, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import aliased, selectinload
 
-from app import Task, TaskStatus, TaskType
+from app import Task, TaskPriority, TaskStatus, TaskType
 from app.db import SQLAlchemyRepository
+from app.utils.task_events import CHANNEL, PROGRESS_CHANNEL
+
+# transaction-level advisory lock that serialises claims of capped task types on PostgreSQL
+LIMITS_LOCK = 0x7461736b
 
 
 class TaskRepository(SQLAlchemyRepository[Task]):
@@ -71,3 +76,173 @@ class TaskRepository(SQLAlchemyRepository[Task]):
 
     async def get_failed_tasks(self) -> Sequence[Task]:
         return await self.get_by_status(TaskStatus.FAILED)
+
+    @staticmethod
+    def _ready():
+        """The task has no dependency or its dependency has finished, successfully or not."""
+        dependency = aliased(Task)
+        return ~exists().where(
+            dependency.id == Task.depends_on_id,
+            dependency.status.in_([TaskStatus.PENDING, TaskStatus.PROCESSING]),
+        )
+
+    @staticmethod
+    def _claimable(now: datetime):
+        return or_(
+            Task.status == TaskStatus.PENDING,
+            and_(Task.status == TaskStatus.PROCESSING, Task.lease_expires_at < now),
+        )
+
+    @staticmethod
+    def _under_limits(now: datetime, limits: Dict[TaskType, int]):
+        """Fewer tasks of the task's type are running, by any worker, than its limit allows."""
+        running = aliased(Task)
+        conditions = []
+        for task_type, limit in limits.items():
+            count = (
+                select(func.count())
+                .where(running.type == task_type, running.status == TaskStatus.PROCESSING,
+                       running.lease_expires_at >= now)
+                .scalar_subquery()
+            )
+            conditions.append(or_(Task.type != task_type, count < limit))
+        return and_(true(), *conditions)
+
+    @staticmethod
+    def _queue_order():
+        """Interactive tasks first, then tasks of users with the fewest tasks running, then the oldest."""
+        running = aliased(Task)
+        user_running = (
+            select(func.count())
+            .where(running.user_id == Task.user_id, running.status == TaskStatus.PROCESSING)
+            .scalar_subquery()
+        )
+        return case((Task.priority == TaskPriority.INTERACTIVE, 0), else_=1), user_running, Task.id
+
+    async def claim(self, worker_id: str, lease: timedelta, types: Iterable[TaskType],
+                    limits: Optional[Dict[TaskType, int]] = None) -> Optional[Task]:
+        """
+        Lease the next pending task of one of `types` to `worker_id`, or a processing task
+        whose lease has expired because its worker died (see `_queue_order`). Tasks whose
+        dependency has not finished yet are skipped, and so are types that already have
+        as many tasks running in the whole queue as `limits` allow.
+
+        On PostgreSQL the candidate row is locked with SELECT ... FOR UPDATE SKIP LOCKED, so
+        concurrent workers never wait for each other. Other databases (SQLite) have no row
+        locks; there the claim is a conditional UPDATE that only one worker can win, and
+        the next candidate is tried if another worker was faster.
+
+        Row locks do not stop two workers from taking the last free slot of a type with
+        different tasks, so on PostgreSQL claims of capped types wait for each other on
+        an advisory lock held until the claim is committed. On SQLite the limit is
+        checked again by the UPDATE itself, which runs under the database write lock.
+        The caller commits the claim.
+        """
+        now = datetime.now()
+        types = list(types)
+        limits = {task_type: limit for task_type, limit in (limits or {}).items() if task_type in types}
+        statement = (
+            select(Task.id)
+            .where(self._claimable(now), self._ready(), Task.type.in_(types), self._under_limits(now, limits))
+            .order_by(*self._queue_order())
+        )
+
+        if self.session.get_bind().dialect.name == "postgresql":
+            if limits:
+                await self.session.execute(select(func.pg_advisory_xact_lock(LIMITS_LOCK)))
+            statement = statement.limit(1).with_for_update(skip_locked=True)
+        else:
+            statement = statement.limit(10)
+        candidates = (await self.session.execute(statement)).scalars().all()
+
+        for task_id in candidates:
+            result = await self.session.execute(
+                update(Task)
+                .where(Task.id == task_id, self._claimable(now), self._under_limits(now, limits))
+                .values(status=TaskStatus.PROCESSING, worker_id=worker_id, lease_expires_at=now + lease,
+                        attempts=Task.attempts + 1)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                statement = select(Task).where(Task.id == task_id).execution_options(populate_existing=True)
+                return (await self.session.execute(statement)).scalars().first()
+
+        return None
+
+    async def renew_lease(self, task_id: int, worker_id: str, lease: timedelta) -> bool:
+        """
+        Extend the lease of a task; False if the worker no longer holds it. A task the
+        runner has already marked finished is still held until the worker releases it.
+        """
+        result = await self.session.execute(
+            update(Task)
+            .where(Task.id == task_id, Task.worker_id == worker_id)
+            .values(lease_expires_at=datetime.now() + lease)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+    async def release(self, task_id: int, worker_id: str, status: Optional[TaskStatus] = None,
+                      error_message: Optional[str] = None) -> bool:
+        """
+        Drop the lease of a task held by `worker_id`, optionally setting its status
+        (PENDING puts it back in the queue and gives back the attempt it was claimed with).
+        False if the worker no longer holds it.
+        """
+        values = {"worker_id": None, "lease_expires_at": None}
+        if status is not None:
+            values["status"] = status
+        if status == TaskStatus.PENDING:
+            values["attempts"] = Task.attempts - 1
+        if error_message is not None:
+            values["error_message"] = error_message
+
+        result = await self.session.execute(
+            update(Task)
+            .where(Task.id == task_id, Task.worker_id == worker_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+    async def set_progress(self, task_id: int, done: int, total: Optional[int]) -> None:
+        await self.session.execute(
+            update(Task)
+            .where(Task.id == task_id)
+            .values(progress=done, progress_total=total)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def get_progress(self, task_id: int) -> Optional[Row]:
+        """Id, owner, status and progress of a task, without loading the task and its relations."""
+        statement = select(
+            Task.id, Task.user_id, Task.status, Task.progress, Task.progress_total
+        ).where(Task.id == task_id)
+        result = await self.session.execute(statement)
+        return result.first()
+
+    async def get_progress_many(self, task_ids: Iterable[int]) -> Sequence[Row]:
+        """`get_progress` for many tasks in one query; missing tasks are left out."""
+        statement = select(
+            Task.id, Task.user_id, Task.status, Task.progress, Task.progress_total
+        ).where(Task.id.in_(set(task_ids))).order_by(Task.id)
+        result = await self.session.execute(statement)
+        return result.all()
+
+    async def _notify(self, channel: str, task_id: Optional[int]) -> None:
+        if self.session.get_bind().dialect.name == "postgresql":
+            payload = "" if task_id is None else str(task_id)
+            await self.session.execute(text("SELECT pg_notify(:channel, :payload)"),
+                                       {"channel": channel, "payload": payload})
+
+    async def announce(self, task_id: Optional[int] = None) -> None:
+        """
+        Tell workers on other nodes that tasks were queued, started or finished, and the watchers
+        of `task_id` that its status changed. On PostgreSQL this is a NOTIFY delivered when the
+        transaction commits; other databases have no such channel.
+        """
+        await self._notify(CHANNEL, task_id)
+
+    async def announce_progress(self, task_id: int) -> None:
+        """Tell watchers on other nodes that the task made progress (see `announce`)."""
+        await self._notify(PROGRESS_CHANNEL, task_id)
@@ -13,6 +13,8 @@ class AbstractUnitOfWork(AsyncContextManager, ABC):
     video: VideoRepository
     video_segment: VideoSegmentRepository
     task: TaskRepository
+    analysis_result: AnalysisResultRepository
+    game_evaluation: GameEvaluationRepository
 
     @abstractmethod
     async def __aenter__(self):
@@ -46,6 +48,8 @@ class SQLAlchemyUnitOfWork(AbstractUnitOfWork):
         self.video = VideoRepository(self.session)
         self.video_segment = VideoSegmentRepository(self.session)
         self.task = TaskRepository(self.session)
+        self.analysis_result = AnalysisResultRepository(self.session)
+        self.game_evaluation = GameEvaluationRepository(self.session)
 
         return self
 
@@ -1,15 +1,53 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.analysis.analytics import engine_pool, detector_pool, evaluation_cache, tablebase
 from app.api.middlewares import LoggingMiddleware
 from app.api.routes import auth_router, game_content_router, profile_router, games_managment_router, analysis_router, \
     tasks_router
+from app.config import settings
+from app.db import get_sql_sessionmaker
 from app.utils.logging import setup_logging
+from app.utils.task_events import task_events
+from app.worker import TaskWorker, queue_limits
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await task_events.listen(settings.database.connection_string)
+
+    # The API process drains the task queue too, unless that is left to separate workers;
+    # only then it warms up analysis engines and detector processes
+    worker = None
+    if settings.queue.api_concurrency > 0:
+        await engine_pool.start()
+        await detector_pool.start()
+        worker = TaskWorker(get_sql_sessionmaker(), settings.queue.api_concurrency,
+                            settings.queue.lease_seconds, settings.queue.poll_interval, limits=queue_limits(),
+                            max_attempts=settings.queue.max_attempts)
+        worker.start()
+
+    yield
+
+    if worker is not None:
+        await worker.close()
+    await task_events.close()
+    # Pools that were never started are left alone; without the embedded worker the
+    # detector pool may still have been started on demand by the features endpoint
+    await detector_pool.close()
+    await engine_pool.close()
+
+    if evaluation_cache is not None:
+        evaluation_cache.close()
+    if tablebase is not None:
+        tablebase.close()
 
 
 def main():
     # FastAPI
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
 
     # Configure CORS to allow requests from the frontend
     app.add_middleware(
@@ -1,20 +1,90 @@
 import asyncio
+import hashlib
+import json
 import os
 from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
 
 from loguru import logger
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
-from app import TaskStatus, Highlight, VideoSegment
+from app import TaskStatus, Highlight, VideoSegment, AnalysisResult
+from app.config import settings
 from app.core import ChessAnalysisInterface
 from app.core.analysis_base.analysis_interface import StrategyType
+from app.analysis.analytics import detector_pool, opening_trie
+from app.analysis.analytics.evaluation_curve import EvaluationCurve
+from app.analysis.analytics.opening_trie import build_opening_trie
+from app.analysis.analytics.pgn_reader import read_mainline
 from app.db import get_sql_sessionmaker, SQLAlchemyUnitOfWork
+from app.utils.progress import TaskProgress
 from app.video import *
 
 
+def result_cache_key(pgn_data: str, strategy_type: StrategyType, parameters: Dict[str, Any]) -> Optional[str]:
+    """
+    Ключ кэша результатов анализа: хэш начальной позиции и ходов основной
+    линии (без заголовков, комментариев и вариантов), типа стратегии и её
+    параметров. None, если в PGN нет партии.
+    """
+    game = read_mainline(pgn_data)
+    if game is None:
+        return None
+
+    content = {
+        "start": game.board.fen(),
+        "moves": " ".join(move.uci() for move in game.moves),
+        "strategy": strategy_type.value,
+        "parameters": parameters,
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+# дерево дебютов загружается из базы одной задачей, остальные ждут её
+_opening_trie_loading = asyncio.Lock()
+
+
+def game_opening(pgn_data: str) -> Tuple[Optional[str], Optional[str]]:
+    """Начальная позиция (FEN) и первые ходы партии (UCI через пробел) для дерева дебютов."""
+    game = read_mainline(pgn_data) if opening_trie is not None else None
+    if game is None:
+        return None, None
+    return game.board.fen(), " ".join(move.uci() for move in game.moves[:opening_trie.max_plies])
+
+
+async def load_opening_trie(session_factory: async_sessionmaker) -> None:
+    """
+    Заполняет дерево дебютов сохранёнными началами партий; один раз на
+    процесс, дальше дерево пополняется само при анализе. Из базы в своей
+    сессии читаются только начала партий, а дерево строится в пуле
+    детекторов, чтобы не занимать цикл событий.
+    """
+    if opening_trie is None or opening_trie.loaded:
+        return
+
+    async with _opening_trie_loading:
+        if opening_trie.loaded:
+            return
+
+        try:
+            async with SQLAlchemyUnitOfWork(session_factory) as uow:
+                openings = await uow.game_evaluation.list_openings(opening_trie.max_plies)
+
+            loaded = await detector_pool.run(build_opening_trie, openings,
+                                             opening_trie.max_plies, opening_trie.max_nodes)
+        except Exception as e:
+            logger.warning(f"Could not load the opening trie: {e}")
+            return
+
+        opening_trie.absorb(loaded)
+        logger.info(f"Opening trie loaded from {len(openings)} games: {opening_trie.nodes} positions")
+
+
 async def run_analysis(game_id: int, task_id: int):
     logger.info(f"Running analysis for game with id: {game_id}")
 
-    async with SQLAlchemyUnitOfWork(get_sql_sessionmaker()) as uow:
+    session_factory = get_sql_sessionmaker()
+    async with SQLAlchemyUnitOfWork(session_factory) as uow:
         try:
             task = await uow.task.get(task_id)
             task.status = TaskStatus.PROCESSING
@@ -30,8 +100,50 @@ async def run_analysis(game_id: int, task_id: int):
             # Устанавливаем стратегию анализа
             analysis.set_strategy(strategy_type)
 
-            # Используем выбранную стратегию для анализа
-            results = await analysis.analyze_game(game.pgn_data)
+            # Используем выбранную стратегию для анализа; набор детекторов и порог – только для аналитики
+            options = {}
+            if task.detectors is not None:
+                options["enabled"] = task.detectors
+            if task.threshold is not None:
+                options["threshold"] = task.threshold
+
+            # Та же партия с теми же параметрами уже могла быть проанализирована;
+            # стратегии без параметров (внешние модели) в кэш не попадают
+            key, cached = None, None
+            if settings.analysis.result_cache:
+                parameters = await analysis.parameters(**options)
+                if parameters is not None:
+                    key = result_cache_key(game.pgn_data, strategy_type, parameters)
+                cached = await uow.analysis_result.get(key) if key else None
+
+            if cached is not None:
+                logger.info(f"Using cached analysis result for game with id: {game_id}")
+                results = cached.results
+            else:
+                # сохранённая кривая оценок позволяет сменить порог без движка
+                curve = None
+                if strategy_type == StrategyType.ANALYTICS:
+                    curve = await uow.game_evaluation.get_curve(game_id) or EvaluationCurve()
+                    options["curve"] = curve
+                    # общее с уже проанализированными партиями начало не пересчитывается
+                    await load_opening_trie(session_factory)
+
+                # оценённые позиции из общего числа видны в статусе задачи
+                async with TaskProgress(session_factory, task_id) as progress:
+                    if strategy_type == StrategyType.ANALYTICS:
+                        options["progress"] = progress.update
+                    results = await analysis.analyze_game(game.pgn_data, **options)
+
+                if curve is not None and curve.changed:
+                    await uow.game_evaluation.save_curve(game_id, curve, *game_opening(game.pgn_data))
+
+                if key:
+                    await uow.analysis_result.save(AnalysisResult(
+                        key=key,
+                        strategy_type=strategy_type,
+                        parameters=parameters,
+                        results=[list(result) for result in results]
+                    ))
 
             for result in results:
                 highlight = Highlight(
@@ -59,14 +171,13 @@ async def run_analysis(game_id: int, task_id: int):
 async def run_video_cut(game_id: int, task_id: int, analysis_task_id: int):
     logger.info(f"Running video cutting for game with id: {game_id}")
 
-    async with SQLAlchemyUnitOfWork(get_sql_sessionmaker()) as uow:
+    session_factory = get_sql_sessionmaker()
+    async with SQLAlchemyUnitOfWork(session_factory) as uow, TaskProgress(session_factory, task_id) as progress:
         try:
-            # Wait for analysis task to complete
-            analysis_task = await uow.task.get(analysis_task_id)
-            while analysis_task.status != TaskStatus.COMPLETED:
-                logger.info(f"Waiting for analysis task with id: {analysis_task_id} to complete")
-                await asyncio.sleep(3)
-                await uow.session.refresh(analysis_task)
+            # The queue starts this task only after the analysis task it depends on has finished
+            analysis_task = await uow.task.get(analysis_task_id) if analysis_task_id is not None else None
+            if analysis_task is None or analysis_task.status != TaskStatus.COMPLETED:
+                raise ValueError(f"Analysis task with id: {analysis_task_id} did not complete")
 
             # Update task status to processing
             task = await uow.task.get(task_id)
@@ -123,7 +234,8 @@ async def run_video_cut(game_id: int, task_id: int, analysis_task_id: int):
 
             logger.info(f"Extracted {len(move_timestamps)} move timestamps from PGN")
 
-            # Process each highlight
+            # Process each highlight; progress counts highlight clips out of all highlights
+            progress.update(0, len(highlights))
             for highlight in highlights:
                 logger.info(f"Processing highlight {highlight.id}: {highlight.start_move} to {highlight.end_move}")
 
@@ -167,6 +279,9 @@ async def run_video_cut(game_id: int, task_id: int, analysis_task_id: int):
                             url=output_file
                         )
                         await uow.video_segment.create(video_segment)
+                        # each clip is committed at once: it survives a later failure, and the task's
+                        # progress can be written meanwhile
+                        await uow.commit()
 
                         logger.info(f"Created highlight video: {output_file}")
                     else:
@@ -175,6 +290,10 @@ async def run_video_cut(game_id: int, task_id: int, analysis_task_id: int):
                 except Exception as e:
                     logger.error(f"Error processing highlight {highlight.id}: {e}")
 
+                finally:
+                    # a highlight without segments or with a failed cut is done with as well
+                    progress.advance()
+
             # Update task status
             task.status = TaskStatus.COMPLETED
             await uow.commit()
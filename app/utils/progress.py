@@ -0,0 +1,76 @@
+import asyncio
+from typing import Optional, Tuple
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.db import SQLAlchemyUnitOfWork
+from app.utils.task_events import TaskEvents, task_events
+
+
+class TaskProgress:
+    """
+    Progress of a running task, `done` out of `total`.
+
+    The task updates it as it goes, also from synchronous callbacks, and the
+    progress is written to the task row with a notification for its watchers
+    at most every `interval` seconds, so a fast loop does not become a write
+    per step. The last state is written when the context exits.
+
+        async with TaskProgress(session_factory, task_id) as progress:
+            progress.update(10, 80)
+    """
+
+    def __init__(self, session_factory: async_sessionmaker, task_id: int, interval: float = 1.0,
+                 events: TaskEvents = task_events):
+        self.session_factory = session_factory
+        self.task_id = task_id
+        self.interval = interval
+        self.events = events
+
+        self.done = 0
+        self.total: Optional[int] = None
+        self._written: Optional[Tuple[int, Optional[int]]] = None
+        self._writer: Optional[asyncio.Task] = None
+
+    def update(self, done: int, total: Optional[int] = None) -> None:
+        self.done = done
+        if total is not None:
+            self.total = total
+
+    def advance(self, count: int = 1) -> None:
+        self.done += count
+
+    async def flush(self) -> None:
+        state = (self.done, self.total)
+        if state == self._written:
+            return
+
+        async with SQLAlchemyUnitOfWork(self.session_factory) as uow:
+            await uow.task.set_progress(self.task_id, *state)
+            await uow.task.announce_progress(self.task_id)
+            await uow.commit()
+
+        self._written = state
+        self.events.progress(self.task_id)
+
+    async def _write_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"Could not save progress of task with id: {self.task_id}: {e}")
+
+    async def __aenter__(self) -> "TaskProgress":
+        self._writer = asyncio.create_task(self._write_periodically())
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._writer.cancel()
+        await asyncio.gather(self._writer, return_exceptions=True)
+
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.warning(f"Could not save progress of task with id: {self.task_id}: {e}")
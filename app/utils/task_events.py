@@ -0,0 +1,95 @@
+import asyncio
+from typing import Any, Dict, Optional
+
+from loguru import logger
+from sqlalchemy import make_url
+
+# PostgreSQL channel on which queue changes (task queued, started or finished) are announced to other nodes
+CHANNEL = "task_events"
+# PostgreSQL channel for progress of running tasks; it only reaches watchers, not idle workers
+PROGRESS_CHANNEL = "task_progress"
+
+
+class TaskEvents:
+    """
+    Wake-ups for queue workers when a task is queued or finishes, so that
+    workers and the tasks that depend on the finished one start at once
+    instead of polling the database, and for watchers of a single task
+    (progress streams) when its status or progress changes.
+
+    Within one process a wake-up sets an asyncio.Event. With PostgreSQL,
+    `listen` also subscribes to NOTIFY on `CHANNEL` and `PROGRESS_CHANNEL`,
+    which the task repository sends in the same transaction as the change
+    (see `TaskRepository.announce`), so other nodes are woken as well.
+    """
+
+    def __init__(self):
+        self._event = asyncio.Event()
+        self._watched: Dict[int, asyncio.Event] = {}
+        self._connection: Optional[Any] = None
+
+    def subscribe(self) -> asyncio.Event:
+        """
+        Event that the next wake-up sets. Take it before looking at the queue,
+        so that a wake-up coming in between is not missed.
+        """
+        return self._event
+
+    def watch(self, task_id: int) -> asyncio.Event:
+        """Event that the next change of task `task_id` sets; take it before reading the task."""
+        event = self._watched.get(task_id)
+        if event is None:
+            event = self._watched[task_id] = asyncio.Event()
+        return event
+
+    def wake(self, task_id: Optional[int] = None) -> None:
+        """The queue changed: wake idle workers, and the watchers of `task_id` if it is given."""
+        event, self._event = self._event, asyncio.Event()
+        event.set()
+
+        if task_id is not None:
+            self.progress(task_id)
+
+    def progress(self, task_id: int) -> None:
+        """Task `task_id` made progress: wake its watchers only."""
+        event = self._watched.pop(task_id, None)
+        if event is not None:
+            event.set()
+
+    async def wait(self, event: asyncio.Event, timeout: float) -> None:
+        """Wait for `event` from `subscribe` or `watch`, at most `timeout` seconds."""
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _notified(self, connection, pid, channel: str, payload: str) -> None:
+        task_id = int(payload) if payload else None
+        if channel == CHANNEL:
+            self.wake(task_id)
+        elif task_id is not None:
+            self.progress(task_id)
+
+    async def listen(self, connection_string: str) -> None:
+        """Subscribe to notifications from other nodes; only PostgreSQL has them."""
+        url = make_url(connection_string)
+        if url.get_backend_name() != "postgresql" or self._connection is not None:
+            return
+
+        import asyncpg
+
+        self._connection = await asyncpg.connect(
+            url.set(drivername="postgresql").render_as_string(hide_password=False)
+        )
+        await self._connection.add_listener(CHANNEL, self._notified)
+        await self._connection.add_listener(PROGRESS_CHANNEL, self._notified)
+        logger.info(f"Listening for task events on channels {CHANNEL} and {PROGRESS_CHANNEL}")
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+
+# wake-ups of the workers and task watchers of this process
+task_events = TaskEvents()
@@ -1,4 +1,3 @@
-import io
 import os
 import re
 import subprocess
@@ -6,7 +5,7 @@ import tempfile
 from datetime import datetime
 from typing import List, Tuple, Dict, Any
 
-import chess.pgn
+from app.analysis.analytics.pgn_reader import read_mainline
 
 
 async def parse_video_filename(filename: str) -> Tuple[int, int]:
@@ -26,28 +25,12 @@ async def parse_video_filename(filename: str) -> Tuple[int, int]:
 
 async def extract_move_timestamps_from_pgn(pgn_data: str) -> Dict[int, int]:
     """Extracts timestamps for each move from PGN data"""
-    pgn_io = io.StringIO(pgn_data)
-    game = chess.pgn.read_game(pgn_io)
+    game = read_mainline(pgn_data)
 
-    if not game:
+    if game is None:
         raise ValueError("Could not parse PGN data")
 
-    move_timestamps = {}
-    node = game
-    move_number = 0
-
-    while node.variations:
-        next_node = node.variations[0]
-        move_number += 1
-
-        if next_node.comment:
-            ts_match = re.search(r"\[%ts (\d+)\]", next_node.comment)
-            if ts_match:
-                move_timestamps[move_number] = int(ts_match.group(1))
-
-        node = next_node
-
-    return move_timestamps
+    return game.timestamps
 
 
 async def find_segments_for_highlight(
@@ -0,0 +1,244 @@
+"""
+Queue worker: claims pending tasks from the `tasks` table and runs them.
+
+Any number of workers on any number of nodes can drain one queue. The API
+process runs an embedded worker as well unless `queue.api_concurrency` is 0.
+
+    python -m app.worker --concurrency 4
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import uuid
+from datetime import timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import Task, TaskStatus, TaskType
+from app.analysis.analytics import engine_pool, detector_pool, evaluation_cache, tablebase
+from app.config import settings
+from app.db import get_sql_sessionmaker, SQLAlchemyUnitOfWork
+from app.utils.helpers import run_analysis, run_video_cut
+from app.utils.logging import setup_logging
+from app.utils.task_events import TaskEvents, task_events
+
+Runner = Callable[[Task], Awaitable[None]]
+
+# how each task type is run; run_analysis and run_video_cut set the final status themselves
+RUNNERS: Dict[TaskType, Runner] = {
+    TaskType.GAME_ANALYSIS: lambda task: run_analysis(task.game_id, task.id),
+    TaskType.VIDEO_PROCESSING: lambda task: run_video_cut(task.game_id, task.id, task.depends_on_id),
+}
+
+
+class TaskWorker:
+    """
+    Claims tasks from the queue and runs up to `concurrency` of them at once.
+
+    A claimed task is leased to the worker for `lease_seconds` and the lease is
+    renewed while the task runs, so the task of a worker that died is claimed
+    again by another worker once its lease expires. A worker that fails to renew
+    a lease stops the task, since another worker may have it by then. A task
+    claimed more than `max_attempts` times, whose workers keep dying on it, is
+    failed instead of being run again. Tasks still running when the worker is
+    closed go back to the queue.
+
+    Besides the total `concurrency`, `limits` cap the tasks of one type running
+    at once, so that analyses and video cuts do not take the whole machine. The
+    caps hold for the whole queue, counting the tasks of every worker that
+    shares the database, so the API and any number of workers can use the same
+    configuration.
+    Which task is claimed next is decided by the queue order (priority, then
+    per-user fairness, see `TaskRepository.claim`).
+
+    A task waits until the task it depends on has finished. An idle worker
+    sleeps until `events` report a queued or finished task; it looks at the
+    queue every `poll_interval` seconds as well, which picks up expired leases
+    and, without PostgreSQL, tasks queued by other processes.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker, concurrency: int = 1, lease_seconds: int = 60,
+                 poll_interval: float = 5.0, runners: Optional[Dict[TaskType, Runner]] = None,
+                 worker_id: Optional[str] = None, events: TaskEvents = task_events,
+                 limits: Optional[Dict[TaskType, int]] = None, max_attempts: int = 3):
+        if concurrency < 1:
+            raise ValueError("Worker concurrency must be at least 1")
+        if max_attempts < 1:
+            raise ValueError("Tasks need at least one attempt")
+        if limits and min(limits.values()) < 0:
+            raise ValueError("Task type limits cannot be negative")
+
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        self.lease = timedelta(seconds=lease_seconds)
+        self.poll_interval = poll_interval
+        self.runners = runners if runners is not None else RUNNERS
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.events = events
+        self.limits = limits or {}
+        self.max_attempts = max_attempts
+
+        self._loop: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+        self._active: Dict[TaskType, int] = dict.fromkeys(self.runners, 0)
+
+    def free_types(self) -> List[TaskType]:
+        """Task types this worker can take one more task of right now."""
+        if sum(self._active.values()) >= self.concurrency:
+            return []
+        return [
+            task_type for task_type, active in self._active.items()
+            if active < self.limits.get(task_type, self.concurrency)
+        ]
+
+    def start(self) -> None:
+        if self._loop is None:
+            self._loop = asyncio.create_task(self.run())
+            logger.info(f"Started task worker {self.worker_id} with concurrency {self.concurrency}")
+
+    async def close(self) -> None:
+        """Stop claiming tasks and put the running ones back in the queue."""
+        jobs = list(self._running)
+        if self._loop is not None:
+            jobs.append(self._loop)
+            self._loop = None
+
+        for job in jobs:
+            job.cancel()
+        await asyncio.gather(*jobs, return_exceptions=True)
+
+        logger.info(f"Task worker {self.worker_id} stopped")
+
+    async def claim(self, types: List[TaskType]) -> Optional[Task]:
+        async with SQLAlchemyUnitOfWork(self.session_factory) as uow:
+            task = await uow.task.claim(self.worker_id, self.lease, types, self.limits)
+            if task is not None:
+                await uow.task.announce_progress(task.id)
+            await uow.commit()
+
+        if task is not None:
+            self.events.progress(task.id)
+        return task
+
+    async def run(self) -> None:
+        """Claim and run tasks until cancelled."""
+        while True:
+            # a finished task wakes the loop as well, so a freed slot is taken at once
+            changed = self.events.subscribe()
+
+            task = None
+            types = self.free_types()
+            if types:
+                try:
+                    task = await self.claim(types)
+                except Exception as e:
+                    logger.error(f"Task worker {self.worker_id} could not claim a task: {e}")
+
+            if task is None:
+                await self.events.wait(changed, self.poll_interval)
+                continue
+
+            self._active[task.type] += 1
+            job = asyncio.create_task(self._execute(task))
+            self._running.add(job)
+            job.add_done_callback(self._running.discard)
+
+    async def _execute(self, task: Task) -> None:
+        logger.info(f"Task worker {self.worker_id} took task {task.id} ({task.type.value}, {task.priority.value})")
+        keep_lease = asyncio.create_task(self._keep_lease(task.id, asyncio.current_task()))
+
+        status, error_message = None, None
+        try:
+            if task.attempts > self.max_attempts:
+                # the workers that took it before died or lost it without finishing it
+                logger.error(f"Task {task.id} was given up after {self.max_attempts} attempts")
+                status, error_message = TaskStatus.FAILED, f"Task did not finish in {self.max_attempts} attempts"
+            else:
+                await self.runners[task.type](task)
+        except asyncio.CancelledError:
+            # a task whose lease was lost is left to whoever holds it now; otherwise the worker is closing
+            if not keep_lease.done():
+                status = TaskStatus.PENDING
+            raise
+        except Exception as e:
+            # run_analysis and run_video_cut handle their own errors; this is for anything they let through
+            logger.error(f"Task {task.id} failed in worker {self.worker_id}: {e}")
+            status, error_message = TaskStatus.FAILED, str(e)
+        finally:
+            keep_lease.cancel()
+            self._active[task.type] -= 1
+
+            async with SQLAlchemyUnitOfWork(self.session_factory) as uow:
+                await uow.task.release(task.id, self.worker_id, status, error_message)
+                await uow.task.announce(task.id)
+                await uow.commit()
+
+            # tasks that waited for this one, and the slot it took, are free now
+            self.events.wake(task.id)
+
+    async def _keep_lease(self, task_id: int, job: asyncio.Task) -> None:
+        """Renew the lease of a running task; stop `job` if the lease was lost."""
+        while True:
+            await asyncio.sleep(self.lease.total_seconds() / 3)
+
+            try:
+                async with SQLAlchemyUnitOfWork(self.session_factory) as uow:
+                    renewed = await uow.task.renew_lease(task_id, self.worker_id, self.lease)
+                    await uow.commit()
+            except Exception as e:
+                # the lease is still ours until it expires, the next renewal may get through
+                logger.error(f"Task worker {self.worker_id} could not renew the lease of task {task_id}: {e}")
+                continue
+
+            if not renewed:
+                logger.warning(f"Task worker {self.worker_id} lost the lease of task {task_id}, stopping it")
+                job.cancel()
+                return
+
+
+def queue_limits() -> Dict[TaskType, int]:
+    """Per-type limits from the [queue.limits] section of config.toml."""
+    return {TaskType(name): limit for name, limit in settings.queue.limits.items()}
+
+
+async def serve(concurrency: int) -> None:
+    await engine_pool.start()
+    await detector_pool.start()
+    await task_events.listen(settings.database.connection_string)
+
+    worker = TaskWorker(get_sql_sessionmaker(), concurrency, settings.queue.lease_seconds,
+                        settings.queue.poll_interval, limits=queue_limits(),
+                        max_attempts=settings.queue.max_attempts)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    worker.start()
+    try:
+        await stop.wait()
+    finally:
+        await worker.close()
+        await task_events.close()
+        await detector_pool.close()
+        await engine_pool.close()
+
+        if evaluation_cache is not None:
+            evaluation_cache.close()
+        if tablebase is not None:
+            tablebase.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=settings.queue.worker_concurrency,
+                        help="tasks this worker runs at once")
+    args = parser.parse_args()
+
+    setup_logging()
+    asyncio.run(serve(args.concurrency))
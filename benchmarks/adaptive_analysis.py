@@ -0,0 +1,54 @@
+"""
+Compares adaptive two-pass engine analysis with the full-depth pass.
+
+The full-depth swings are the reference: the report shows how many of them
+the adaptive mode finds (recall), how many of its swings are not in the
+reference (precision), and what it costs in searches, nodes and wall time.
+
+    python -m benchmarks.adaptive_analysis games.pgn --engine /usr/bin/stockfish
+"""
+import argparse
+import asyncio
+import json
+
+from .engine import CountingEnginePool, engine_command, load_games, run_engine_pass
+
+
+async def main(args):
+    games = load_games(args.pgn)
+    pool = CountingEnginePool(engine_command(args.engine), size=args.workers)
+    await pool.start()
+
+    common = dict(threshold=args.threshold, analysis_depth=args.depth, workers=args.workers)
+
+    try:
+        reference, full = await run_engine_pass(pool, games, **common)
+        found, adaptive = await run_engine_pass(
+            pool, games, shallow_depth=args.shallow_depth, refine_fraction=args.refine_fraction, **common
+        )
+    finally:
+        await pool.close()
+
+    expected = sum(len(swings) for swings in reference)
+    reported = sum(len(swings) for swings in found)
+    matched = sum(len(ref & got) for ref, got in zip(reference, found))
+
+    adaptive["recall"] = round(matched / expected, 3) if expected else 1.0
+    adaptive["precision"] = round(matched / reported, 3) if reported else 1.0
+    adaptive["node_ratio"] = round(adaptive["total_nodes"] / full["total_nodes"], 3) if full["total_nodes"] else None
+
+    report = {"games": len(games), "plies": sum(len(game) for game in games), "full": full, "adaptive": adaptive}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pgn", help="PGN file with one or more games")
+    parser.add_argument("--engine", default="stub", help="path to a UCI engine, or 'stub'")
+    parser.add_argument("--depth", type=int, default=16)
+    parser.add_argument("--shallow-depth", type=int, default=8)
+    parser.add_argument("--refine-fraction", type=float, default=0.5)
+    parser.add_argument("--threshold", type=int, default=290)
+    parser.add_argument("--workers", type=int, default=1)
+
+    asyncio.run(main(parser.parse_args()))
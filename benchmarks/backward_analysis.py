@@ -0,0 +1,49 @@
+"""
+Compares forward and backward order of whole-game engine analysis.
+
+Both passes use the same warm engines; the engine hash is only reset by
+ucinewgame between games. The report shows nodes and wall time for each
+order and how many forward swings the backward pass reproduces.
+
+    python -m benchmarks.backward_analysis games.pgn --engine /usr/bin/stockfish
+"""
+import argparse
+import asyncio
+import json
+
+from .engine import CountingEnginePool, engine_command, load_games, run_engine_pass
+
+
+async def main(args):
+    games = load_games(args.pgn)
+    pool = CountingEnginePool(engine_command(args.engine), size=args.workers)
+    await pool.start()
+
+    common = dict(threshold=args.threshold, analysis_depth=args.depth, workers=args.workers)
+
+    try:
+        reference, forward = await run_engine_pass(pool, games, backward=False, **common)
+        found, backward = await run_engine_pass(pool, games, backward=True, **common)
+    finally:
+        await pool.close()
+
+    expected = sum(len(swings) for swings in reference)
+    matched = sum(len(ref & got) for ref, got in zip(reference, found))
+
+    backward["matching_swings"] = round(matched / expected, 3) if expected else 1.0
+    backward["node_ratio"] = round(backward["total_nodes"] / forward["total_nodes"], 3) if forward["total_nodes"] else None
+    backward["time_ratio"] = round(backward["wall_time"] / forward["wall_time"], 3) if forward["wall_time"] else None
+
+    report = {"games": len(games), "plies": sum(len(game) for game in games), "forward": forward, "backward": backward}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pgn", help="PGN file with one or more games")
+    parser.add_argument("--engine", default="stub", help="path to a UCI engine, or 'stub'")
+    parser.add_argument("--depth", type=int, default=16)
+    parser.add_argument("--threshold", type=int, default=290)
+    parser.add_argument("--workers", type=int, default=1)
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,153 @@
+"""
+Micro-benchmark of the bitboard fork and pin/skewer kernels against
+scalar square-by-square versions of the same rules.
+
+Both kernels run over every position of the corpus; the report gives calls
+per second for each version and fails if their outputs differ.
+
+    python -m benchmarks.detectors games.pgn --repeat 5
+"""
+import argparse
+import json
+import time
+from typing import Any, Callable, List, Tuple
+
+import chess
+
+from app.analysis.analytics.attack_map import AttackMap
+from app.analysis.analytics.heuristic_functions import (
+    PIECE_VALUE,
+    _find_pins_and_skewers,
+    ForkDetector,
+)
+
+from app.analysis.analytics.util import static_exchange
+
+from .engine import load_games
+
+
+def scalar_fork_targets(board: chess.Board, attacker_sq: chess.Square) -> dict:
+    """Fork targets of the piece on attacker_sq, as computed before the bitboard kernel."""
+    attacker = board.piece_at(attacker_sq)
+
+    attacked_now = {}
+    for sq in board.attacks(attacker_sq):
+        piece = board.piece_at(sq)
+        if not piece or piece.color == attacker.color or piece.piece_type == chess.PAWN:
+            continue
+
+        if piece.piece_type == chess.KING or static_exchange(board, sq) > 0:
+            attacked_now[sq] = (piece.color, piece.piece_type)
+
+    return attacked_now if len(attacked_now) >= 2 else {}
+
+
+def bitboard_fork_targets(attacks: AttackMap, attacker_sq: chess.Square) -> dict:
+    """Fork targets of the piece on attacker_sq through ForkDetector.after_move."""
+    detector = ForkDetector(game=None, attacks=attacks)
+    detector.after_move(attacks.board, chess.Move(attacker_sq, attacker_sq), 0)
+    return detector.active_forks[0]["targets"] if detector.active_forks else {}
+
+
+# directions each slider moves in
+LINE_STEPS = {
+    chess.BISHOP: ((1, 1), (1, -1), (-1, 1), (-1, -1)),
+    chess.ROOK: ((1, 0), (-1, 0), (0, 1), (0, -1)),
+}
+LINE_STEPS[chess.QUEEN] = LINE_STEPS[chess.BISHOP] + LINE_STEPS[chess.ROOK]
+
+
+def scalar_pins_and_skewers(board: chess.Board, slider_sq: chess.Square) -> List[Tuple[int, int]]:
+    """Pins and skewers walked square by square along each line, without the ray tables."""
+    slider = board.piece_at(slider_sq)
+    slider_val = PIECE_VALUE[slider.piece_type]
+    pins = []
+
+    for df, dr in LINE_STEPS[slider.piece_type]:
+        f = chess.square_file(slider_sq) + df
+        r = chess.square_rank(slider_sq) + dr
+        line = []
+
+        while 0 <= f < 8 and 0 <= r < 8 and len(line) < 2:
+            sq = chess.square(f, r)
+            if board.piece_at(sq) is not None:
+                line.append(sq)
+            f += df
+            r += dr
+
+        if len(line) < 2:
+            continue
+
+        front, back = (board.piece_at(sq) for sq in line)
+        if any(piece.color == slider.color or piece.piece_type == chess.PAWN for piece in (front, back)):
+            continue
+        if max(PIECE_VALUE[front.piece_type], PIECE_VALUE[back.piece_type]) > slider_val:
+            pins.append(tuple(line))
+
+    return sorted(pins)
+
+
+def bitboard_pins_and_skewers(attacks: AttackMap, slider_sq: chess.Square) -> List[Tuple[int, int]]:
+    """Pins and skewers from the ray tables, in the order of the scalar walk."""
+    return sorted(_find_pins_and_skewers(attacks, slider_sq))
+
+
+def collect_positions(path: str) -> List[Tuple[AttackMap, chess.Square]]:
+    """Attack maps of the position after every move of the corpus with the square the move went to."""
+    positions = []
+    for game in load_games(path):
+        board = game.board_at(0)
+        for move in game.moves:
+            board.push(move)
+            positions.append((AttackMap(board.copy(stack=False)), move.to_square))
+    return positions
+
+
+def measure(kernel: Callable, calls: List[Tuple[Any, chess.Square]], repeat: int) -> Tuple[float, list]:
+    """Best calls per second over `repeat` runs and the outputs of the last run."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        outputs = [kernel(position, square) for position, square in calls]
+        best = min(best, time.perf_counter() - started)
+    return len(calls) / best, outputs
+
+
+def compare(name: str, scalar: Callable, bitboard: Callable, calls, repeat: int) -> dict:
+    """Scalar kernels get the board, bitboard kernels get its attack map."""
+    scalar_rate, expected = measure(scalar, [(attacks.board, square) for attacks, square in calls], repeat)
+    bitboard_rate, got = measure(bitboard, calls, repeat)
+
+    if got != expected:
+        raise SystemExit(f"{name}: bitboard kernel output differs from the scalar kernel")
+
+    return {
+        "calls": len(calls),
+        "scalar_calls_per_sec": round(scalar_rate),
+        "bitboard_calls_per_sec": round(bitboard_rate),
+        "speedup": round(bitboard_rate / scalar_rate, 2),
+    }
+
+
+def main(args):
+    positions = collect_positions(args.pgn)
+
+    sliders = [
+        (attacks, square)
+        for attacks, _ in positions
+        for square in chess.scan_forward(attacks.board.bishops | attacks.board.rooks | attacks.board.queens)
+    ]
+
+    report = {
+        "positions": len(positions),
+        "forks": compare("forks", scalar_fork_targets, bitboard_fork_targets, positions, args.repeat),
+        "pins": compare("pins", scalar_pins_and_skewers, bitboard_pins_and_skewers, sliders, args.repeat),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pgn", help="PGN file with one or more games")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per kernel, the best one is reported")
+    main(parser.parse_args())
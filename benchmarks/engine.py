@@ -0,0 +1,83 @@
+"""
+Helpers shared by the analysis benchmarks.
+"""
+import os
+import sys
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Set, Tuple
+
+import chess.engine
+
+from app.analysis.analytics.engine_pool import EnginePool
+from app.analysis.analytics.heuristic_functions import stockfish_moments
+from app.analysis.analytics.pgn_reader import iter_mainlines
+from app.analysis.analytics.timeline import GameTimeline
+
+# stub UCI engine from the test suite, used when no real engine is given
+STUB_ENGINE = [sys.executable, os.path.join(os.path.dirname(__file__), os.pardir, "tests", "uci_stub.py")]
+
+
+class CountingEngine:
+    """Engine proxy that records every search made through `analyse`."""
+
+    def __init__(self, engine: chess.engine.UciProtocol, pool: "CountingEnginePool"):
+        self._engine = engine
+        self._pool = pool
+
+    async def analyse(self, board: chess.Board, limit: chess.engine.Limit, **kwargs):
+        info = await self._engine.analyse(board, limit, **kwargs)
+        self._pool.searches[limit.depth] += 1
+        self._pool.nodes[limit.depth] += info.get("nodes", 0)
+        return info
+
+    def __getattr__(self, name):
+        return getattr(self._engine, name)
+
+
+class CountingEnginePool(EnginePool):
+    """EnginePool that counts searches and nodes per requested depth."""
+
+    def __init__(self, engine_path, size: int):
+        super().__init__(engine_path, size)
+        self.searches: Counter = Counter()
+        self.nodes: Counter = Counter()
+
+    def reset(self) -> None:
+        self.searches.clear()
+        self.nodes.clear()
+
+    @asynccontextmanager
+    async def engine(self) -> AsyncIterator[CountingEngine]:
+        async with super().engine() as engine:
+            yield CountingEngine(engine, self)
+
+
+def engine_command(engine: str) -> List[str]:
+    """Engine command line from a --engine argument ("stub" means the test stub)."""
+    return STUB_ENGINE if engine == "stub" else [engine]
+
+
+def load_games(path: str) -> List[GameTimeline]:
+    """Timelines of all games in a (multi-game) PGN file."""
+    with open(path, encoding="utf-8") as pgn:
+        return [GameTimeline(game.board, game.moves) for game in iter_mainlines(pgn)]
+
+
+async def run_engine_pass(pool: CountingEnginePool, games: List[GameTimeline],
+                          **options) -> Tuple[List[Set[Tuple[int, int]]], Dict[str, Any]]:
+    """Runs stockfish_moments over all games; returns swings per game and cost counters."""
+    pool.reset()
+    started = time.perf_counter()
+
+    swings = []
+    for game in games:
+        swings.append(set(await stockfish_moments(game, pool, **options)))
+
+    return swings, {
+        "wall_time": round(time.perf_counter() - started, 3),
+        "searches": dict(pool.searches),
+        "nodes": dict(pool.nodes),
+        "total_nodes": sum(pool.nodes.values()),
+    }
@@ -0,0 +1,87 @@
+"""
+Compares the mainline PGN reader with chess.pgn.read_game.
+
+Both readers go through every game of the file and extract the same data:
+headers, mainline moves, SAN strings and [%ts]/[%clk] comment values.
+The report gives games and plies per second for each, and fails if the
+extracted data differ.
+
+    python -m benchmarks.pgn_reader games.pgn --repeat 3
+"""
+import argparse
+import json
+import time
+from typing import Any, Callable, List, Tuple
+
+import chess.pgn
+
+from app.analysis.analytics.pgn_reader import TIMESTAMP_REGEX, iter_mainlines
+
+
+def with_read_game(path: str) -> List[Tuple[Any, ...]]:
+    """Mainline data of every game through the GameNode tree."""
+    games = []
+    with open(path, encoding="utf-8") as pgn:
+        while (game := chess.pgn.read_game(pgn)) is not None:
+            moves, san, timestamps, clocks = [], [], {}, {}
+            board = game.board()
+
+            for ply, node in enumerate(game.mainline(), start=1):
+                moves.append(node.move)
+                san.append(board.san(node.move))
+                board.push(node.move)
+
+                ts_match = TIMESTAMP_REGEX.search(node.comment)
+                if ts_match:
+                    timestamps[ply] = int(ts_match.group(1))
+                if node.clock() is not None:
+                    clocks[ply] = node.clock()
+
+            games.append((dict(game.headers), moves, san, timestamps, clocks))
+    return games
+
+
+def with_mainline_reader(path: str) -> List[Tuple[Any, ...]]:
+    """Mainline data of every game through MainlineBuilder."""
+    with open(path, encoding="utf-8") as pgn:
+        return [
+            (dict(game.headers), game.moves, game.san, game.timestamps, game.clocks)
+            for game in iter_mainlines(pgn)
+        ]
+
+
+def measure(reader: Callable, path: str, repeat: int) -> Tuple[float, list]:
+    """Best wall time over `repeat` runs and the output of the last run."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        games = reader(path)
+        best = min(best, time.perf_counter() - started)
+    return best, games
+
+
+def main(args):
+    tree_time, expected = measure(with_read_game, args.pgn, args.repeat)
+    flat_time, got = measure(with_mainline_reader, args.pgn, args.repeat)
+
+    # read_game normalises SAN, the mainline reader keeps it as written
+    strip = [(headers, moves, timestamps, clocks) for headers, moves, _, timestamps, clocks in expected]
+    if strip != [(headers, moves, timestamps, clocks) for headers, moves, _, timestamps, clocks in got]:
+        raise SystemExit("mainline reader output differs from read_game")
+
+    plies = sum(len(game[1]) for game in got)
+    report = {
+        "games": len(got),
+        "plies": plies,
+        "read_game": {"seconds": round(tree_time, 3), "games_per_sec": round(len(got) / tree_time)},
+        "mainline_reader": {"seconds": round(flat_time, 3), "games_per_sec": round(len(got) / flat_time)},
+        "speedup": round(tree_time / flat_time, 2),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pgn", help="PGN file with one or more games")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per reader, the best one is reported")
+    main(parser.parse_args())
@@ -0,0 +1,240 @@
+"""
+Benchmark suite for the analytics strategy over the bundled PGN corpus.
+
+The corpus in benchmarks/corpus has four categories: short, long, tactical
+and quiet games (the quiet lines and the last long game are constructed,
+the others are well-known games). For every category the suite reports:
+
+- throughput of each registered board detector in the shared pass, and of
+  the pass itself (plies per second);
+- the cost of one extend_interval call;
+- intervals found by the default detectors before and after merge_intervals,
+  with the merged output;
+- wall time and output of AnalyticsStrategy.analyze end to end.
+
+The engine is the stub UCI engine from the tests unless --engine is given,
+so the suite runs anywhere; with the stub, end-to-end time measures our own
+overhead rather than search. Results are written as JSON. With --baseline
+the report also gives speed ratios against an earlier run (above 1 is
+faster) and flags categories whose output changed.
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --baseline results.json --repeat 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import time
+from typing import Any, Dict, List, Optional
+
+import chess
+
+from app.analysis.analytics.detector_pool import DetectorPool
+from app.analysis.analytics.engine_pool import EnginePool
+from app.analysis.analytics.heuristic_functions import (
+    DEFAULT_DETECTORS,
+    DETECTORS,
+    extend_interval,
+    profile_detectors,
+)
+from app.analysis.analytics.interface import AnalyticsStrategy
+from app.analysis.analytics.timeline import GameTimeline
+from app.analysis.analytics.util import intervals_format, merge_intervals
+
+from .engine import engine_command, load_games
+
+CORPUS = os.path.join(os.path.dirname(__file__), "corpus")
+CATEGORIES = ("short", "long", "tactical", "quiet")
+
+
+def rate(count: int, seconds: float) -> Optional[float]:
+    return round(count / seconds, 1) if seconds > 0 else None
+
+
+def pgn_text(game: GameTimeline) -> str:
+    """Movetext of the mainline, as AnalyticsStrategy.analyze takes it."""
+    return game.board_at(0).variation_san(game.moves)
+
+
+def measure_detectors(games: List[GameTimeline], repeat: int) -> Dict[str, Any]:
+    """Best time over `repeat` runs of every board detector in one shared pass."""
+    detectors = [detector for detector in DETECTORS.values() if not detector.needs_engine]
+    plies = sum(len(game) for game in games)
+
+    best = {detector.name: float("inf") for detector in detectors}
+    replay = float("inf")
+    intervals = {}
+
+    # untimed pass, so that the first category does not pay for lazy initialisation
+    for game in games:
+        profile_detectors(game, detectors)
+
+    for _ in range(repeat):
+        # the pass without detectors is the shared replay cost
+        started = time.perf_counter()
+        for game in games:
+            profile_detectors(game, [])
+        replay = min(replay, time.perf_counter() - started)
+
+        seconds = dict.fromkeys(best, 0.0)
+        intervals = dict.fromkeys(best, 0)
+        for game in games:
+            for entry in profile_detectors(game, detectors)[1]:
+                seconds[entry.name] += entry.seconds
+                intervals[entry.name] += entry.intervals
+        best = {name: min(best[name], seconds[name]) for name in best}
+
+    return {
+        "replay": {"seconds": round(replay, 4), "plies_per_sec": rate(plies, replay)},
+        "detectors": {
+            name: {"seconds": round(best[name], 4), "plies_per_sec": rate(plies, best[name]),
+                   "intervals": intervals[name]}
+            for name in best
+        },
+    }
+
+
+def measure_extend_interval(games: List[GameTimeline], repeat: int) -> Dict[str, Any]:
+    """Best time over `repeat` runs of extend_interval around every ply."""
+    calls = sum(len(game) for game in games)
+
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for game in games:
+            for ply in range(1, len(game) + 1):
+                extend_interval(game, ply - 1, ply)
+        best = min(best, time.perf_counter() - started)
+
+    return {"calls": calls, "us_per_call": round(best / calls * 1e6, 2) if calls else None}
+
+
+def measure_merge(games: List[GameTimeline]) -> Dict[str, Any]:
+    """Intervals of the default detectors before and after merge_intervals."""
+    raw, merged, output = 0, 0, []
+    for game in games:
+        intervals, _ = profile_detectors(game, DEFAULT_DETECTORS)
+        game_merged = merge_intervals(intervals)
+
+        raw += len(intervals)
+        merged += len(game_merged)
+        output.append([list(interval) for interval in intervals_format(game_merged)])
+
+    return {"intervals": raw, "merged": merged, "output": output}
+
+
+async def measure_analyze(games: List[GameTimeline], engines: EnginePool, detectors: DetectorPool,
+                          depth: int) -> Dict[str, Any]:
+    """
+    Wall time and output of AnalyticsStrategy.analyze for every game. The evaluation cache, the opening
+    trie and the tablebases are off, so every position is searched and the result of a game does not
+    depend on the games measured before it.
+    """
+    strategy = AnalyticsStrategy()
+    plies = sum(len(game) for game in games)
+    output = []
+
+    started = time.perf_counter()
+    for game in games:
+        highlights = await strategy.analyze(
+            pgn_text(game), engines, detectors,
+            analysis_depth=depth, workers=1, cache=None, openings=None, tablebase=None,
+            shallow_depth=None, backward=False,
+        )
+        output.append([list(highlight) for highlight in highlights])
+    seconds = time.perf_counter() - started
+
+    return {"seconds": round(seconds, 3), "plies_per_sec": rate(plies, seconds), "output": output}
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """Speed ratios against a baseline report (above 1 is faster) and changed outputs."""
+    def ratio(new: Optional[float], old: Optional[float]) -> Optional[float]:
+        return round(new / old, 3) if new and old else None
+
+    comparison = {}
+    for category, current in report["categories"].items():
+        previous = baseline.get("categories", {}).get(category)
+        if previous is None:
+            continue
+
+        comparison[category] = {
+            "replay": ratio(current["replay"]["plies_per_sec"], previous["replay"]["plies_per_sec"]),
+            "detectors": {
+                name: ratio(stats["plies_per_sec"], previous["detectors"].get(name, {}).get("plies_per_sec"))
+                for name, stats in current["detectors"].items()
+            },
+            # lower is better for the per-call cost, so the ratio is inverted
+            "extend_interval": ratio(previous["extend_interval"]["us_per_call"],
+                                     current["extend_interval"]["us_per_call"]),
+            "analyze": ratio(current["analyze"]["plies_per_sec"], previous["analyze"]["plies_per_sec"]),
+            "merge_output_changed": current["merge_intervals"]["output"] != previous["merge_intervals"]["output"],
+            "analyze_output_changed": current["analyze"]["output"] != previous["analyze"]["output"],
+        }
+    return comparison
+
+
+def revision() -> Optional[str]:
+    """Current git commit, if the suite runs from a checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args):
+    engines = EnginePool(engine_command(args.engine), size=1)
+    detectors = DetectorPool(args.processes)
+    await engines.start()
+    await detectors.start()
+
+    report = {
+        "commit": revision(),
+        "python": platform.python_version(),
+        "chess": chess.__version__,
+        "engine": args.engine,
+        "depth": args.depth,
+        "repeat": args.repeat,
+        "categories": {},
+    }
+
+    try:
+        for category in CATEGORIES:
+            games = load_games(os.path.join(args.corpus, f"{category}.pgn"))
+            report["categories"][category] = {
+                "games": len(games),
+                "plies": sum(len(game) for game in games),
+                **measure_detectors(games, args.repeat),
+                "extend_interval": measure_extend_interval(games, args.repeat),
+                "merge_intervals": measure_merge(games),
+                "analyze": await measure_analyze(games, engines, detectors, args.depth),
+            }
+    finally:
+        await detectors.close()
+        await engines.close()
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline:
+            report["comparison"] = compare(report, json.load(baseline))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            output.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS, help="directory with short/long/tactical/quiet.pgn")
+    parser.add_argument("--engine", default="stub", help="path to a UCI engine, or 'stub' for the test stub")
+    parser.add_argument("--depth", type=int, default=16, help="engine analysis depth")
+    parser.add_argument("--processes", type=int, default=0, help="detector pool processes, 0 runs them inline")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of the timed loops, the best one is reported")
+    parser.add_argument("--output", help="write the JSON report to this file as well")
+    parser.add_argument("--baseline", help="JSON report of an earlier run to compare with")
+    asyncio.run(main(parser.parse_args()))
@@ -1,12 +1,14 @@
 import asyncio
 from datetime import datetime
 
+import chess
 import pytest
 import pytest_asyncio
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 
-from app import User, Game, Highlight, Video, VideoSegment, Task, UserRole, TaskType, TaskStatus
-from app.core import Base
+from app import User, Game, Highlight, Video, VideoSegment, Task, UserRole, TaskType, TaskStatus, AnalysisResult
+from app.analysis.analytics.evaluation_curve import EvaluationCurve
+from app.core import Base, StrategyType
 from app.db import SQLAlchemyRepository, SQLAlchemyUnitOfWork
 from app.db.crud import UserRepository
 
@@ -311,6 +313,61 @@ class TestUserRepository:
         assert len(retrieved_user.tasks) >= 1
 
 
+class TestAnalysisResultRepository:
+    """Test cases specifically for AnalysisResultRepository."""
+
+    @pytest.mark.asyncio
+    async def test_save_and_get(self, uow):
+        """Test that a cached result is found by its key and a second save of the same key is ignored."""
+        def result(description):
+            return AnalysisResult(key="a" * 64, strategy_type=StrategyType.ANALYTICS,
+                                  parameters={"detectors": ["fork"]}, results=[["4B", "7B", description]])
+
+        await uow.analysis_result.save(result("first"))
+        await uow.analysis_result.save(result("second"))
+
+        cached = await uow.analysis_result.get("a" * 64)
+        assert cached.results == [["4B", "7B", "first"]]
+        assert await uow.analysis_result.get("b" * 64) is None
+
+
+class TestGameEvaluationRepository:
+    """Test cases specifically for GameEvaluationRepository."""
+
+    @pytest.mark.asyncio
+    async def test_save_and_replace_curve(self, uow, sample_game):
+        """Test that the stored curve of a game is read back and replaced by a newer one."""
+        game = await uow.game.create(sample_game)
+        assert await uow.game_evaluation.get_curve(game.id) is None
+
+        curve = EvaluationCurve()
+        curve.fill({0: 20, 1: 35, 2: -300}, plies=2, depth=12, engine="UCI stub")
+        await uow.game_evaluation.save_curve(game.id, curve)
+
+        curve.fill({0: 25, 2: -310}, plies=2, depth=16, engine="UCI stub")
+        await uow.game_evaluation.save_curve(game.id, curve)
+
+        stored = await uow.game_evaluation.get_curve(game.id)
+        assert stored.depth == 16
+        assert stored.as_list() == [25, None, -310]
+
+    @pytest.mark.asyncio
+    async def test_list_openings(self, uow, sample_game):
+        """Test that only curves stored with an opening are listed, cut to the opening plies."""
+        game = await uow.game.create(sample_game)
+        curve = EvaluationCurve()
+        curve.fill({0: 20, 1: 35, 2: 10}, plies=2, depth=12, engine="UCI stub")
+        await uow.game_evaluation.save_curve(game.id, curve, chess.STARTING_FEN, "e2e4")
+
+        other = await uow.game.create(Game(title="Other", date=datetime.now(), white_player="W", black_player="B",
+                                           pgn_data="1. d4"))
+        await uow.game_evaluation.save_curve(other.id, curve)
+
+        [(start, opening, scores, depth, engine)] = await uow.game_evaluation.list_openings(1)
+        assert (start, opening, depth, engine) == (chess.STARTING_FEN, "e2e4", 12, "UCI stub")
+        assert EvaluationCurve.from_bytes(scores, depth, engine).as_list() == [20, 35]
+
+
 class TestUnitOfWork:
     """Test cases for SQLAlchemyUnitOfWork."""
 
@@ -323,6 +380,7 @@ class TestUnitOfWork:
         assert uow.video is not None
         assert uow.video_segment is not None
         assert uow.task is not None
+        assert uow.analysis_result is not None
 
     @pytest.mark.asyncio
     async def test_commit(self, session_factory):
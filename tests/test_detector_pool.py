@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from app.analysis.analytics.detector_pool import DetectorPool
+from app.analysis.analytics.heuristic_functions import (
+    detect_moments,
+    find_all_moments,
+    find_moments_without_stockfish,
+)
+from app.analysis.analytics.engine_pool import EnginePool
+from tests.test_engine_pool import STUB_ENGINE
+from tests.test_heuristics import FORK_PGN, OPERA_PGN
+
+
+class TestDetectorPool:
+    """Test cases for DetectorPool."""
+
+    @pytest.mark.asyncio
+    async def test_process_results_match_inline(self):
+        """Test that detectors run in worker processes return the same intervals."""
+        pool = DetectorPool(1)
+        try:
+            for pgn in (FORK_PGN, OPERA_PGN):
+                assert await pool.run(detect_moments, pgn) == detect_moments(pgn)
+        finally:
+            await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_event_loop_stays_responsive(self):
+        """Test that the event loop keeps running while detectors work in another process."""
+        pool = DetectorPool(1)
+        await pool.start()
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        task = asyncio.ensure_future(ticker())
+        try:
+            await pool.run(detect_moments, OPERA_PGN)
+            assert ticks > 1
+        finally:
+            task.cancel()
+            await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_inline_pool(self):
+        """Test that a pool of size 0 runs functions in the current process."""
+        pool = DetectorPool(0)
+        assert await pool.run(detect_moments, FORK_PGN) == detect_moments(FORK_PGN)
+        assert not pool.started
+
+    def test_invalid_size(self):
+        """Test that a negative pool size is rejected."""
+        with pytest.raises(ValueError):
+            DetectorPool(-1)
+
+    @pytest.mark.asyncio
+    async def test_find_all_moments(self):
+        """Test that heuristics in a process pool and engine analysis are merged as before."""
+        engines = EnginePool(STUB_ENGINE, size=1)
+        detectors = DetectorPool(1)
+        try:
+            assert (await find_all_moments(FORK_PGN, engines, detectors)
+                    == await find_all_moments(FORK_PGN, engines))
+        finally:
+            await detectors.close()
+            await engines.close()
+
+    @pytest.mark.asyncio
+    async def test_find_all_moments_subset(self):
+        """Test that only the enabled detectors run and each one reports stats."""
+        engines = EnginePool(STUB_ENGINE, size=1)
+        detectors = DetectorPool(1)
+        try:
+            stats = []
+            moments = await find_all_moments(FORK_PGN, engines, detectors, enabled=["fork", "trapped"], stats=stats)
+
+            assert moments == find_moments_without_stockfish(FORK_PGN)
+            assert [entry.name for entry in stats] == ["fork", "trapped"]
+
+            stats = []
+            await find_all_moments(FORK_PGN, engines, enabled=["engine"], stats=stats)
+            assert [entry.name for entry in stats] == ["engine"]
+        finally:
+            await detectors.close()
+            await engines.close()
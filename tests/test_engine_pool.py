@@ -0,0 +1,114 @@
+import asyncio
+import os
+import sys
+
+import chess
+import pytest
+import pytest_asyncio
+
+from app.analysis.analytics.engine_pool import EnginePool
+from app.analysis.analytics.heuristic_functions import stockfish_moments
+from app.analysis.analytics.timeline import GameTimeline
+
+STUB_ENGINE = [sys.executable, os.path.join(os.path.dirname(__file__), "uci_stub.py")]
+
+SACRIFICE_PGN = "1. e4 e5 2. Nf3 Nc6 3. Bc4 Nf6 4. Ng5 d6 5. Nxf7 Be6 6. Nxh8 Bxc4 7. Qh5+ Nxh5 8. d3 Be6"
+
+# swings of the stub engine evaluation on SACRIFICE_PGN with threshold=150
+EXPECTED_SWINGS = [(10, 14), (11, 14)]
+
+
+@pytest_asyncio.fixture
+async def pool():
+    """Single-engine pool running the stub UCI engine."""
+    pool = EnginePool(STUB_ENGINE, size=1)
+    await pool.start()
+    yield pool
+    await pool.close()
+
+
+class TestEnginePool:
+    """Test cases for EnginePool."""
+
+    @pytest.mark.asyncio
+    async def test_engine_is_reused(self, pool):
+        """Test that consecutive checkouts get the same warm engine process."""
+        async with pool.engine() as first:
+            info = await first.analyse(chess.Board(), chess.engine.Limit(depth=1))
+            assert info["score"] is not None
+
+        async with pool.engine() as second:
+            assert second is first
+
+    @pytest.mark.asyncio
+    async def test_crashed_engine_is_restarted(self, pool):
+        """Test that a dead engine process is replaced on the next checkout."""
+        async with pool.engine() as engine:
+            engine.transport.kill()
+            await engine.returncode
+
+        async with pool.engine() as restarted:
+            assert restarted is not engine
+            info = await restarted.analyse(chess.Board(), chess.engine.Limit(depth=1))
+            assert info["score"] is not None
+
+    @pytest.mark.asyncio
+    async def test_checkout_waits_for_free_engine(self, pool):
+        """Test that the pool never hands out more engines than its size."""
+        second = pool.engine()
+
+        async with pool.engine():
+            waiter = asyncio.ensure_future(second.__aenter__())
+            await asyncio.sleep(0.05)
+            assert not waiter.done()
+
+        await asyncio.wait_for(waiter, timeout=1)
+        await second.__aexit__(None, None, None)
+
+    @pytest.mark.asyncio
+    async def test_lazy_start(self):
+        """Test that the pool starts its engines on the first checkout."""
+        pool = EnginePool(STUB_ENGINE, size=1)
+        try:
+            async with pool.engine():
+                assert pool.started
+        finally:
+            await pool.close()
+
+    def test_invalid_size(self):
+        """Test that an empty pool is rejected."""
+        with pytest.raises(ValueError):
+            EnginePool(STUB_ENGINE, size=0)
+
+    @pytest.mark.asyncio
+    async def test_stockfish_moments(self, pool):
+        """Test engine swing detection through the pool."""
+        game = GameTimeline.from_pgn(SACRIFICE_PGN)
+
+        assert await stockfish_moments(game, pool, threshold=150) == EXPECTED_SWINGS
+
+    @pytest.mark.asyncio
+    async def test_parallel_stockfish_moments(self):
+        """Test that splitting the game across several engines keeps evaluations in order."""
+        pool = EnginePool(STUB_ENGINE, size=3)
+        game = GameTimeline.from_pgn(SACRIFICE_PGN)
+        try:
+            assert await stockfish_moments(game, pool, threshold=150, workers=3) == EXPECTED_SWINGS
+            assert await stockfish_moments(game, pool, threshold=150, workers=100) == EXPECTED_SWINGS
+        finally:
+            await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_adaptive_stockfish_moments(self, pool):
+        """Test that the shallow pass plus full-depth refinement finds the same swings."""
+        game = GameTimeline.from_pgn(SACRIFICE_PGN)
+
+        assert await stockfish_moments(game, pool, threshold=150, shallow_depth=4) == EXPECTED_SWINGS
+
+    @pytest.mark.asyncio
+    async def test_backward_stockfish_moments(self, pool):
+        """Test that analysing the game from the last position back gives the same swings."""
+        game = GameTimeline.from_pgn(SACRIFICE_PGN)
+
+        assert await stockfish_moments(game, pool, threshold=150, backward=True) == EXPECTED_SWINGS
+        assert await stockfish_moments(game, pool, threshold=150, backward=True, shallow_depth=4) == EXPECTED_SWINGS
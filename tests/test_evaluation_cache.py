@@ -0,0 +1,121 @@
+import chess
+import pytest
+
+from app.analysis.analytics.engine_pool import EnginePool
+from app.analysis.analytics.evaluation_cache import EvaluationCache
+from app.analysis.analytics.heuristic_functions import stockfish_moments
+from app.analysis.analytics.timeline import GameTimeline
+from tests.test_engine_pool import STUB_ENGINE, SACRIFICE_PGN, EXPECTED_SWINGS
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Evaluation cache in a temporary SQLite file."""
+    cache = EvaluationCache(str(tmp_path / "evaluations.sqlite"), max_entries=10)
+    yield cache
+    cache.close()
+
+
+def positions(count):
+    """Distinct positions: two kings and a white pawn on a different square each time."""
+    for square in chess.SQUARES[8:8 + count]:
+        board = chess.Board.empty()
+        board.set_piece_at(chess.A1, chess.Piece(chess.KING, chess.WHITE))
+        board.set_piece_at(chess.H8, chess.Piece(chess.KING, chess.BLACK))
+        board.set_piece_at(square, chess.Piece(chess.PAWN, chess.WHITE))
+        yield board
+
+
+class TestEvaluationCache:
+    """Test cases for EvaluationCache."""
+
+    def test_miss_then_hit(self, cache):
+        """Test that a stored evaluation is found and counters are updated."""
+        board = chess.Board()
+
+        assert cache.get(board, 10) is None
+        cache.put(board, 10, 35)
+        cache.flush()
+
+        assert cache.get(board, 10) == 35
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert cache.hit_rate == 0.5
+
+    def test_deeper_result_answers_shallower_request(self, cache):
+        """Test that an evaluation at depth d answers requests for depth <= d only."""
+        board = chess.Board()
+        cache.put(board, 12, 20)
+        cache.flush()
+
+        assert cache.get(board, 8) == 20
+        assert cache.get(board, 12) == 20
+        assert cache.get(board, 13) is None
+
+    def test_shallower_result_does_not_replace_deeper(self, cache):
+        """Test that a shallower evaluation never overwrites a deeper one."""
+        board = chess.Board()
+        cache.put(board, 12, 20)
+        cache.flush()
+        cache.put(board, 6, -50)
+        cache.flush()
+
+        assert cache.get(board, 12) == 20
+
+    def test_persistence(self, tmp_path):
+        """Test that evaluations survive reopening the cache file."""
+        path = str(tmp_path / "evaluations.sqlite")
+        first = EvaluationCache(path)
+        first.put(chess.Board(), 10, 15)
+        first.close()
+
+        second = EvaluationCache(path)
+        try:
+            assert second.get(chess.Board(), 10) == 15
+        finally:
+            second.close()
+
+    def test_eviction(self, cache):
+        """Test that the cache is kept within max_entries."""
+        boards = list(positions(8))
+        assert len({board.fen() for board in boards}) == 8
+
+        for score, board in enumerate(boards):
+            cache.put(board, 10, score)
+        cache.flush()
+        assert len(cache) == 8
+
+        for score, board in enumerate(positions(16)):
+            cache.put(board, 12, score)
+        cache.flush()
+
+        assert len(cache) <= cache.max_entries
+
+    @pytest.mark.asyncio
+    async def test_batch_lookup_off_loop(self, cache):
+        """Test that aget_many answers from memory and SQLite in one call and aflush writes pending scores."""
+        stored, pending, missing = positions(3)
+        cache.put(stored, 10, 5)
+        await cache.aflush()
+        cache.put(pending, 10, -7)
+
+        assert await cache.aget_many([stored, pending, missing], 10) == [5, -7, None]
+        assert (cache.hits, cache.misses) == (2, 1)
+
+        await cache.aflush()
+        assert len(cache) == 2
+
+    @pytest.mark.asyncio
+    async def test_stockfish_moments_uses_cache(self, cache):
+        """Test that a fully cached game is analysed without any engine."""
+        cache.max_entries = 1000
+        game = GameTimeline.from_pgn(SACRIFICE_PGN)
+
+        pool = EnginePool(STUB_ENGINE, size=1)
+        try:
+            assert await stockfish_moments(game, pool, threshold=150, cache=cache) == EXPECTED_SWINGS
+        finally:
+            await pool.close()
+
+        broken_pool = EnginePool(["/nonexistent/engine"], size=1)
+        assert await stockfish_moments(game, broken_pool, threshold=150, cache=cache) == EXPECTED_SWINGS
+        assert not broken_pool.started
@@ -0,0 +1,129 @@
+from contextlib import asynccontextmanager
+
+import numpy as np
+import pytest
+
+from app.analysis.analytics.engine_pool import EnginePool
+from app.analysis.analytics.evaluation_curve import EvaluationCurve
+from app.analysis.analytics.heuristic_functions import stockfish_moments
+from app.analysis.analytics.timeline import GameTimeline
+from tests.test_engine_pool import STUB_ENGINE, SACRIFICE_PGN, EXPECTED_SWINGS, pool  # noqa: F401
+
+
+class NoSearchPool(EnginePool):
+    """Stub engine pool that fails the test if a search is started."""
+
+    @asynccontextmanager
+    async def engine(self):
+        raise AssertionError("the engine must not be used")
+        yield
+
+
+class TestEvaluationCurve:
+    """Test cases for EvaluationCurve."""
+
+    def test_bytes_round_trip(self):
+        """Test that missing and out-of-range evaluations survive the int16 blob."""
+        curve = EvaluationCurve()
+        curve.fill({0: 20, 1: -10000, 3: 40000}, plies=3, depth=12, engine="UCI stub")
+
+        restored = EvaluationCurve.from_bytes(curve.to_bytes(), 12, "UCI stub")
+
+        assert len(curve.to_bytes()) == 4 * 2
+        assert restored.as_list() == [20, -10000, None, 32767]
+        assert restored.evaluations() == {0: 20, 1: -10000, 3: 32767}
+        assert restored.scores.dtype == np.int16
+
+    def test_matches(self):
+        """Test that a curve only matches the same game length, depth and engine."""
+        curve = EvaluationCurve()
+        assert not curve.matches(3, 12, "UCI stub")
+
+        curve.fill({0: 0, 1: 0, 2: 0, 3: 0}, plies=3, depth=12, engine="UCI stub")
+        assert curve.matches(3, 12, "UCI stub")
+        assert not curve.matches(4, 12, "UCI stub")
+        assert not curve.matches(3, 16, "UCI stub")
+        assert not curve.matches(3, 12, "Stockfish 16")
+
+
+class TestRethresholding:
+    """Test cases for stockfish_moments with a stored evaluation curve."""
+
+    @pytest.mark.asyncio
+    async def test_curve_is_filled(self, pool):
+        """Test that an empty curve gets the evaluations of every position."""
+        game = GameTimeline.from_pgn(SACRIFICE_PGN)
+        curve = EvaluationCurve()
+
+        swings = await stockfish_moments(game, pool, threshold=150, analysis_depth=4, curve=curve)
+
+        assert swings == EXPECTED_SWINGS
+        assert curve.changed
+        assert curve.depth == 4 and curve.engine == "UCI stub"
+        assert None not in curve.as_list() and len(curve.as_list()) == len(game) + 1
+
+    @pytest.mark.asyncio
+    async def test_new_threshold_skips_engine(self, pool):
+        """Test that a stored curve gives the same swings as the engine for any threshold."""
+        game = GameTimeline.from_pgn(SACRIFICE_PGN)
+        curve = EvaluationCurve()
+        await stockfish_moments(game, pool, threshold=150, analysis_depth=4, curve=curve)
+        stored = EvaluationCurve.from_bytes(curve.to_bytes(), curve.depth, curve.engine)
+
+        no_search = NoSearchPool(STUB_ENGINE, size=1)
+        try:
+            for threshold in (50, 150, 400):
+                expected = await stockfish_moments(game, pool, threshold=threshold, analysis_depth=4)
+                assert await stockfish_moments(game, no_search, threshold=threshold, analysis_depth=4,
+                                               curve=stored) == expected
+        finally:
+            await no_search.close()
+
+        assert not stored.changed
+
+    @pytest.mark.asyncio
+    async def test_other_depth_reruns_engine(self, pool):
+        """Test that a curve of another depth is replaced by a fresh one."""
+        game = GameTimeline.from_pgn(SACRIFICE_PGN)
+        curve = EvaluationCurve()
+        await stockfish_moments(game, pool, threshold=150, analysis_depth=4, curve=curve)
+
+        stale = EvaluationCurve.from_bytes(curve.to_bytes(), 2, curve.engine)
+        await stockfish_moments(game, pool, threshold=150, analysis_depth=4, curve=stale)
+
+        assert stale.changed and stale.depth == 4
+
+    @pytest.mark.asyncio
+    async def test_two_pass_curve_is_not_reused(self, pool):
+        """Test that a sparse two-pass curve, and any curve in two-pass mode, is not used for a new threshold."""
+        game = GameTimeline.from_pgn(SACRIFICE_PGN)
+        sparse = EvaluationCurve()
+        await stockfish_moments(game, pool, threshold=400, analysis_depth=4, shallow_depth=2, curve=sparse)
+        assert not sparse.dense
+        assert not sparse.matches(len(game), 4, sparse.engine)
+
+        expected = await stockfish_moments(game, pool, threshold=150, analysis_depth=4)
+        assert await stockfish_moments(game, pool, threshold=150, analysis_depth=4, curve=sparse) == expected
+        assert sparse.dense
+
+        no_search = NoSearchPool(STUB_ENGINE, size=1)
+        with pytest.raises(AssertionError):
+            await stockfish_moments(game, no_search, threshold=150, analysis_depth=4, shallow_depth=2, curve=sparse)
+        await no_search.close()
+
+
+class TestProgress:
+    """Test cases for the progress callback of stockfish_moments."""
+
+    @pytest.mark.asyncio
+    async def test_progress_reaches_total(self, pool):
+        """Test that progress only grows and ends with every position evaluated."""
+        game = GameTimeline.from_pgn(SACRIFICE_PGN)
+        reports = []
+
+        await stockfish_moments(game, pool, threshold=150, analysis_depth=4,
+                                progress=lambda done, total: reports.append((done, total)))
+
+        positions = len(game.moves) + 1
+        assert reports[-1] == (positions, positions)
+        assert [done for done, _ in reports] == sorted(done for done, _ in reports)
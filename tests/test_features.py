@@ -0,0 +1,114 @@
+import chess
+import numpy as np
+
+from app.analysis.analytics import safe1
+from app.analysis.analytics.features import (
+    FEATURES,
+    FeatureStore,
+    PositionFeatures,
+    extract_features,
+    material_and_mobility,
+)
+from app.analysis.analytics.timeline import GameTimeline
+from tests.test_heuristics import FORK_PGN, OPERA_PGN
+
+
+class TestFeatureExtraction:
+    """Test cases for the per-game feature array."""
+
+    def test_shape(self):
+        """Test one row per position, including the starting one."""
+        game = GameTimeline.from_pgn(OPERA_PGN)
+        features = extract_features(game)
+
+        assert features.shape == (len(game) + 1, FEATURES)
+        assert features.dtype == np.int16
+
+    def test_rows_match_boards(self):
+        """Test occupancy, attack counts, material and mobility against board queries."""
+        game = GameTimeline.from_pgn(FORK_PGN)
+        features = extract_features(game)
+
+        for ply in range(len(game) + 1):
+            board = game.board_at(ply)
+            position = PositionFeatures(features[ply])
+
+            for piece_type in chess.PIECE_TYPES:
+                for color in chess.COLORS:
+                    symbol = chess.Piece(piece_type, color).symbol()
+                    assert position[symbol] == list(board.pieces(piece_type, color))
+
+            for square in chess.SQUARES:
+                for color in chess.COLORS:
+                    assert position.attack_count(color, square) == len(board.attackers(color, square))
+
+            for color in chess.COLORS:
+                material = sum(
+                    len(board.pieces(piece_type, color)) * value
+                    for piece_type, value in zip(chess.PIECE_TYPES, [1, 3, 3, 5, 9, 0])
+                )
+                assert position.material(color) == material
+
+                mobility = sum(
+                    len(board.attacks(square) & ~board.occupied_co[color])
+                    for square in chess.scan_forward(board.occupied_co[color] & ~board.pawns)
+                )
+                assert position.mobility(color) == mobility
+
+
+class TestFeatureStore:
+    """Test cases for the on-disk feature cache."""
+
+    def test_round_trip(self, tmp_path):
+        """Test that features are saved once and read back as a memmap."""
+        store = FeatureStore(str(tmp_path))
+        assert store.load(7) is None
+
+        path = store.ensure(7, OPERA_PGN)
+        modified = tmp_path.joinpath(path).stat().st_mtime_ns
+        features = store.get(7, OPERA_PGN)
+
+        assert isinstance(features, np.memmap)
+        assert tmp_path.joinpath(path).stat().st_mtime_ns == modified
+        np.testing.assert_array_equal(features, extract_features(GameTimeline.from_pgn(OPERA_PGN)))
+
+    def test_material_and_mobility(self, tmp_path):
+        """Test that the per-ply curves are cached on first read and match the board."""
+        store = FeatureStore(str(tmp_path))
+        curves = material_and_mobility(store, 7, OPERA_PGN)
+
+        assert store.load(7) is not None
+        assert curves == material_and_mobility(None, 7, OPERA_PGN)
+
+        game = GameTimeline.from_pgn(OPERA_PGN)
+        final = PositionFeatures.from_board(game.board_at(len(game)))
+        assert len(curves["material_white"]) == len(game) + 1
+        assert curves["material_white"][0] == curves["material_black"][0] == 39
+        assert curves["material_white"][-1] == final.material(chess.WHITE)
+        assert curves["mobility_black"][-1] == final.mobility(chess.BLACK)
+
+
+class TestSafeHeuristics:
+    """Test cases for the safe1 helpers."""
+
+    def test_positions_and_attacks(self):
+        """Test piece squares and attacked squares of a single board."""
+        board = chess.Board("4k3/8/3p4/4N3/8/8/8/4K3 w - - 0 1")
+        positions = safe1.get_all_positions(board)
+
+        assert positions['N'] == [chess.E5]
+        assert sorted(safe1.get_black_pawn_attacks(board, positions)) == [chess.C5, chess.E5]
+        assert safe1.is_black_protected(board, chess.D7, positions)
+        assert not safe1.is_white_knight_safe(board, chess.E5, positions)
+
+    def test_position_of_game(self):
+        """Test the safety of pieces in a position of a game."""
+        game = GameTimeline.from_pgn(FORK_PGN)
+
+        # after 5. Nxf7 the knight is attacked only by the king and defended by Bc4
+        board = game.board_at(9)
+        positions = safe1.get_all_positions(board)
+
+        assert safe1.is_white_knight_safe(board, chess.F7, positions)
+        assert not safe1.is_white_knight_safe(board, chess.E5, positions)
+        assert safe1.is_white_bishop_safe(board, chess.C4, positions)
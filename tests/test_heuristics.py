@@ -0,0 +1,211 @@
+import chess
+import pytest
+
+from app.analysis.analytics.attack_map import AttackMap
+from app.analysis.analytics.heuristic_functions import (
+    run_detectors,
+    profile_detectors,
+    select_detectors,
+    DEFAULT_DETECTORS,
+    DETECTORS,
+    EngineDetector,
+    detect_forks,
+    detect_pins,
+    detect_sacrifices,
+    detect_trapped_pieces,
+    find_moments_without_stockfish,
+    ForkDetector,
+    PinDetector,
+    SacrificeDetector,
+    TrappedPieceDetector,
+    extend_interval,
+    _find_pins_and_skewers,
+)
+from app.analysis.analytics.timeline import GameTimeline
+from app.analysis.analytics.util import static_exchange, static_exchange_move
+
+
+FORK_PGN = "1. e4 e5 2. Nf3 Nc6 3. Bc4 Nf6 4. Ng5 d6 5. Nxf7 Be6 6. Nxh8 Bxc4 7. Qh5+ Nxh5 8. d3 Be6"
+
+OPERA_PGN = (
+    "1. e4 e5 2. Nf3 d6 3. d4 Bg4 4. dxe5 Bxf3 5. Qxf3 dxe5 6. Bc4 Nf6 7. Qb3 Qe7 "
+    "8. Nc3 c6 9. Bg5 b5 10. Nxb5 cxb5 11. Bxb5+ Nbd7 12. O-O-O Rd8 13. Rxd7 Rxd7 "
+    "14. Rd1 Qe6 15. Bxd7+ Nxd7 16. Qb8+ Nxb8 17. Rd8# 1-0"
+)
+
+
+@pytest.fixture(params=[FORK_PGN, OPERA_PGN])
+def game(request):
+    """Timelines of the games used by the detector tests."""
+    return GameTimeline.from_pgn(request.param, checkpoint_every=4)
+
+
+class TestGameTimeline:
+    """Test cases for GameTimeline."""
+
+    def test_capture_and_check_bits(self, game):
+        """Test that the precomputed bit arrays match the board."""
+        board = game.board_at(0)
+        for ply, move in enumerate(game.moves, start=1):
+            assert game.is_capture(ply) == board.is_capture(move)
+            assert game.gives_check(ply) == board.gives_check(move)
+            board.push(move)
+
+    def test_board_at(self, game):
+        """Test random access to positions through checkpoints."""
+        board = game.board_at(0)
+        for ply, move in enumerate(game.moves, start=1):
+            board.push(move)
+            assert game.board_at(ply).fen() == board.fen()
+
+    def test_board_at_out_of_range(self, game):
+        """Test that plies outside of the game are rejected."""
+        with pytest.raises(IndexError):
+            game.board_at(len(game) + 1)
+
+    def test_empty_pgn(self):
+        """Test that an empty PGN is rejected."""
+        with pytest.raises(ValueError):
+            GameTimeline.from_pgn("")
+
+    def test_extend_interval(self):
+        """Test that captures and checks after the end of an interval extend it."""
+        game = GameTimeline.from_pgn(FORK_PGN)
+        # 6. Nxh8 Bxc4 7. Qh5+ Nxh5: two captures, then a check with its reply
+        assert extend_interval(game, 8, 10) == (8, 14)
+
+
+class TestAttackMap:
+    """Test cases for the incremental attack map."""
+
+    @staticmethod
+    def assert_matches_board(attacks):
+        board = attacks.board
+        for square in chess.SQUARES:
+            assert attacks.attacks_mask(square) == board.attacks_mask(square)
+            for color in chess.COLORS:
+                assert attacks.attackers_mask(color, square) == board.attackers_mask(color, square)
+
+    @pytest.mark.parametrize("pgn", [FORK_PGN, OPERA_PGN, "1. e4 a6 2. e5 d5 3. exd6 Ra7 4. dxc7 Rb7 5. cxd8=Q+ Kxd8"])
+    def test_incremental_updates_match_board(self, pgn):
+        """Test that the map matches a full recomputation after every push and pop, including castling, en passant and promotion."""
+        game = GameTimeline.from_pgn(pgn)
+        attacks = AttackMap(game.board_at(0))
+
+        for move in game.moves:
+            attacks.push(move)
+            self.assert_matches_board(attacks)
+
+        for _ in game.moves:
+            attacks.pop()
+            self.assert_matches_board(attacks)
+
+    def test_attacked_mask(self):
+        """Test the union of a side's attacks."""
+        board = chess.Board("4k3/8/8/8/8/8/8/R3K3 w - - 0 1")
+        attacks = AttackMap(board)
+        expected = board.attacks_mask(chess.A1) | board.attacks_mask(chess.E1)
+        assert attacks.attacked_mask(chess.WHITE) == expected
+
+
+class TestDetectorPipeline:
+    """Test cases for the single-pass detector pipeline."""
+
+    def test_fork_intervals(self):
+        """Test that the knight fork on f7 is detected and extended."""
+        assert detect_forks(GameTimeline.from_pgn(FORK_PGN)) == [(8, 14), (9, 14)]
+
+    def test_shared_pass_matches_single_detectors(self, game):
+        """Test that running all detectors in one pass gives the same intervals as running them one by one."""
+        expected = detect_forks(game) + detect_pins(game) + detect_sacrifices(game) + detect_trapped_pieces(game)
+
+        combined = run_detectors(game, [ForkDetector, PinDetector, SacrificeDetector, TrappedPieceDetector])
+
+        assert combined == expected
+
+    def test_moments_without_stockfish(self):
+        """Test the formatted, merged output of the heuristic detectors."""
+        assert find_moments_without_stockfish(FORK_PGN) == [("4B", "7B")]
+
+
+class TestDetectorRegistry:
+    """Test cases for the detector registry and per-detector stats."""
+
+    def test_default_selection(self):
+        """Test that the trapped-piece detector is registered but off by default."""
+        assert list(DETECTORS) == ["fork", "pin", "trapped", "sacrifice", "engine"]
+        assert select_detectors() == [ForkDetector, PinDetector, SacrificeDetector, EngineDetector]
+        assert DEFAULT_DETECTORS == [ForkDetector, PinDetector, SacrificeDetector]
+
+    def test_subset_in_registry_order(self):
+        """Test that a subset is returned in registry order and unknown names are rejected."""
+        assert select_detectors(["sacrifice", "trapped"]) == [TrappedPieceDetector, SacrificeDetector]
+
+        with pytest.raises(ValueError):
+            select_detectors(["fork", "zugzwang"])
+
+    def test_engine_detector_not_run_on_board(self, game):
+        """Test that detectors needing the engine are rejected by the board pass."""
+        with pytest.raises(ValueError):
+            run_detectors(game, [EngineDetector])
+
+    def test_stats(self, game):
+        """Test plies and interval counts recorded for each detector."""
+        intervals, stats = profile_detectors(game, [ForkDetector, TrappedPieceDetector])
+
+        assert [entry.name for entry in stats] == ["fork", "trapped"]
+        assert all(entry.plies == len(game) and entry.seconds >= 0 for entry in stats)
+        assert sum(entry.intervals for entry in stats) == len(intervals)
+        assert stats[0].intervals == len(detect_forks(game))
+
+
+class TestPinsAndSkewers:
+    """Test cases for the slider pin and skewer kernel."""
+
+    def test_rook_pin(self):
+        """Test that a rook pinning a knight to the king is found."""
+        board = chess.Board("4k3/4n3/8/8/8/8/8/4R1K1 w - - 0 1")
+        assert _find_pins_and_skewers(AttackMap(board), chess.E1) == [(chess.E7, chess.E8)]
+
+    def test_queen_skewer(self):
+        """Test that a queen skewering the king to a rook is found."""
+        board = chess.Board("8/6r1/8/8/3k4/8/8/Q5K1 b - - 0 1")
+        assert _find_pins_and_skewers(AttackMap(board), chess.A1) == [(chess.D4, chess.G7)]
+
+    def test_pawns_and_cheap_lines_are_ignored(self):
+        """Test that pawns and lines with nothing worth more than the slider are skipped."""
+        board = chess.Board("4k3/4p3/8/8/8/8/8/4R1K1 w - - 0 1")
+        assert _find_pins_and_skewers(AttackMap(board), chess.E1) == []
+        board = chess.Board("4k3/8/4b3/4n3/8/8/8/4R1K1 w - - 0 1")
+        assert _find_pins_and_skewers(AttackMap(board), chess.E1) == []
+
+    def test_rook_pin_interval(self):
+        """Test that a rook pin ending in a capture is reported."""
+        game = GameTimeline(chess.Board("4k3/4n3/8/8/8/8/8/R5K1 w - - 0 1"),
+                            [chess.Move.from_uci(uci) for uci in ("a1e1", "e8d7", "e1e7")])
+        assert detect_pins(game) == [(0, 3)]
+
+
+class TestStaticExchange:
+    """Test cases for the static exchange evaluation."""
+
+    def test_x_ray_attacker_joins_exchange(self):
+        """Test that a rook behind another rook takes part in the exchange."""
+        board = chess.Board("4r1k1/8/8/4n3/8/8/4R3/4R1K1 w - - 0 1")
+        assert static_exchange(board, chess.E5) == 3
+
+    def test_least_valuable_attacker_first(self):
+        """Test that the pawn captures before the queen."""
+        board = chess.Board("6k1/8/2p5/3n4/4P3/8/8/3Q2K1 w - - 0 1")
+        assert static_exchange(board, chess.D5) == 3
+
+    def test_losing_capture(self):
+        """Test that a queen taking a defended knight loses material."""
+        board = chess.Board("6k1/8/2p5/3n4/8/8/8/3Q2K1 w - - 0 1")
+        assert static_exchange(board, chess.D5) == 0
+        assert static_exchange_move(board, chess.Move.from_uci("d1d5")) == -6
+
+    def test_king_does_not_recapture_defended_square(self):
+        """Test that the king cannot take back on a square its opponent still covers."""
+        board = chess.Board("8/8/8/3k4/3n4/8/3R4/3R2K1 w - - 0 1")
+        assert static_exchange(board, chess.D4) == 3
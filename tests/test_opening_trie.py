@@ -0,0 +1,106 @@
+import pytest
+
+from app.analysis.analytics.heuristic_functions import evaluate_game, stockfish_moments
+from app.analysis.analytics.evaluation_curve import EvaluationCurve
+from app.analysis.analytics.opening_trie import OpeningTrie, build_opening_trie
+from app.analysis.analytics.timeline import GameTimeline
+from tests.test_engine_pool import STUB_ENGINE, SACRIFICE_PGN, EXPECTED_SWINGS, pool  # noqa: F401
+from tests.test_evaluation_curve import NoSearchPool
+
+# the first five plies of SACRIFICE_PGN, then a different line
+BRANCHING_PGN = "1. e4 e5 2. Nf3 Nc6 3. Bc4 Bc5 4. c3 Nf6 5. d4 exd4"
+
+
+class TestOpeningTrie:
+    """Test cases for the trie of analysed openings."""
+
+    def test_match_stops_at_first_novel_ply(self):
+        """Test that only the shared opening of two games is reused."""
+        game = GameTimeline.from_pgn(SACRIFICE_PGN)
+        other = GameTimeline.from_pgn(BRANCHING_PGN)
+        trie = OpeningTrie()
+        trie.add(game.board_at(0), game.moves, {ply: ply * 10 for ply in range(len(game) + 1)}, 4, "UCI stub")
+
+        assert trie.match(game.board_at(0), game.moves, 4, "UCI stub") == \
+            {ply: ply * 10 for ply in range(len(game) + 1)}
+        assert trie.match(other.board_at(0), other.moves, 4, "UCI stub") == {ply: ply * 10 for ply in range(6)}
+
+    def test_match_needs_same_depth_and_engine(self):
+        """Test that evaluations of another depth or engine are not reused."""
+        game = GameTimeline.from_pgn(SACRIFICE_PGN)
+        trie = OpeningTrie()
+        trie.add(game.board_at(0), game.moves, {0: 20, 1: 30}, 4, "UCI stub")
+
+        assert trie.match(game.board_at(0), game.moves, 4, "UCI stub") == {0: 20, 1: 30}
+        assert trie.match(game.board_at(0), game.moves, 8, "UCI stub") == {}
+        assert trie.match(game.board_at(0), game.moves, 4, "Stockfish 16") == {}
+
+    def test_max_plies(self):
+        """Test that only the opening part of a game is stored."""
+        game = GameTimeline.from_pgn(SACRIFICE_PGN)
+        trie = OpeningTrie(max_plies=4)
+        trie.add(game.board_at(0), game.moves, {ply: 0 for ply in range(len(game) + 1)}, 4, "UCI stub")
+
+        assert trie.nodes == 5
+        assert sorted(trie.match(game.board_at(0), game.moves, 4, "UCI stub")) == [0, 1, 2, 3, 4]
+
+    def test_max_nodes(self):
+        """Test that a full trie grows no new branches but still records known positions."""
+        game = GameTimeline.from_pgn(SACRIFICE_PGN)
+        other = GameTimeline.from_pgn(BRANCHING_PGN)
+        trie = OpeningTrie(max_nodes=8)
+        trie.add(game.board_at(0), game.moves, {}, 4, "UCI stub")
+        trie.add(other.board_at(0), other.moves, {ply: 0 for ply in range(len(other) + 1)}, 4, "UCI stub")
+
+        assert trie.full and trie.nodes == 8
+        assert sorted(trie.match(other.board_at(0), other.moves, 4, "UCI stub")) == list(range(6))
+
+    def test_build_and_absorb(self):
+        """Test that a trie built from stored openings keeps what was added while it was built."""
+        game = GameTimeline.from_pgn(SACRIFICE_PGN)
+        other = GameTimeline.from_pgn(BRANCHING_PGN)
+        curve = EvaluationCurve()
+        curve.fill({ply: ply for ply in range(len(game) + 1)}, len(game), 4, "UCI stub")
+        stored = (game.board_at(0).fen(), " ".join(move.uci() for move in game.moves), curve.to_bytes(), 4, "UCI stub")
+
+        trie = OpeningTrie()
+        trie.add(other.board_at(0), other.moves, {ply: ply for ply in range(len(other) + 1)}, 4, "UCI stub")
+        trie.absorb(build_opening_trie([stored], trie.max_plies, trie.max_nodes))
+
+        assert trie.loaded
+        assert trie.match(game.board_at(0), game.moves, 4, "UCI stub") == {ply: ply for ply in range(len(game) + 1)}
+        assert trie.match(other.board_at(0), other.moves, 4, "UCI stub") == {ply: ply for ply in range(len(other) + 1)}
+        assert trie.nodes == len(game) + 1 + len(other) - 5
+
+
+class TestOpeningReuse:
+    """Test cases for stockfish_moments with the opening trie."""
+
+    @pytest.mark.asyncio
+    async def test_known_game_skips_engine(self, pool):
+        """Test that a game already in the trie gives the same swings without any search."""
+        game = GameTimeline.from_pgn(SACRIFICE_PGN)
+        trie = OpeningTrie(max_plies=len(game))
+
+        assert await stockfish_moments(game, pool, threshold=150, analysis_depth=4, openings=trie) == EXPECTED_SWINGS
+
+        no_search = NoSearchPool(STUB_ENGINE, size=1)
+        try:
+            assert await stockfish_moments(game, no_search, threshold=150, analysis_depth=4,
+                                           openings=trie) == EXPECTED_SWINGS
+        finally:
+            await no_search.close()
+
+    @pytest.mark.asyncio
+    async def test_novel_plies_are_searched(self, pool):
+        """Test that evaluation resumes at the first novel ply and matches a full search."""
+        game = GameTimeline.from_pgn(SACRIFICE_PGN)
+        other = GameTimeline.from_pgn(BRANCHING_PGN)
+        trie = OpeningTrie()
+        await stockfish_moments(game, pool, threshold=150, analysis_depth=4, openings=trie)
+
+        known = trie.match(other.board_at(0), other.moves, 4, await pool.version())
+        evaluations = await evaluate_game(other, pool, analysis_depth=4, known=known)
+
+        assert sorted(known) == list(range(6))
+        assert evaluations == await evaluate_game(other, pool, analysis_depth=4)
@@ -0,0 +1,70 @@
+import io
+
+import chess
+import chess.pgn
+import pytest
+
+from app.analysis.analytics.pgn_reader import iter_mainlines, read_mainline
+from app.video.cut import extract_move_timestamps_from_pgn
+from tests.test_heuristics import OPERA_PGN
+
+
+ANNOTATED_PGN = """[Event "Blitz"]
+[White "Alice"]
+[Black "Bob"]
+
+{ Game comment } 1. e4 { [%ts 1000] [%clk 0:03:00] } 1... e5 { [%ts 2500] [%clk 0:02:58.5] }
+2. Nf3 ( 2. f4 { [%ts 9999] } exf4 ) 2... Nc6 { [%ts 4000] } 3. Bb5!? a6 1-0
+"""
+
+
+class TestMainlineReader:
+    """Test cases for the mainline PGN reader."""
+
+    def test_matches_read_game(self):
+        """Test that headers, start position and moves match chess.pgn.read_game."""
+        for pgn in (ANNOTATED_PGN, OPERA_PGN):
+            expected = chess.pgn.read_game(io.StringIO(pgn))
+            game = read_mainline(pgn)
+
+            assert dict(game.headers) == dict(expected.headers)
+            assert game.board.fen() == expected.board().fen()
+            assert game.moves == list(expected.mainline_moves())
+
+    def test_san_and_comment_values(self):
+        """Test SAN as written and [%ts]/[%clk] values of mainline moves only."""
+        game = read_mainline(ANNOTATED_PGN)
+
+        assert game.san == ["e4", "e5", "Nf3", "Nc6", "Bb5", "a6"]
+        assert game.timestamps == {1: 1000, 2: 2500, 4: 4000}
+        assert game.clocks == {1: 180.0, 2: 178.5}
+
+    def test_custom_start_position(self):
+        """Test that a FEN header sets the start position."""
+        pgn = '[FEN "4k3/8/8/8/8/8/4P3/4K3 w - - 0 1"]\n[SetUp "1"]\n\n1. e4 Kd7 *'
+        game = read_mainline(pgn)
+
+        assert game.board.fen() == "4k3/8/8/8/8/8/4P3/4K3 w - - 0 1"
+        assert game.moves == [chess.Move.from_uci("e2e4"), chess.Move.from_uci("e8d7")]
+
+    def test_illegal_move(self):
+        """Test that the mainline stops at an illegal move and the error is kept."""
+        game = read_mainline("1. e4 e5 2. Ke3 Nc6 *")
+
+        assert game.san == ["e4", "e5"]
+        assert len(game.errors) == 1
+
+    def test_no_game(self):
+        """Test that an empty PGN gives no game."""
+        assert read_mainline("") is None
+
+    def test_iter_mainlines(self):
+        """Test streaming several games from one file."""
+        games = list(iter_mainlines(io.StringIO(ANNOTATED_PGN + "\n" + OPERA_PGN)))
+
+        assert [len(game) for game in games] == [6, 33]
+
+    @pytest.mark.asyncio
+    async def test_move_timestamps(self):
+        """Test that video cutting gets the timestamps from the reader."""
+        assert await extract_move_timestamps_from_pgn(ANNOTATED_PGN) == {1: 1000, 2: 2500, 4: 4000}
@@ -0,0 +1,84 @@
+import pytest
+
+from app.analysis.analytics.engine_pool import EnginePool
+from app.analysis.analytics.interface import DETECTORS_VERSION, AnalyticsStrategy
+from app.analysis.fake_strategy import FakeStrategy
+from app.analysis.ml.third_party.interface import ThirdPartyAIStrategy
+from app.core import StrategyType
+from app.utils.helpers import result_cache_key
+from tests.test_engine_pool import STUB_ENGINE
+from tests.test_heuristics import FORK_PGN, OPERA_PGN
+
+
+class TestResultCacheKey:
+    """Test cases for the content-addressed key of analysis results."""
+
+    def test_only_moves_matter(self):
+        """Test that headers, comments, variations and move numbers do not change the key."""
+        annotated = (
+            '[Event "Broadcast"]\n[White "A"]\n[Black "B"]\n\n'
+            "1. e4 {book} e5 2. Nf3 (2. f4) Nc6 3. Bc4 Nf6 4. Ng5 d6 5. Nxf7 Be6 "
+            "6. Nxh8 Bxc4 7. Qh5+ Nxh5 8. d3 Be6 *"
+        )
+
+        assert (result_cache_key(annotated, StrategyType.ANALYTICS, {})
+                == result_cache_key(FORK_PGN, StrategyType.ANALYTICS, {}))
+
+    def test_strategy_and_parameters_matter(self):
+        """Test that other moves, strategies and parameters give other keys."""
+        key = result_cache_key(FORK_PGN, StrategyType.ANALYTICS, {"detectors": ["fork"]})
+
+        assert key != result_cache_key(OPERA_PGN, StrategyType.ANALYTICS, {"detectors": ["fork"]})
+        assert key != result_cache_key(FORK_PGN, StrategyType.MOCK, {"detectors": ["fork"]})
+        assert key != result_cache_key(FORK_PGN, StrategyType.ANALYTICS, {"detectors": ["pin"]})
+
+    def test_no_game(self):
+        """Test that a PGN without a game is not cached."""
+        assert result_cache_key("", StrategyType.ANALYTICS, {}) is None
+
+
+class TestStrategyParameters:
+    """Test cases for strategies that keep their results out of the cache."""
+
+    @pytest.mark.asyncio
+    async def test_default_opts_out(self):
+        """Test that strategies without a version of their own are not cached."""
+        assert await FakeStrategy().parameters() is None
+        assert await ThirdPartyAIStrategy().parameters() is None
+
+
+class TestAnalyticsParameters:
+    """Test cases for the parameters of the analytics strategy in the cache key."""
+
+    @pytest.mark.asyncio
+    async def test_versions(self):
+        """Test that the detector code version is always part of the key and the engine version only with the engine."""
+        pool = EnginePool(STUB_ENGINE, size=1)
+        strategy = AnalyticsStrategy()
+        try:
+            with_engine = await strategy.parameters(pool, analysis_depth=12)
+            heuristics_only = await strategy.parameters(pool, enabled=["fork", "pin"])
+        finally:
+            await pool.close()
+
+        assert with_engine["detectors_version"] == DETECTORS_VERSION
+        assert with_engine["engine_version"] == "UCI stub"
+        assert with_engine["engine"]["analysis_depth"] == 12
+        assert "workers" not in with_engine["engine"]
+
+        assert heuristics_only == {"detectors": ["fork", "pin"], "detectors_version": DETECTORS_VERSION}
+
+    @pytest.mark.asyncio
+    async def test_stored_evaluations(self):
+        """Test that results found with the evaluation cache or the opening trie get other keys than fresh searches."""
+        pool = EnginePool(STUB_ENGINE, size=1)
+        strategy = AnalyticsStrategy()
+        try:
+            fresh = await strategy.parameters(pool, cache=None, openings=None, tablebase=None)
+            cached = await strategy.parameters(pool, cache=object(), openings=None, tablebase=None)
+            openings = await strategy.parameters(pool, cache=None, openings=object(), tablebase=None)
+        finally:
+            await pool.close()
+
+        assert fresh["engine"]["cache"] is False and cached["engine"]["cache"] is True
+        assert len({repr(fresh), repr(cached), repr(openings)}) == 3
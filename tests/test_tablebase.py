@@ -0,0 +1,133 @@
+from contextlib import asynccontextmanager
+
+import chess
+import chess.engine
+import pytest
+
+from app.analysis.analytics.engine_pool import EnginePool
+from app.analysis.analytics.evaluation_curve import EvaluationCurve
+from app.analysis.analytics.heuristic_functions import TABLEBASE_WIN, stockfish_moments, tablebase_score
+from app.analysis.analytics.timeline import GameTimeline
+from tests.test_engine_pool import STUB_ENGINE, SACRIFICE_PGN, EXPECTED_SWINGS, pool  # noqa: F401
+from tests.test_evaluation_curve import NoSearchPool
+
+
+ROOK_ENDGAME_PGN = '[FEN "8/8/8/8/8/1k6/8/R3K3 w - - 0 1"]\n[SetUp "1"]\n\n1. Ra3+ Kxa3 *'
+# six pieces, then five after the capture: the game leaves the engine for the tablebase
+MATED_LINE_PGN = '[FEN "8/8/8/8/1n6/1k6/p7/R3K2R w - - 0 1"]\n[SetUp "1"]\n\n1. Rxa2 Nxa2 *'
+
+
+class FakeTablebase:
+    """
+    Stand-in for chess.syzygy.Tablebase with rook endgames only: the side
+    with the rook wins in `dtz` moves, bare kings are a draw.
+    """
+
+    def __init__(self, dtz=10, win=2):
+        self.dtz = dtz
+        self.win = win
+        self.probes = 0
+
+    def get_wdl(self, board):
+        self.probes += 1
+        if len(board.piece_map()) == 2:
+            return 0
+        if not board.pieces(chess.ROOK, chess.WHITE) and not board.pieces(chess.ROOK, chess.BLACK):
+            return None
+        return self.win if board.pieces(chess.ROOK, board.turn) else -self.win
+
+    def get_dtz(self, board):
+        wdl = self.get_wdl(board)
+        return None if self.dtz is None else self.dtz * (1 if wdl > 0 else -1)
+
+
+class MatePool(EnginePool):
+    """Engine pool whose engine sees a mate in 3 for White in every position."""
+
+    async def version(self):
+        return "mate stub"
+
+    @asynccontextmanager
+    async def engine(self):
+        yield self
+
+    async def analyse(self, board, limit, game=None):
+        return {"score": chess.engine.PovScore(chess.engine.Mate(3), chess.WHITE)}
+
+
+class TestTablebaseScore:
+    """Test cases for mapping tablebase results to scores."""
+
+    def test_win_for_either_side(self):
+        """Test that a win is scored from White's point of view, faster wins higher."""
+        white_to_move = chess.Board("8/8/8/8/8/1k6/8/R3K3 w - - 0 1")
+        black_to_move = chess.Board("8/8/8/8/8/1k6/8/R3K3 b - - 0 1")
+
+        assert tablebase_score(FakeTablebase(dtz=10), white_to_move, 5) == TABLEBASE_WIN - 10
+        assert tablebase_score(FakeTablebase(dtz=10), black_to_move, 5) == TABLEBASE_WIN - 10
+        assert tablebase_score(FakeTablebase(dtz=2), white_to_move, 5) > \
+            tablebase_score(FakeTablebase(dtz=30), white_to_move, 5)
+        assert tablebase_score(FakeTablebase(dtz=None), white_to_move, 5) == TABLEBASE_WIN
+        assert tablebase_score(FakeTablebase(dtz=10), chess.Board("8/8/8/8/8/1K6/8/r3k3 w - - 0 1"), 5) == \
+            -(TABLEBASE_WIN - 10)
+
+    def test_draws(self):
+        """Test that draws and wins spoiled by the fifty-move rule are scored as zero."""
+        board = chess.Board("8/8/8/8/8/1k6/8/R3K3 w - - 0 1")
+
+        assert tablebase_score(FakeTablebase(), chess.Board("8/8/8/8/8/1k6/8/4K3 w - - 0 1"), 5) == 0
+        assert tablebase_score(FakeTablebase(win=1), board, 5) == 0
+
+    def test_not_covered(self):
+        """Test positions that are left to the engine."""
+        tablebase = FakeTablebase()
+
+        assert tablebase_score(tablebase, chess.Board("8/8/8/8/8/1k6/8/R3K3 w - - 0 1"), 2) is None
+        assert tablebase_score(tablebase, chess.Board("4k3/8/8/8/8/8/8/R3K3 w Q - 0 1"), 5) is None
+        assert tablebase_score(tablebase, chess.Board("R5k1/8/6K1/8/8/8/8/8 b - - 0 1"), 5) is None
+        assert tablebase_score(tablebase, chess.Board("8/8/8/8/8/1k6/8/B3K3 w - - 0 1"), 5) is None
+
+
+class TestTablebaseProbing:
+    """Test cases for stockfish_moments with Syzygy tablebases."""
+
+    @pytest.mark.asyncio
+    async def test_covered_game_skips_engine(self):
+        """Test that a game inside the tablebase is scored without any search."""
+        game = GameTimeline.from_pgn(ROOK_ENDGAME_PGN)
+        tablebase = FakeTablebase()
+        curve = EvaluationCurve()
+
+        no_search = NoSearchPool(STUB_ENGINE, size=1)
+        try:
+            await stockfish_moments(game, no_search, threshold=150, analysis_depth=4,
+                                    curve=curve, tablebase=tablebase)
+        finally:
+            await no_search.close()
+
+        assert curve.as_list() == [TABLEBASE_WIN - 10, TABLEBASE_WIN - 10, 0]
+        assert curve.engine.endswith("+ syzygy 5")
+
+    @pytest.mark.asyncio
+    async def test_large_positions_use_engine(self, pool):
+        """Test that positions above the piece limit are still searched."""
+        game = GameTimeline.from_pgn(SACRIFICE_PGN)
+        tablebase = FakeTablebase()
+
+        swings = await stockfish_moments(game, pool, threshold=150, analysis_depth=4,
+                                         tablebase=tablebase, tablebase_pieces=5)
+
+        assert swings == EXPECTED_SWINGS
+        assert tablebase.probes == 0
+
+    @pytest.mark.asyncio
+    async def test_mated_line_into_tablebase(self):
+        """Test that a mate found by the engine and the tablebase win after a capture are not a swing."""
+        game = GameTimeline.from_pgn(MATED_LINE_PGN)
+        curve = EvaluationCurve()
+
+        swings = await stockfish_moments(game, MatePool(STUB_ENGINE, size=1), threshold=290, analysis_depth=4,
+                                         curve=curve, tablebase=FakeTablebase())
+
+        assert swings == []
+        assert curve.as_list() == [TABLEBASE_WIN, TABLEBASE_WIN - 10, TABLEBASE_WIN - 10]
@@ -0,0 +1,395 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+
+from app import Task, TaskType, TaskStatus, TaskPriority
+from app.api.routes.tasks import progress_events
+from app.core import Base
+from app.db import SQLAlchemyUnitOfWork
+from app.utils.progress import TaskProgress
+from app.utils.task_events import TaskEvents
+from app.worker import TaskWorker
+
+LEASE = timedelta(seconds=60)
+ALL_TYPES = [TaskType.GAME_ANALYSIS, TaskType.VIDEO_PROCESSING]
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    """Session factory of a file database, so that several sessions see each other's commits."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'queue.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    await engine.dispose()
+
+
+async def enqueue(session_factory, *types: TaskType, user_id=1, priority=TaskPriority.INTERACTIVE,
+                  depends_on_id=None) -> list:
+    async with SQLAlchemyUnitOfWork(session_factory) as uow:
+        tasks = [await uow.task.create(Task(type=task_type, game_id=1, user_id=user_id, priority=priority,
+                                            depends_on_id=depends_on_id))
+                 for task_type in types]
+        await uow.commit()
+        return [task.id for task in tasks]
+
+
+async def set_status(session_factory, task_id: int, status: TaskStatus) -> None:
+    async with SQLAlchemyUnitOfWork(session_factory) as uow:
+        (await uow.task.get(task_id)).status = status
+        await uow.commit()
+
+
+async def statuses(session_factory) -> dict:
+    async with SQLAlchemyUnitOfWork(session_factory) as uow:
+        return {task.id: task.status for task in await uow.task.get_all()}
+
+
+class TestTaskClaim:
+    """Test cases for claiming tasks from the queue."""
+
+    @pytest.mark.asyncio
+    async def test_claim_oldest_once(self, session_factory):
+        """Test that tasks are claimed oldest first and only by one worker."""
+        first, second = await enqueue(session_factory, TaskType.GAME_ANALYSIS, TaskType.GAME_ANALYSIS)
+
+        async with SQLAlchemyUnitOfWork(session_factory) as uow:
+            task = await uow.task.claim("a", LEASE, ALL_TYPES)
+            assert task.id == first
+            assert task.status == TaskStatus.PROCESSING and task.worker_id == "a"
+            assert task.lease_expires_at > datetime.now()
+
+            assert (await uow.task.claim("b", LEASE, ALL_TYPES)).id == second
+            assert await uow.task.claim("c", LEASE, ALL_TYPES) is None
+            await uow.commit()
+
+    @pytest.mark.asyncio
+    async def test_claim_types(self, session_factory):
+        """Test that a worker only claims the task types it can run."""
+        analysis, video = await enqueue(session_factory, TaskType.GAME_ANALYSIS, TaskType.VIDEO_PROCESSING)
+
+        async with SQLAlchemyUnitOfWork(session_factory) as uow:
+            assert (await uow.task.claim("a", LEASE, [TaskType.VIDEO_PROCESSING])).id == video
+            assert await uow.task.claim("a", LEASE, [TaskType.VIDEO_PROCESSING]) is None
+
+    @pytest.mark.asyncio
+    async def test_expired_lease(self, session_factory):
+        """Test that the task of a dead worker is claimed again and the old lease cannot be renewed."""
+        [task_id] = await enqueue(session_factory, TaskType.GAME_ANALYSIS)
+
+        async with SQLAlchemyUnitOfWork(session_factory) as uow:
+            await uow.task.claim("dead", timedelta(seconds=-1), ALL_TYPES)
+            assert (await uow.task.claim("alive", LEASE, ALL_TYPES)).id == task_id
+
+            assert not await uow.task.renew_lease(task_id, "dead", LEASE)
+            assert await uow.task.renew_lease(task_id, "alive", LEASE)
+
+            assert not await uow.task.release(task_id, "dead", TaskStatus.PENDING)
+            assert await uow.task.release(task_id, "alive", TaskStatus.PENDING)
+            assert (await uow.task.claim("other", LEASE, ALL_TYPES)).id == task_id
+
+    @pytest.mark.asyncio
+    async def test_claim_waits_for_dependency(self, session_factory):
+        """Test that a dependent task is claimable only once its dependency has finished."""
+        [analysis] = await enqueue(session_factory, TaskType.GAME_ANALYSIS)
+        [video] = await enqueue(session_factory, TaskType.VIDEO_PROCESSING, depends_on_id=analysis)
+
+        async with SQLAlchemyUnitOfWork(session_factory) as uow:
+            assert await uow.task.claim("a", LEASE, [TaskType.VIDEO_PROCESSING]) is None
+            assert (await uow.task.claim("a", LEASE, ALL_TYPES)).id == analysis
+            assert await uow.task.claim("a", LEASE, ALL_TYPES) is None
+            await uow.commit()
+
+        # a failed dependency releases the dependent too, which then fails on its own
+        await set_status(session_factory, analysis, TaskStatus.FAILED)
+        async with SQLAlchemyUnitOfWork(session_factory) as uow:
+            assert (await uow.task.claim("a", LEASE, ALL_TYPES)).id == video
+
+
+    @pytest.mark.asyncio
+    async def test_claim_order(self, session_factory):
+        """Test that interactive tasks go first and users with fewer running tasks are served first."""
+        [bulk] = await enqueue(session_factory, TaskType.GAME_ANALYSIS, priority=TaskPriority.BULK)
+        first, second = await enqueue(session_factory, TaskType.GAME_ANALYSIS, TaskType.GAME_ANALYSIS, user_id=1)
+        [other_user] = await enqueue(session_factory, TaskType.GAME_ANALYSIS, user_id=2)
+
+        async with SQLAlchemyUnitOfWork(session_factory) as uow:
+            claimed = [(await uow.task.claim("a", LEASE, ALL_TYPES)).id for _ in range(4)]
+
+        assert claimed == [first, other_user, second, bulk]
+
+    @pytest.mark.asyncio
+    async def test_claim_limits(self, session_factory):
+        """Test that a type limit counts the running tasks of every worker, but not expired leases."""
+        first, second, _ = await enqueue(session_factory, *[TaskType.GAME_ANALYSIS] * 3)
+        [video] = await enqueue(session_factory, TaskType.VIDEO_PROCESSING)
+        limits = {TaskType.GAME_ANALYSIS: 1}
+
+        async with SQLAlchemyUnitOfWork(session_factory) as uow:
+            assert (await uow.task.claim("dead", timedelta(seconds=-1), ALL_TYPES, limits)).id == first
+            assert (await uow.task.claim("a", LEASE, ALL_TYPES, limits)).id == first
+            assert (await uow.task.claim("b", LEASE, ALL_TYPES, limits)).id == video
+            assert await uow.task.claim("c", LEASE, ALL_TYPES, limits) is None
+            # a worker without the limit is not held back by it
+            assert (await uow.task.claim("d", LEASE, ALL_TYPES)).id == second
+
+    @pytest.mark.asyncio
+    async def test_get_progress_many(self, session_factory):
+        """Test that the batch status query returns the owner, status and progress of existing tasks only."""
+        analysis, video = await enqueue(session_factory, TaskType.GAME_ANALYSIS, TaskType.VIDEO_PROCESSING)
+        [foreign] = await enqueue(session_factory, TaskType.GAME_ANALYSIS, user_id=2)
+
+        async with SQLAlchemyUnitOfWork(session_factory) as uow:
+            await uow.task.set_progress(video, 2, 5)
+            await uow.commit()
+
+            rows = await uow.task.get_progress_many([video, foreign, analysis, video, 999])
+
+        assert [tuple(row) for row in rows] == [
+            (analysis, 1, TaskStatus.PENDING, None, None),
+            (video, 1, TaskStatus.PENDING, 2, 5),
+            (foreign, 2, TaskStatus.PENDING, None, None),
+        ]
+
+
+class TestTaskWorker:
+    """Test cases for TaskWorker."""
+
+    @pytest.mark.asyncio
+    async def test_workers_drain_queue(self, session_factory):
+        """Test that two workers run every task exactly once."""
+        task_ids = await enqueue(session_factory, *[TaskType.GAME_ANALYSIS] * 6)
+        runs = []
+
+        async def complete(task):
+            runs.append(task.id)
+            await asyncio.sleep(0.01)
+            await set_status(session_factory, task.id, TaskStatus.COMPLETED)
+
+        runners = {TaskType.GAME_ANALYSIS: complete}
+        workers = [TaskWorker(session_factory, concurrency=2, poll_interval=0.01, runners=runners, worker_id=name,
+                              events=TaskEvents())
+                   for name in ("a", "b")]
+        for worker in workers:
+            worker.start()
+
+        for _ in range(200):
+            if set((await statuses(session_factory)).values()) == {TaskStatus.COMPLETED}:
+                break
+            await asyncio.sleep(0.01)
+
+        for worker in workers:
+            await worker.close()
+
+        assert sorted(runs) == task_ids
+        async with SQLAlchemyUnitOfWork(session_factory) as uow:
+            assert all(task.worker_id is None for task in await uow.task.get_all())
+
+    @pytest.mark.asyncio
+    async def test_failed_runner(self, session_factory):
+        """Test that an error the runner lets through fails the task."""
+        [task_id] = await enqueue(session_factory, TaskType.GAME_ANALYSIS)
+
+        async def fail(task):
+            raise RuntimeError("boom")
+
+        worker = TaskWorker(session_factory, poll_interval=0.01, runners={TaskType.GAME_ANALYSIS: fail},
+                            events=TaskEvents())
+        worker.start()
+        for _ in range(200):
+            if (await statuses(session_factory))[task_id] == TaskStatus.FAILED:
+                break
+            await asyncio.sleep(0.01)
+        await worker.close()
+
+        async with SQLAlchemyUnitOfWork(session_factory) as uow:
+            task = await uow.task.get(task_id)
+            assert task.status == TaskStatus.FAILED and task.error_message == "boom"
+
+    @pytest.mark.asyncio
+    async def test_close_requeues_running_tasks(self, session_factory):
+        """Test that a task interrupted by shutdown goes back to the queue."""
+        [task_id] = await enqueue(session_factory, TaskType.GAME_ANALYSIS)
+        started = asyncio.Event()
+
+        async def hang(task):
+            started.set()
+            await asyncio.Event().wait()
+
+        worker = TaskWorker(session_factory, poll_interval=0.01, runners={TaskType.GAME_ANALYSIS: hang},
+                            events=TaskEvents())
+        worker.start()
+        await asyncio.wait_for(started.wait(), 5)
+        await worker.close()
+
+        assert (await statuses(session_factory))[task_id] == TaskStatus.PENDING
+        async with SQLAlchemyUnitOfWork(session_factory) as uow:
+            assert (await uow.task.get(task_id)).attempts == 0
+
+    @pytest.mark.asyncio
+    async def test_lost_lease_stops_task(self, session_factory):
+        """Test that a worker whose lease was taken over stops the task and leaves it to the new holder."""
+        [task_id] = await enqueue(session_factory, TaskType.GAME_ANALYSIS)
+        started, stopped = asyncio.Event(), asyncio.Event()
+
+        async def hang(task):
+            started.set()
+            try:
+                await asyncio.Event().wait()
+            finally:
+                stopped.set()
+
+        worker = TaskWorker(session_factory, lease_seconds=0.3, poll_interval=60,
+                            runners={TaskType.GAME_ANALYSIS: hang}, events=TaskEvents())
+        worker.start()
+        await asyncio.wait_for(started.wait(), 5)
+
+        async with SQLAlchemyUnitOfWork(session_factory) as uow:
+            (await uow.task.get(task_id)).worker_id = "other"
+            await uow.commit()
+
+        await asyncio.wait_for(stopped.wait(), 5)
+        await worker.close()
+
+        async with SQLAlchemyUnitOfWork(session_factory) as uow:
+            task = await uow.task.get(task_id)
+            assert task.status == TaskStatus.PROCESSING and task.worker_id == "other"
+
+    @pytest.mark.asyncio
+    async def test_attempts_cap(self, session_factory):
+        """Test that a task whose workers keep dying is failed instead of being run again."""
+        [task_id] = await enqueue(session_factory, TaskType.GAME_ANALYSIS)
+        async with SQLAlchemyUnitOfWork(session_factory) as uow:
+            for _ in range(3):
+                await uow.task.claim("dead", timedelta(seconds=-1), ALL_TYPES)
+            await uow.commit()
+
+        runs = []
+
+        async def complete(task):
+            runs.append(task.id)
+            await set_status(session_factory, task.id, TaskStatus.COMPLETED)
+
+        worker = TaskWorker(session_factory, poll_interval=0.01, runners={TaskType.GAME_ANALYSIS: complete},
+                            events=TaskEvents(), max_attempts=3)
+        worker.start()
+        for _ in range(200):
+            if (await statuses(session_factory))[task_id] == TaskStatus.FAILED:
+                break
+            await asyncio.sleep(0.01)
+        await worker.close()
+
+        async with SQLAlchemyUnitOfWork(session_factory) as uow:
+            task = await uow.task.get(task_id)
+            assert task.status == TaskStatus.FAILED and task.attempts == 4
+            assert task.error_message == "Task did not finish in 3 attempts"
+        assert runs == []
+
+    @pytest.mark.asyncio
+    async def test_dependent_starts_without_polling(self, session_factory):
+        """Test that a finished task wakes its dependent long before the next poll."""
+        [analysis] = await enqueue(session_factory, TaskType.GAME_ANALYSIS)
+        [video] = await enqueue(session_factory, TaskType.VIDEO_PROCESSING, depends_on_id=analysis)
+        started = {}
+
+        async def complete(task):
+            started[task.id] = asyncio.get_running_loop().time()
+            await set_status(session_factory, task.id, TaskStatus.COMPLETED)
+
+        runners = {TaskType.GAME_ANALYSIS: complete, TaskType.VIDEO_PROCESSING: complete}
+        worker = TaskWorker(session_factory, concurrency=2, poll_interval=60, runners=runners, events=TaskEvents())
+        worker.start()
+        for _ in range(200):
+            if video in started:
+                break
+            await asyncio.sleep(0.01)
+        await worker.close()
+
+        assert started[video] - started[analysis] < 1
+
+    @pytest.mark.asyncio
+    async def test_type_limits(self, session_factory):
+        """Test that a type limit caps the tasks of that type while other types still run."""
+        await enqueue(session_factory, *[TaskType.GAME_ANALYSIS] * 3)
+        await enqueue(session_factory, TaskType.VIDEO_PROCESSING)
+        analyses, peak, overlapped = [0], [0], []
+
+        async def analyse(task):
+            analyses[0] += 1
+            peak[0] = max(peak[0], analyses[0])
+            await asyncio.sleep(0.05)
+            analyses[0] -= 1
+            await set_status(session_factory, task.id, TaskStatus.COMPLETED)
+
+        async def cut(task):
+            overlapped.append(analyses[0] > 0)
+            await set_status(session_factory, task.id, TaskStatus.COMPLETED)
+
+        runners = {TaskType.GAME_ANALYSIS: analyse, TaskType.VIDEO_PROCESSING: cut}
+        worker = TaskWorker(session_factory, concurrency=3, poll_interval=0.01, runners=runners, events=TaskEvents(),
+                            limits={TaskType.GAME_ANALYSIS: 1})
+        worker.start()
+        for _ in range(300):
+            if set((await statuses(session_factory)).values()) == {TaskStatus.COMPLETED}:
+                break
+            await asyncio.sleep(0.01)
+        await worker.close()
+
+        assert set((await statuses(session_factory)).values()) == {TaskStatus.COMPLETED}
+        assert peak == [1]
+        assert overlapped == [True]
+
+
+class TestTaskProgress:
+    """Test cases for TaskProgress and the progress stream."""
+
+    @pytest.mark.asyncio
+    async def test_progress_is_throttled(self, session_factory):
+        """Test that progress is written periodically and once more on exit, not on every step."""
+        [task_id] = await enqueue(session_factory, TaskType.VIDEO_PROCESSING)
+        events = TaskEvents()
+        writes = []
+
+        async with TaskProgress(session_factory, task_id, interval=60, events=events) as progress:
+            original = progress.flush
+
+            async def flush():
+                writes.append((progress.done, progress.total))
+                await original()
+
+            progress.flush = flush
+            progress.update(0, 3)
+            for _ in range(3):
+                progress.advance()
+            changed = events.watch(task_id)
+
+        assert writes == [(3, 3)]
+        assert changed.is_set()
+        async with SQLAlchemyUnitOfWork(session_factory) as uow:
+            state = await uow.task.get_progress(task_id)
+        assert (state.progress, state.progress_total) == (3, 3)
+
+    @pytest.mark.asyncio
+    async def test_stream_follows_task(self, session_factory):
+        """Test that the stream sends every change without waiting for the keep-alive and ends with the task."""
+        [task_id] = await enqueue(session_factory, TaskType.GAME_ANALYSIS)
+        events = TaskEvents()
+        stream = progress_events(session_factory, task_id, events=events, keep_alive=60)
+
+        assert '"status":"pending"' in await anext(stream)
+
+        async with TaskProgress(session_factory, task_id, events=events) as progress:
+            progress.update(5, 10)
+        assert '"progress":5,"progress_total":10' in await asyncio.wait_for(anext(stream), 5)
+
+        await set_status(session_factory, task_id, TaskStatus.COMPLETED)
+        events.wake(task_id)
+        assert '"status":"completed"' in await asyncio.wait_for(anext(stream), 5)
+
+        with pytest.raises(StopAsyncIteration):
+            await anext(stream)
@@ -0,0 +1,96 @@
+"""
+Minimal UCI engine used instead of Stockfish in tests and benchmarks.
+
+The score is the material balance plus a small deterministic term that
+depends on the position and the requested depth, so repeated searches of
+the same position at the same depth always return the same evaluation.
+
+Reported nodes grow as 2 ** depth. The stub also imitates a transposition
+table cleared by ``ucinewgame``: a search whose child position was already
+searched deep enough reports a quarter of the nodes. Scores never depend on
+the table.
+
+Run it as ``[sys.executable, path_to_this_file]``.
+"""
+import sys
+
+import chess
+
+VALUES = {chess.PAWN: 100, chess.KNIGHT: 300, chess.BISHOP: 300, chess.ROOK: 500, chess.QUEEN: 900, chess.KING: 0}
+
+
+def evaluate(board: chess.Board, depth: int) -> int:
+    """Score in centipawns from the side to move's point of view."""
+    score = sum(VALUES[p.piece_type] * (1 if p.color == chess.WHITE else -1) for p in board.piece_map().values())
+    score += (board.ply() * 7919 + depth * 31) % 23 - 11
+    return score if board.turn == chess.WHITE else -score
+
+
+def send(line: str) -> None:
+    sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+
+
+def search_nodes(board: chess.Board, depth: int, table: dict) -> int:
+    """Nodes reported for a search, cheaper when a child position is in the table."""
+    nodes = 2 ** depth
+
+    for move in board.legal_moves:
+        board.push(move)
+        hit = table.get(board.epd(), -1) >= depth - 1
+        board.pop()
+        if hit:
+            nodes //= 4
+            break
+
+    table[board.epd()] = max(depth, table.get(board.epd(), -1))
+    return nodes
+
+
+def main() -> None:
+    board = chess.Board()
+    table = {}
+
+    for line in sys.stdin:
+        parts = line.split()
+        if not parts:
+            continue
+
+        command = parts[0]
+
+        if command == "uci":
+            send("id name UCI stub")
+            send("option name Hash type spin default 16 min 1 max 33554432")
+            send("option name Threads type spin default 1 min 1 max 1024")
+            send("uciok")
+        elif command == "ucinewgame":
+            table.clear()
+        elif command == "isready":
+            send("readyok")
+        elif command == "position":
+            if parts[1] == "startpos":
+                board = chess.Board()
+                rest = parts[2:]
+            else:
+                end = parts.index("moves") if "moves" in parts else len(parts)
+                board = chess.Board(" ".join(parts[2:end]))
+                rest = parts[end:]
+            for uci in rest[1:]:
+                board.push_uci(uci)
+        elif command == "go":
+            depth = int(parts[parts.index("depth") + 1]) if "depth" in parts else 1
+            nodes = search_nodes(board, depth, table)
+
+            if board.is_checkmate():
+                send(f"info depth {depth} score mate 0 nodes {nodes}")
+            else:
+                send(f"info depth {depth} score cp {evaluate(board, depth)} nodes {nodes}")
+
+            move = next(iter(board.legal_moves), None)
+            send(f"bestmove {move.uci() if move else '0000'}")
+        elif command == "quit":
+            break
+
+
+if __name__ == "__main__":
+    main()